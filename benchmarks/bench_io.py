@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from extractor import header_scan
+from extractor.batch import process_batch
+
+# Simulates slow or network storage by adding a fixed delay to every open and
+# read the header scanner makes, then compares extraction throughput with and
+# without the I/O prefetch threads (extract --io-threads).
+#
+#   python -m benchmarks.corpus --output ./bench_corpus --files 200
+#   python -m benchmarks.bench_io --corpus ./bench_corpus --latency-ms 5
+
+DEFAULT_THREADS = (0, 4, 8, 16)
+
+
+class _SlowRaw(io.RawIOBase):
+    def __init__(self, raw: io.RawIOBase, latency: float) -> None:
+        self._raw = raw
+        self._latency = latency
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._raw.seekable()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+    def readinto(self, buffer: Any) -> int | None:
+        time.sleep(self._latency)
+        return self._raw.readinto(buffer)
+
+    def close(self) -> None:
+        self._raw.close()
+        super().close()
+
+
+def slow_opener(latency: float):
+    def _open(file_path: Any, mode: str = "r", *args: Any, **kwargs: Any) -> Any:
+        time.sleep(latency)
+        raw = io.FileIO(os.fspath(file_path), "r")
+        return io.BufferedReader(_SlowRaw(raw, latency))
+
+    return _open
+
+
+def run(corpus: Path, latency_ms: float, threads: tuple[int, ...]) -> dict[str, Any]:
+    # Runs in-process only: the delay is patched into this interpreter, so
+    # worker processes (--jobs) would not see it.
+    header_scan.open = slow_opener(latency_ms / 1000)  # type: ignore[attr-defined]
+    try:
+        runs: dict[str, Any] = {}
+        reference = None
+        for io_threads in threads:
+            start = time.perf_counter()
+            results, errors, totals = process_batch(corpus, recursive=False, io_threads=io_threads)
+            seconds = time.perf_counter() - start
+            # Prefetching must not change what is extracted.
+            outcome = (results, [error["file_path"] for error in errors])
+            if reference is None:
+                reference = outcome
+            elif outcome != reference:
+                raise RuntimeError(f"io_threads={io_threads} produced different output")
+            runs[str(io_threads)] = {
+                "seconds": round(seconds, 4),
+                "files_per_sec": round(totals.discovered / seconds, 1) if seconds else None,
+            }
+    finally:
+        del header_scan.open  # type: ignore[attr-defined]
+
+    base = runs[str(threads[0])]["files_per_sec"]
+    for result in runs.values():
+        result["speedup"] = round(result["files_per_sec"] / base, 2) if base else None
+    return {"latency_ms": latency_ms, "files": totals.discovered, "io_threads": runs}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark header prefetch on simulated slow storage.")
+    parser.add_argument("--corpus", required=True, help="Directory written by benchmarks.corpus")
+    parser.add_argument(
+        "--latency-ms", type=float, default=5.0, help="Delay added to every open and read (default: 5)"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_THREADS),
+        help="io_threads values to compare; the first is the baseline (default: 0 4 8 16)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(Path(args.corpus), args.latency_ms, tuple(args.threads))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{report['files']} files, {report['latency_ms']:g} ms per open/read")
+    for io_threads, result in report["io_threads"].items():
+        print(
+            f"io_threads={io_threads:<3} {result['seconds']:.3f}s  "
+            f"files/s={result['files_per_sec']}  speedup={result['speedup']}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
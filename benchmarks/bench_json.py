@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Any, Callable
+
+from benchmarks.corpus import generation_metadata
+from extractor import jsonio
+
+# Compares the stdlib codec with the jsonio backend on payloads shaped like
+# extract output: each record carries a prompt graph and a UI workflow that
+# are parsed from text chunks and then written out again.
+#
+#   python -m benchmarks.bench_json --records 2000
+
+
+def build_corpus(records: int, payload_kb: int = 12, seed: int = 0) -> list[dict[str, str]]:
+    corpus = []
+    for index in range(records):
+        prompt, workflow = generation_metadata(random.Random(f"{seed}:{index}"), payload_kb)
+        corpus.append({"prompt": prompt, "workflow": workflow})
+    return corpus
+
+
+def _best_of(repeat: int, func: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def stdlib_dump(value: Any, pretty: bool) -> bytes:
+    return jsonio._stdlib_dumps(value, pretty).encode("utf-8")
+
+
+def run(records: int, repeat: int) -> dict[str, Any]:
+    corpus = build_corpus(records)
+    texts = [text for item in corpus for text in item.values()]
+    payload = {"results": [{key: json.loads(text) for key, text in item.items()} for item in corpus]}
+    size = sum(len(text) for text in texts)
+
+    cases = {
+        "parse": (lambda: [json.loads(text) for text in texts], lambda: [jsonio.loads(text) for text in texts]),
+        "dump": (lambda: stdlib_dump(payload, False), lambda: jsonio.dumps_bytes(payload)),
+        "dump_pretty": (lambda: stdlib_dump(payload, True), lambda: jsonio.dumps_bytes(payload, pretty=True)),
+    }
+
+    identical = all(
+        stdlib_dump(payload, pretty) == jsonio.dumps_bytes(payload, pretty=pretty) for pretty in (False, True)
+    )
+    stages = {}
+    for name, (stdlib_func, backend_func) in cases.items():
+        stdlib_time = _best_of(repeat, stdlib_func)
+        backend_time = _best_of(repeat, backend_func)
+        stages[name] = {
+            "stdlib_seconds": round(stdlib_time, 4),
+            "backend_seconds": round(backend_time, 4),
+            "speedup": round(stdlib_time / backend_time, 2) if backend_time else None,
+        }
+
+    return {
+        "backend": jsonio.BACKEND,
+        "records": records,
+        "json_megabytes": round(size / 1e6, 2),
+        "identical_output": identical,
+        "stages": stages,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the JSON backend used by comfy-meta.")
+    parser.add_argument("--records", type=int, default=2000, help="Synthetic records (default: 2000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, best is kept (default: 3)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args.records, args.repeat)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"Backend: {report['backend']}  records={report['records']}  json={report['json_megabytes']} MB")
+    print(f"Identical output: {report['identical_output']}")
+    for name, stage in report["stages"].items():
+        print(
+            f"{name:<12} stdlib={stage['stdlib_seconds']:.4f}s  "
+            f"backend={stage['backend_seconds']:.4f}s  speedup={stage['speedup']}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Any
+
+# Measures CLI startup: the cumulative import time of extractor.cli reported by
+# -X importtime, wall time of short invocations, and which heavy modules get
+# loaded. Exits 1 when the import time is over --budget-ms or a module that
+# should load on first use is imported by one of the checks below, so CI can
+# run it as a gate.
+#
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --budget-ms 60 --json
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BUDGET_MS = 100.0
+DEFAULT_REPEAT = 7
+
+# Loaded on first use only; importing the CLI and building its parser must not
+# pull these in.
+DEFERRED_MODULES = (
+    "PIL",
+    "piexif",
+    "multiprocessing",
+    "concurrent.futures.process",
+    "sqlite3",
+    "http.server",
+    "socketserver",
+    "webbrowser",
+    "tempfile",
+    "ctypes",
+    "extractor.grouping",
+    "extractor.http_api",
+    "extractor.index",
+    "extractor.merge",
+    "extractor.report_html",
+    "extractor.server",
+    "extractor.stats",
+    "extractor.store",
+    "extractor.watch",
+)
+# A header-only extraction (PNG, --fields dimensions) must not load Pillow.
+HEADER_ONLY_DEFERRED = ("PIL", "piexif")
+
+_LOADED_AFTER = """
+import json, sys
+{setup}
+print(json.dumps(sorted(name for name in {modules!r} if name in sys.modules)))
+"""
+_CLI_SETUP = "import extractor.cli\nextractor.cli.build_parser()"
+_HEADER_ONLY_SETUP = """
+from pathlib import Path
+from extractor.core import extract_image_metadata
+from extractor.models import ExtractOptions
+extract_image_metadata(Path({path!r}), options=ExtractOptions(fields=("dimensions",)))
+"""
+
+
+def _python(*args: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def _import_ms(module: str) -> float:
+    # -X importtime writes "import time: self | cumulative | name" to stderr,
+    # nesting shown by indentation; the top-level entry carries the total.
+    stderr = _python("-X", "importtime", "-c", f"import {module}").stderr
+    for line in stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].rstrip() == f" {module}":
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"no importtime entry for {module}")
+
+
+def _wall_ms(*args: str) -> float:
+    start = time.perf_counter()
+    _python(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def _loaded(setup: str, modules: tuple[str, ...]) -> list[str]:
+    return json.loads(_python("-c", _LOADED_AFTER.format(setup=setup, modules=modules)).stdout)
+
+
+def _tiny_png(path: Path) -> None:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0)
+    path.write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"tEXt", b"prompt\x00{}")
+        + chunk(b"IDAT", zlib.compress(b"\x00\x00"))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _median_ms(repeat: int, *args: str) -> float:
+    return round(statistics.median(_wall_ms(*args) for _ in range(repeat)), 1)
+
+
+def run(repeat: int) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = Path(tmp) / "sample.png"
+        _tiny_png(sample)
+        header_only = _loaded(_HEADER_ONLY_SETUP.format(path=str(sample)), HEADER_ONLY_DEFERRED)
+    return {
+        "python": sys.version.split()[0],
+        "import_ms": round(statistics.median(_import_ms("extractor.cli") for _ in range(repeat)), 1),
+        "interpreter_ms": _median_ms(repeat, "-c", "pass"),
+        "version_ms": _median_ms(repeat, "-m", "extractor.cli", "--version"),
+        "help_ms": _median_ms(repeat, "-m", "extractor.cli", "--help"),
+        "loaded_at_startup": _loaded(_CLI_SETUP, DEFERRED_MODULES),
+        "loaded_header_only": header_only,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure CLI startup time and check it against a budget.")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help=f"Maximum median import time of extractor.cli (default: {DEFAULT_BUDGET_MS:g})",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=DEFAULT_REPEAT, help=f"Runs per measurement (default: {DEFAULT_REPEAT})"
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat)
+    failures = []
+    if report["import_ms"] > args.budget_ms:
+        failures.append(f"import extractor.cli took {report['import_ms']} ms (budget {args.budget_ms:g} ms)")
+    if report["loaded_at_startup"]:
+        failures.append(f"loaded at startup: {', '.join(report['loaded_at_startup'])}")
+    if report["loaded_header_only"]:
+        failures.append(f"loaded by a header-only extraction: {', '.join(report['loaded_header_only'])}")
+    report["budget_ms"] = args.budget_ms
+    report["failures"] = failures
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import extractor.cli: {report['import_ms']} ms (budget {args.budget_ms:g} ms)")
+        print(
+            f"interpreter: {report['interpreter_ms']} ms  --version: {report['version_ms']} ms  "
+            f"--help: {report['help_ms']} ms"
+        )
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Any
+
+import piexif
+import piexif.helper
+from PIL import Image, PngImagePlugin
+
+# Deterministic benchmark corpus: the same arguments always produce the same
+# files, so runs of different versions can be compared.
+#
+#   python -m benchmarks.corpus --output ./bench_corpus --files 500 --payload-kb 32
+
+# Share of each kind in the corpus; whatever is left after the others is PNG.
+MIX = {"jpeg": 0.10, "webp": 0.10, "corrupt": 0.03, "truncated": 0.03}
+
+NODE_TYPES = [
+    "CheckpointLoaderSimple",
+    "CLIPTextEncode",
+    "KSampler",
+    "LoraLoader",
+    "VAEDecode",
+    "EmptyLatentImage",
+    "SaveImage",
+]
+PROMPT_WORDS = (
+    "a photo of a lighthouse at dusk, volumetric fog, 35mm, film grain, cinematic lighting, "
+    "highly detailed, café terrace, snow-covered pines, golden hour, bokeh, ultra sharp"
+).split()
+
+
+def _prompt_graph(rng: random.Random, nodes: int) -> dict[str, Any]:
+    graph: dict[str, Any] = {}
+    for node_id in range(1, nodes + 1):
+        class_type = NODE_TYPES[(node_id - 1) % len(NODE_TYPES)]
+        inputs: dict[str, Any] = {"model": [str(max(1, node_id - 1)), 0]}
+        if class_type == "CheckpointLoaderSimple":
+            inputs = {"ckpt_name": f"model_{rng.randint(1, 20)}.safetensors"}
+        elif class_type == "CLIPTextEncode":
+            inputs["text"] = " ".join(rng.choice(PROMPT_WORDS) for _ in range(rng.randint(8, 40)))
+        elif class_type == "KSampler":
+            inputs.update(
+                seed=rng.getrandbits(48),
+                steps=rng.randint(10, 50),
+                cfg=round(rng.uniform(1.0, 12.0), 1),
+                sampler_name=rng.choice(["euler", "dpmpp_2m", "uni_pc"]),
+                scheduler=rng.choice(["normal", "karras"]),
+                denoise=1.0,
+            )
+        elif class_type == "LoraLoader":
+            inputs.update(lora_name=f"lora_{rng.randint(1, 50)}.safetensors", strength_model=0.8)
+        graph[str(node_id)] = {"class_type": class_type, "inputs": inputs}
+    return graph
+
+
+def _workflow(rng: random.Random, prompt: dict[str, Any]) -> dict[str, Any]:
+    nodes = [
+        {
+            "id": int(node_id),
+            "type": node["class_type"],
+            "pos": [round(rng.uniform(0, 3000), 1), round(rng.uniform(0, 2000), 1)],
+            "size": [315, 262],
+            "flags": {},
+            "order": order,
+            "mode": 0,
+            "widgets_values": [value for value in node["inputs"].values() if not isinstance(value, list)],
+        }
+        for order, (node_id, node) in enumerate(prompt.items())
+    ]
+    links = [[i, i, 0, i + 1, 0, "MODEL"] for i in range(1, len(nodes))]
+    return {"last_node_id": len(nodes), "last_link_id": len(links), "nodes": nodes, "links": links, "version": 0.4}
+
+
+def generation_metadata(rng: random.Random, payload_kb: int) -> tuple[str, str]:
+    # Grows the graph until prompt + workflow JSON reach about ``payload_kb``.
+    nodes = 7
+    while True:
+        state = rng.getstate()
+        prompt = _prompt_graph(rng, nodes)
+        prompt_text = json.dumps(prompt)
+        workflow_text = json.dumps(_workflow(rng, prompt))
+        if len(prompt_text) + len(workflow_text) >= payload_kb * 1024 or nodes >= 5000:
+            return prompt_text, workflow_text
+        rng.setstate(state)
+        nodes = max(nodes + 1, int(nodes * 1.5))
+
+
+def _a1111_parameters(prompt: dict[str, Any]) -> str:
+    texts = [node["inputs"]["text"] for node in prompt.values() if "text" in node["inputs"]]
+    sampler = next(node["inputs"] for node in prompt.values() if node["class_type"] == "KSampler")
+    return (
+        f"{texts[0] if texts else ''}\nNegative prompt: {texts[1] if len(texts) > 1 else ''}\n"
+        f"Steps: {sampler['steps']}, Sampler: {sampler['sampler_name']}, CFG scale: {sampler['cfg']}, "
+        f"Seed: {sampler['seed']}, Size: 512x512"
+    )
+
+
+def _image(rng: random.Random, size: int) -> Image.Image:
+    color = tuple(rng.randrange(256) for _ in range(3))
+    return Image.new("RGB", (size, size), color)
+
+
+def _png_bytes(rng: random.Random, size: int, payload_kb: int) -> bytes:
+    prompt_text, workflow_text = generation_metadata(rng, payload_kb)
+    info = PngImagePlugin.PngInfo()
+    info.add_text("prompt", prompt_text)
+    info.add_text("workflow", workflow_text)
+    buffer = io.BytesIO()
+    _image(rng, size).save(buffer, "PNG", pnginfo=info)
+    return buffer.getvalue()
+
+
+def _jpeg_bytes(rng: random.Random, size: int, payload_kb: int) -> bytes:
+    prompt_text, _ = generation_metadata(rng, payload_kb)
+    comment = piexif.helper.UserComment.dump(_a1111_parameters(json.loads(prompt_text)), encoding="unicode")
+    exif = piexif.dump({"0th": {}, "Exif": {piexif.ExifIFD.UserComment: comment}, "GPS": {}, "1st": {}})
+    buffer = io.BytesIO()
+    _image(rng, size).save(buffer, "JPEG", exif=exif, quality=85)
+    return buffer.getvalue()
+
+
+def _webp_bytes(rng: random.Random, size: int, payload_kb: int) -> bytes:
+    # Same layout as ComfyUI's WebP saver: "workflow:" in Make, "prompt:" in Model.
+    prompt_text, workflow_text = generation_metadata(rng, payload_kb)
+    exif = Image.Exif()
+    exif[0x010F] = "workflow:" + workflow_text
+    exif[0x0110] = "prompt:" + prompt_text
+    buffer = io.BytesIO()
+    _image(rng, size).save(buffer, "WEBP", exif=exif, quality=80)
+    return buffer.getvalue()
+
+
+def _kind(index: int) -> str:
+    # Spread each kind evenly through the corpus instead of in blocks.
+    position = (index * 0.6180339887) % 1.0
+    threshold = 0.0
+    for kind, share in MIX.items():
+        threshold += share
+        if position < threshold:
+            return kind
+    return "png"
+
+
+def generate_corpus(
+    output_dir: Path, files: int = 500, payload_kb: int = 32, image_size: int = 64, seed: int = 0
+) -> dict[str, Any]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    counts = {"png": 0, "jpeg": 0, "webp": 0, "corrupt": 0, "truncated": 0}
+    total_bytes = 0
+
+    for index in range(files):
+        # One RNG per file keeps each file identical when the count changes.
+        rng = random.Random(f"{seed}:{index}")
+        kind = _kind(index)
+        if kind == "jpeg":
+            name, data = f"img_{index:05d}.jpg", _jpeg_bytes(rng, image_size, payload_kb)
+        elif kind == "webp":
+            name, data = f"img_{index:05d}.webp", _webp_bytes(rng, image_size, payload_kb)
+        elif kind == "corrupt":
+            name, data = f"img_{index:05d}.png", rng.randbytes(rng.randint(64, 4096))
+        elif kind == "truncated":
+            data = _png_bytes(rng, image_size, payload_kb)
+            name, data = f"img_{index:05d}.png", data[: rng.randint(40, len(data) // 2)]
+        else:
+            name, data = f"img_{index:05d}.png", _png_bytes(rng, image_size, payload_kb)
+        (output_dir / name).write_bytes(data)
+        counts[kind] += 1
+        total_bytes += len(data)
+
+    manifest = {
+        "files": files,
+        "payload_kb": payload_kb,
+        "image_size": image_size,
+        "seed": seed,
+        "counts": counts,
+        "bytes": total_bytes,
+    }
+    (output_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a deterministic benchmark corpus.")
+    parser.add_argument("--output", required=True, help="Directory to write the corpus to")
+    parser.add_argument("--files", type=int, default=500, help="Number of files (default: 500)")
+    parser.add_argument(
+        "--payload-kb", type=int, default=32, help="Approximate prompt+workflow size per image (default: 32)"
+    )
+    parser.add_argument("--image-size", type=int, default=64, help="Image edge in pixels (default: 64)")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed (default: 0)")
+    args = parser.parse_args(argv)
+
+    manifest = generate_corpus(Path(args.output), args.files, args.payload_kb, args.image_size, args.seed)
+    print(json.dumps(manifest, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable
+
+from extractor import __version__, jsonio
+from extractor.batch import discover_files, process_batch
+from extractor.comfy_parser import parse_comfyui_metadata
+from extractor.core import _extract_raw_metadata, extract_image_metadata
+from extractor.header_scan import scan_header
+from extractor.report_html import build_report_html
+from extractor.serialization import make_json_safe
+
+# Times each pipeline stage on a corpus from benchmarks.corpus and writes the
+# results as JSON. Every stage runs in its own interpreter so its peak RSS is
+# not inflated by the stages before it.
+#
+#   python -m benchmarks.corpus --output ./bench_corpus
+#   python -m benchmarks.harness --corpus ./bench_corpus --output bench.json
+#   python -m benchmarks.harness --corpus ./bench_corpus --baseline bench.json
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+STAGES = ("discover", "extract", "parse", "json_safe", "json_dump", "report")
+
+
+def _memory() -> tuple[int | None, int | None]:
+    # (current, peak) resident set size in bytes, where the platform tells us.
+    if sys.platform.startswith("linux"):
+        current = peak = None
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+        return current, peak
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class _Counters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = _Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize, counters.PeakWorkingSetSize
+        return None, None
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return None, peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None, None
+
+
+def _image_files(corpus: Path) -> list[Path]:
+    files, _ = discover_files(corpus, recursive=False)
+    return files
+
+
+def _headers(files: list[Path]) -> list[dict[str, Any]]:
+    infos = []
+    for path in files:
+        try:
+            header = scan_header(path)
+        except Exception:
+            continue
+        if header is not None:
+            infos.append(header.info)
+    return infos
+
+
+def _prepare(stage: str, corpus: Path) -> tuple[Callable[[], Any], int, int]:
+    # Returns the timed callable plus the item count and byte count it covers.
+    files = _image_files(corpus)
+    input_bytes = sum(path.stat().st_size for path in files)
+
+    if stage == "discover":
+        return lambda: discover_files(corpus, recursive=False), len(files), 0
+
+    if stage == "extract":
+
+        def extract() -> None:
+            for path in files:
+                try:
+                    extract_image_metadata(path)
+                except Exception:
+                    pass
+
+        return extract, len(files), input_bytes
+
+    if stage == "parse":
+        raws = [_extract_raw_metadata(info) for info in _headers(files)]
+        text_bytes = sum(len(value) for raw in raws for value in raw.values() if isinstance(value, str))
+        return lambda: [parse_comfyui_metadata(raw) for raw in raws], len(raws), text_bytes
+
+    if stage == "json_safe":
+        infos = _headers(files)
+        info_bytes = sum(len(value) for info in infos for value in info.values() if isinstance(value, (str, bytes)))
+        return lambda: [make_json_safe(info) for info in infos], len(infos), info_bytes
+
+    results, errors, totals = process_batch(corpus, recursive=False)
+    payload = {"totals": asdict(totals), "results": results, "errors": errors}
+    if stage == "json_dump":
+        output_bytes = len(jsonio.dumps_bytes(payload))
+        return lambda: jsonio.dumps_bytes(payload), len(results), output_bytes
+    if stage == "report":
+        output_bytes = len(build_report_html(payload).encode("utf-8"))
+        return lambda: build_report_html(payload), len(results), output_bytes
+
+    raise ValueError(f"unknown stage: {stage}")
+
+
+def run_stage(stage: str, corpus: Path, repeat: int) -> dict[str, Any]:
+    func, items, size = _prepare(stage, corpus)
+    rss_before, _ = _memory()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    _, peak = _memory()
+
+    return {
+        "seconds": round(best, 6),
+        "items": items,
+        "bytes": size,
+        "files_per_sec": round(items / best, 1) if best else None,
+        "mb_per_sec": round(size / best / 1e6, 2) if best and size else None,
+        "rss_before_mb": round(rss_before / 1e6, 1) if rss_before else None,
+        "peak_rss_mb": round(peak / 1e6, 1) if peak else None,
+    }
+
+
+def _run_isolated(stage: str, corpus: Path, repeat: int) -> dict[str, Any]:
+    command = [sys.executable, "-m", "benchmarks.harness", "--corpus", str(corpus.resolve())]
+    command += ["--repeat", str(repeat), "--stage", stage, "--isolated"]
+    completed = subprocess.run(command, capture_output=True, text=True, check=True, cwd=REPO_ROOT)
+    return json.loads(completed.stdout)
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> dict[str, float | None]:
+    # files/sec of ``current`` relative to ``baseline``; above 1.0 is faster.
+    ratios = {}
+    for stage, result in current["stages"].items():
+        old = baseline.get("stages", {}).get(stage, {}).get("files_per_sec")
+        new = result.get("files_per_sec")
+        ratios[stage] = round(new / old, 3) if old and new else None
+    return ratios
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark comfy-meta pipeline stages on a corpus.")
+    parser.add_argument("--corpus", required=True, help="Directory written by benchmarks.corpus")
+    parser.add_argument(
+        "--stage", action="append", choices=STAGES, help="Stage to run (repeatable, default: all)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, best is kept (default: 3)")
+    parser.add_argument("--output", help="Write results JSON here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare files/sec against")
+    parser.add_argument("--isolated", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    corpus = Path(args.corpus)
+    stages = args.stage or list(STAGES)
+    if args.isolated:
+        print(json.dumps(run_stage(stages[0], corpus, args.repeat)))
+        return 0
+
+    manifest_path = corpus / "manifest.json"
+    report = {
+        "tool_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_backend": jsonio.BACKEND,
+        "cpu_count": os.cpu_count(),
+        "corpus": json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.is_file() else None,
+        "stages": {stage: _run_isolated(stage, corpus, args.repeat) for stage in stages},
+    }
+    if args.baseline:
+        report["speedup_vs_baseline"] = compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        for stage, result in report["stages"].items():
+            print(
+                f"{stage:<10} {result['seconds']:.4f}s  files/s={result['files_per_sec']}  "
+                f"MB/s={result['mb_per_sec']}  peak_rss={result['peak_rss_mb']} MB"
+            )
+        print(f"Output: {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
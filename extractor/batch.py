@@ -1,67 +1,376 @@
 from __future__ import annotations
 
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, Sequence, TypeVar
 
-from extractor.core import extract_image_metadata
-from extractor.models import RunTotals
-
-SUPPORTED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+from extractor.cache import CacheKey, ExtractionCache, options_variant
+from extractor.comfy_parser import decoded_raw_keys
+from extractor.core import extract_from_header, extract_image_metadata, metadata_key_filter
+from extractor.discovery import Shard, format_shard, scan_files
+from extractor.header_scan import scan_header
+from extractor.journal import ExtractionJournal
+from extractor.models import DiscoveredFile, ExtractOptions, RunTotals, ScannedHeader
+from extractor.profiling import BatchHook
+from extractor.projection import field_plan, project_record
 
 
 def discover_files(input_path: Path, recursive: bool) -> tuple[list[Path], int]:
-    if input_path.is_file():
-        if input_path.suffix.lower() in SUPPORTED_EXTENSIONS:
-            return [input_path], 0
-        return [], 1
+    files, skipped = scan_files(input_path, recursive=recursive)
+    return [entry.path for entry in files], skipped
 
-    if not input_path.is_dir():
-        raise FileNotFoundError(f"Input path does not exist: {input_path}")
 
-    entries: Iterable[Path]
-    if recursive:
-        entries = input_path.rglob("*")
-    else:
-        entries = input_path.iterdir()
+def resolve_jobs(jobs: int) -> int:
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
 
-    all_files = [path for path in entries if path.is_file()]
-    supported = [f for f in all_files if f.suffix.lower() in SUPPORTED_EXTENSIONS]
-    skipped = len(all_files) - len(supported)
-    return supported, skipped
 
+def _extract_record(
+    entry: DiscoveredFile,
+    options: ExtractOptions | None = None,
+    prefetched: Future[ScannedHeader | None] | None = None,
+) -> tuple[bool, dict]:
+    # ``prefetched`` is a scan_header call already running on an I/O thread.
+    file_path = entry.path
+    options = options or ExtractOptions()
+    timings: dict[str, float] | None = {} if options.collect_timings else None
+    started = time.perf_counter() if timings is not None else 0.0
+    try:
+        if prefetched is not None:
+            # "read" is then only the time spent waiting for the prefetch.
+            header = prefetched.result()
+            if timings is not None:
+                timings["read"] = time.perf_counter() - started
+            result, warnings = extract_from_header(file_path, header, entry.size, options, timings)
+        else:
+            result, warnings = extract_image_metadata(
+                file_path, size_bytes=entry.size, options=options, timings=timings
+            )
+        built = time.perf_counter() if timings is not None else 0.0
+        record = {
+            "file_path": result.file_path,
+            "format": result.format,
+            "size_bytes": result.size_bytes,
+            "dimensions": result.dimensions,
+            "exif": result.exif,
+            "comfyui": result.comfyui,
+            "raw_metadata": result.raw_metadata,
+        }
+        if result.unloaded_keys:
+            record["unloaded_keys"] = result.unloaded_keys
+        if warnings:
+            record["warnings"] = warnings
+        record = project_record(record, field_plan(options.fields))
+        if options.dedupe_raw and "raw_metadata" in record and "comfyui" in record:
+            # Only entries whose decoded form is actually in the output are dropped.
+            raw_metadata = record["raw_metadata"]
+            for key in decoded_raw_keys(raw_metadata, record["comfyui"]):
+                del raw_metadata[key]
+        if timings is not None:
+            now = time.perf_counter()
+            timings["record"] = now - built
+            timings["total"] = now - started
+            # Carried back from worker processes; taken off again by _dispatch_timings.
+            record["_timings"] = timings
+        return True, record
+    except Exception as exc:  # Keep running in batch mode.
+        error = {
+            "file_path": str(file_path),
+            "error_type": type(exc).__name__,
+            "message": str(exc),
+        }
+        if timings is not None:
+            timings["total"] = time.perf_counter() - started
+            error["_timings"] = timings
+        return False, error
 
-def process_batch(input_path: Path, recursive: bool) -> tuple[list[dict], list[dict], RunTotals]:
-    files, skipped = discover_files(input_path, recursive=recursive)
-    totals = RunTotals(discovered=len(files), skipped_unsupported=skipped)
 
-    results: list[dict] = []
-    errors: list[dict] = []
+def _iter_prefetched(
+    files: list[DiscoveredFile], options: ExtractOptions | None, io_threads: int
+) -> Iterator[tuple[bool, dict]]:
+    # I/O threads read headers (scan_header) a bounded distance ahead while this
+    # thread does the parsing, so open/read latency overlaps with CPU work.
+    if io_threads <= 0 or len(files) <= 1:
+        yield from (_extract_record(entry, options) for entry in files)
+        return
+
+    max_ahead = io_threads * 4
+    text_keys = metadata_key_filter(options or ExtractOptions())
+    with ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="comfy-meta-io") as pool:
+        pending: deque[tuple[DiscoveredFile, Future[ScannedHeader | None]]] = deque()
+        entries = iter(files)
+        for entry in entries:
+            pending.append((entry, pool.submit(scan_header, entry.path, text_keys)))
+            if len(pending) >= max_ahead:
+                break
+        while pending:
+            entry, future = pending.popleft()
+            next_entry = next(entries, None)
+            if next_entry is not None:
+                pending.append((next_entry, pool.submit(scan_header, next_entry.path, text_keys)))
+            yield _extract_record(entry, options, future)
+
+
+def _extract_chunk(
+    files: list[DiscoveredFile], options: ExtractOptions | None = None, io_threads: int = 0
+) -> list[tuple[bool, dict]]:
+    return list(_iter_prefetched(files, options, io_threads))
+
+
+ChunkResult = TypeVar("ChunkResult")
+
+
+def map_chunks(
+    function: Callable[..., ChunkResult],
+    files: Iterable[DiscoveredFile],
+    workers: int,
+    chunksize: int,
+    *args: object,
+) -> Iterator[ChunkResult]:
+    # function(chunk, *args) over consecutive chunks of ``files`` in worker
+    # processes. ``files`` is consumed lazily, only as chunks are submitted.
+    # Only a few chunks per worker are in flight, so finished results never
+    # pile up in memory ahead of the consumer; yielding in submission order
+    # keeps the output identical to a serial run.
+    max_pending = workers * 4
+    # Imported here: it pulls in multiprocessing, which serial runs never need.
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque[Future[ChunkResult]] = deque()
+        entries = iter(files)
+        while chunk := list(itertools.islice(entries, chunksize)):
+            pending.append(executor.submit(function, chunk, *args))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _iter_records(
+    files: list[DiscoveredFile], jobs: int, options: ExtractOptions | None = None, io_threads: int = 0
+) -> Iterator[tuple[bool, dict]]:
+    if jobs <= 1 or len(files) <= 1:
+        yield from _iter_prefetched(files, options, io_threads)
+        return
+
+    workers = min(jobs, len(files))
+    # Large enough chunks to amortise IPC, small enough to keep workers balanced.
+    chunksize = max(1, min(64, len(files) // (workers * 8)))
+    for records in map_chunks(_extract_chunk, files, workers, chunksize, options, io_threads):
+        yield from records
+
+
+def _dispatch_timings(
+    outcomes: Iterable[tuple[bool, dict]], hooks: Sequence[BatchHook]
+) -> Iterator[tuple[bool, dict]]:
+    for ok, item in outcomes:
+        timings = item.pop("_timings", None)
+        if timings is not None:
+            for hook in hooks:
+                hook.on_file(item["file_path"], timings)
+        yield ok, item
+
 
-    for file_path in files:
-        try:
-            result, warnings = extract_image_metadata(file_path)
-            record = {
-                "file_path": result.file_path,
-                "format": result.format,
-                "size_bytes": result.size_bytes,
-                "dimensions": result.dimensions,
-                "exif": result.exif,
-                "comfyui": result.comfyui,
-                "raw_metadata": result.raw_metadata,
-            }
-            if warnings:
-                record["warnings"] = warnings
-
-            results.append(record)
+def extract_files(
+    files: list[DiscoveredFile], jobs: int = 1, options: ExtractOptions | None = None, io_threads: int = 0
+) -> Iterator[tuple[bool, dict]]:
+    return _iter_records(files, resolve_jobs(jobs), options, io_threads)
+
+
+def _iter_cached(
+    files: list[DiscoveredFile],
+    jobs: int,
+    cache: ExtractionCache,
+    input_path: Path,
+    recursive: bool,
+    options: ExtractOptions | None,
+    hooks: Sequence[BatchHook] = (),
+    io_threads: int = 0,
+    evict: bool = True,
+    shard: Shard | None = None,
+) -> Iterator[tuple[bool, dict]]:
+    # Keys reuse the stat data from discovery; the input root is resolved once
+    # instead of resolving every file. ``evict`` is off when ``files`` is only
+    # part of the input (the rest coming from a journal).
+    cache.variant = options_variant(options)
+    root = input_path.resolve()
+    is_dir = input_path.is_dir()
+    keys: list[CacheKey] = [
+        (os.path.join(root, entry.relative_path) if is_dir else str(root), entry.size, entry.mtime_ns)
+        for entry in files
+    ]
+    hits = [cache.contains(key) for key in keys]
+    fresh = _iter_records([entry for entry, hit in zip(files, hits) if not hit], jobs, options, io_threads)
+    if hooks:
+        fresh = _dispatch_timings(fresh, hooks)
+
+    for entry, key, hit in zip(files, keys, hits):
+        record = cache.load(key) if hit else None
+        if record is not None:
+            record["file_path"] = str(entry.path)
+            yield True, record
+            continue
+
+        if hit:
+            # The row was evicted by another run or is damaged. The file is
+            # not among ``fresh`` (that would misalign every later miss), so
+            # it is extracted here.
+            cache.misses += 1
+            outcome = iter([_extract_record(entry, options)])
+            ok, item = next(_dispatch_timings(outcome, hooks) if hooks else outcome)
+        else:
+            ok, item = next(fresh)
+        if ok:
+            cache.store(key, item)
+        yield ok, item
+
+    if is_dir and evict:
+        cache.evict_missing(root, recursive, {key[0] for key in keys}, shard)
+    cache.commit()
+
+
+def _iter_journaled(
+    files: list[DiscoveredFile],
+    journal: ExtractionJournal,
+    extract: Callable[[list[DiscoveredFile]], Iterator[tuple[bool, dict]]],
+) -> Iterator[tuple[bool, dict]]:
+    # Files already in the journal are replayed from it; the rest go through
+    # ``extract`` and are journaled as they finish, before anything downstream
+    # (such as relative path rewriting) touches them.
+    done = [journal.contains(str(entry.path), entry.size, entry.mtime_ns) for entry in files]
+    fresh = extract([entry for entry, hit in zip(files, done) if not hit])
+    for entry, hit in zip(files, done):
+        if hit:
+            yield journal.load(str(entry.path))
+            continue
+        ok, item = next(fresh)
+        journal.append(str(entry.path), entry.size, entry.mtime_ns, ok, item)
+        yield ok, item
+
+
+def _count_outcomes(
+    files: list[DiscoveredFile],
+    outcomes: Iterable[tuple[bool, dict]],
+    totals: RunTotals,
+    relative_paths: bool,
+) -> Iterator[tuple[bool, dict]]:
+    # Outcomes arrive in discovery order, so each lines up with its entry.
+    # Outcomes are pulled first so the source generator runs to its end (where
+    # the cache evicts and commits) instead of being left suspended.
+    for (ok, item), entry in zip(outcomes, files):
+        if relative_paths:
+            item["file_path"] = entry.relative_path
+        if ok:
             totals.processed_ok += 1
-        except Exception as exc:  # Keep running in batch mode.
+        else:
             totals.failed += 1
-            errors.append(
-                {
-                    "file_path": str(file_path),
-                    "error_type": type(exc).__name__,
-                    "message": str(exc),
-                }
+        yield ok, item
+
+
+def iter_batch(
+    input_path: Path,
+    recursive: bool,
+    totals: RunTotals,
+    jobs: int = 1,
+    cache: ExtractionCache | None = None,
+    relative_paths: bool = False,
+    options: ExtractOptions | None = None,
+    hooks: Sequence[BatchHook] = (),
+    io_threads: int = 0,
+    journal: ExtractionJournal | None = None,
+    shard: Shard | None = None,
+) -> Iterator[tuple[bool, dict]]:
+    # Discovery runs eagerly so a bad input path raises here, not on first next().
+    # Records are yielded as (ok, record_or_error) while totals fills in. With
+    # relative_paths, directory inputs report paths relative to input_path.
+    # Hooks get discovery time and per-file stage timings (see profiling.BatchHook).
+    # io_threads > 0 prefetches file headers on that many threads (per worker
+    # process when jobs > 1). With a journal, files it already holds are
+    # replayed instead of extracted and new outcomes are appended to it. A
+    # shard restricts the run to one hash bucket of the input (see
+    # discovery.in_shard); totals then count that shard only.
+    if hooks:
+        options = replace(options or ExtractOptions(), collect_timings=True)
+    started = time.perf_counter()
+    files, skipped = scan_files(input_path, recursive=recursive, shard=shard)
+    for hook in hooks:
+        hook.on_stage("discover", time.perf_counter() - started)
+    totals.discovered = len(files)
+    totals.skipped_unsupported = skipped
+    if journal is not None:
+        run = {
+            "input": str(input_path.resolve()),
+            "recursive": bool(recursive),
+            "options": options_variant(options),
+        }
+        if shard is not None:
+            run["shard"] = format_shard(shard)
+        journal.start(run)
+
+    def extract(pending: list[DiscoveredFile]) -> Iterator[tuple[bool, dict]]:
+        if cache is not None:
+            return _iter_cached(
+                pending,
+                resolve_jobs(jobs),
+                cache,
+                input_path,
+                recursive,
+                options,
+                hooks,
+                io_threads,
+                evict=journal is None,
+                shard=shard,
             )
+        outcomes = _iter_records(pending, resolve_jobs(jobs), options, io_threads)
+        return _dispatch_timings(outcomes, hooks) if hooks else outcomes
+
+    if journal is not None:
+        outcomes = _iter_journaled(files, journal, extract)
+    else:
+        outcomes = extract(files)
+    return _count_outcomes(files, outcomes, totals, relative_paths)
+
+
+def process_batch(
+    input_path: Path,
+    recursive: bool,
+    jobs: int = 1,
+    cache: ExtractionCache | None = None,
+    relative_paths: bool = False,
+    options: ExtractOptions | None = None,
+    hooks: Sequence[BatchHook] = (),
+    io_threads: int = 0,
+    journal: ExtractionJournal | None = None,
+    shard: Shard | None = None,
+) -> tuple[list[dict], list[dict], RunTotals]:
+    totals = RunTotals()
+    results: list[dict] = []
+    errors: list[dict] = []
+
+    outcomes = iter_batch(
+        input_path,
+        recursive,
+        totals,
+        jobs=jobs,
+        cache=cache,
+        relative_paths=relative_paths,
+        options=options,
+        hooks=hooks,
+        io_threads=io_threads,
+        journal=journal,
+        shard=shard,
+    )
+    for ok, item in outcomes:
+        if ok:
+            results.append(item)
+        else:
+            errors.append(item)
 
     return results, errors, totals
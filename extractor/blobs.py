@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+# Record sections and keys whose values are stored once in the blob table.
+BLOB_SECTIONS = ("comfyui", "raw_metadata")
+BLOB_KEYS = {"prompt", "workflow"}
+
+
+def blob_hash(value: Any) -> str:
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def make_blob_ref(digest: str) -> dict[str, str]:
+    return {"_type": "blob_ref", "sha256": digest}
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("_type") == "blob_ref" and "sha256" in value
+
+
+class BlobTable:
+    # Content-addressed store for large workflow/prompt values shared by many
+    # records; records keep only a {"_type": "blob_ref", "sha256": ...} stub.
+    def __init__(self) -> None:
+        self.blobs: dict[str, Any] = {}
+
+    def dedupe_record(self, record: dict) -> list[str]:
+        # Replaces blob values in ``record`` in place and returns the digests
+        # that were new to the table.
+        added: list[str] = []
+        for section_name in BLOB_SECTIONS:
+            section = record.get(section_name)
+            if not isinstance(section, dict):
+                continue
+            for key, value in section.items():
+                if key.lower() not in BLOB_KEYS or value is None or is_blob_ref(value):
+                    continue
+                digest = blob_hash(value)
+                if digest not in self.blobs:
+                    self.blobs[digest] = value
+                    added.append(digest)
+                section[key] = make_blob_ref(digest)
+        return added
+
+
+def has_blob_refs(record: dict) -> bool:
+    for section_name in BLOB_SECTIONS:
+        section = record.get(section_name)
+        if isinstance(section, dict) and any(is_blob_ref(value) for value in section.values()):
+            return True
+    return False
+
+
+def resolve_blob_refs(record: dict, blobs: dict[str, Any]) -> dict:
+    for section_name in BLOB_SECTIONS:
+        section = record.get(section_name)
+        if not isinstance(section, dict):
+            continue
+        for key, value in section.items():
+            if is_blob_ref(value) and value["sha256"] in blobs:
+                section[key] = blobs[value["sha256"]]
+    return record
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, replace
+from pathlib import Path
+
+from extractor import __version__, jsonio
+from extractor.discovery import Shard, in_shard
+from extractor.models import ExtractOptions
+
+# (resolved path, size in bytes, mtime in ns)
+CacheKey = tuple[str, int, int]
+
+COMMIT_EVERY = 1000
+SCHEMA_VERSION = "2"
+
+
+def options_variant(options: ExtractOptions | None) -> str:
+    # Records extracted with different options (field projection, raw dedupe,
+    # base64 cap) are cached side by side under their own variant.
+    if options is None:
+        return ""
+    # Collecting timings does not change what is extracted.
+    options = replace(options, collect_timings=False)
+    if options == ExtractOptions():
+        return ""
+    fields = asdict(options)
+    del fields["collect_timings"]
+    return json.dumps(fields, sort_keys=True)
+
+
+class ExtractionCache:
+    # Extracted records from earlier runs, reused while a file's size and mtime
+    # are unchanged. Entries written by another tool version are discarded on
+    # open, since extraction output may differ between versions. ``variant``
+    # selects the extraction options the stored records belong to.
+    def __init__(self, db_path: Path, variant: str = "") -> None:
+        import sqlite3
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path))
+        self._pending = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.variant = variant
+
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is None or row[0] != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS records")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,)
+            )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "path TEXT NOT NULL, variant TEXT NOT NULL, size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, record TEXT NOT NULL, PRIMARY KEY (path, variant))"
+        )
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'tool_version'").fetchone()
+        if row is None or row[0] != __version__:
+            self._conn.execute("DELETE FROM records")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('tool_version', ?)", (__version__,)
+            )
+        self._conn.commit()
+
+    def __enter__(self) -> ExtractionCache:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def contains(self, key: CacheKey) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM records WHERE path = ? AND size = ? AND mtime_ns = ? AND variant = ?",
+            (*key, self.variant),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return False
+        return True
+
+    def load(self, key: CacheKey) -> dict | None:
+        row = self._conn.execute(
+            "SELECT record FROM records WHERE path = ? AND size = ? AND mtime_ns = ? AND variant = ?",
+            (*key, self.variant),
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            record = jsonio.loads(row[0])
+        except ValueError:
+            # A damaged row; the caller extracts the file again.
+            return None
+        self.hits += 1
+        return record
+
+    def store(self, key: CacheKey, record: dict) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO records (path, size, mtime_ns, variant, record) VALUES (?, ?, ?, ?, ?)",
+            (*key, self.variant, jsonio.dumps(record)),
+        )
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def evict_missing(self, root: Path, recursive: bool, seen: set[str], shard: Shard | None = None) -> int:
+        # Drops entries under the resolved ``root`` whose files were not
+        # discovered this run, whatever variant they were stored under. A
+        # sharded run only evicts entries of its own shard.
+        prefix = str(root).rstrip(os.sep) + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        rows = self._conn.execute(
+            "SELECT DISTINCT path FROM records WHERE path >= ? AND path < ?", (prefix, upper)
+        ).fetchall()
+
+        stale = []
+        for (path,) in rows:
+            if path in seen:
+                continue
+            relative = path[len(prefix) :]
+            if not recursive and os.sep in relative:
+                continue
+            if not in_shard(relative, shard):
+                continue
+            stale.append((path,))
+
+        self._conn.executemany("DELETE FROM records WHERE path = ?", stale)
+        self.evicted += len(stale)
+        self.commit()
+        return len(stale)
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
@@ -1,19 +1,91 @@
 from __future__ import annotations
 
 import argparse
-import json
 import sys
-import tempfile
-import webbrowser
-from datetime import datetime
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterator
 
-from extractor import __version__
-from extractor.batch import process_batch
-from extractor.report_html import write_report_html
+from extractor import __version__, jsonio
+from extractor.batch import extract_files, iter_batch
+from extractor.blobs import BlobTable
+from extractor.cache import ExtractionCache
+from extractor.defaults import (
+    DEFAULT_CACHE_MB,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_HOST,
+    DEFAULT_MIN_SIZE,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_PORT,
+    DEFAULT_SHARD_SIZE,
+    DEFAULT_TOP,
+    VIRTUAL_THRESHOLD,
+)
+from extractor.discovery import Shard, format_shard, parse_shard
+from extractor.journal import ExtractionJournal, JournalMismatchError
+from extractor.models import ExtractOptions, RunTotals
+from extractor.profiling import Profiler
+from extractor.projection import SUMMARY_ONLY_FIELDS, parse_fields
+from extractor.readers import iter_output_records
 from extractor.serialization import utc_now_iso8601
+from extractor.writers import NdjsonWriter, write_json_payload
+
+if TYPE_CHECKING:
+    from extractor.store import ResultStore
 
 SUPPORTED_FORMATS = ["png", "jpg", "jpeg", "webp"]
+SUBCOMMANDS = {"extract", "watch", "index", "query", "report", "merge", "serve", "stats", "group"}
+
+
+def _positive_float(value: str) -> float:
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}") from None
+    if number <= 0:
+        raise argparse.ArgumentTypeError("must be greater than 0")
+    return number
+
+
+def _positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value!r}") from None
+    if number <= 0:
+        raise argparse.ArgumentTypeError("must be greater than 0")
+    return number
+
+
+def _non_negative_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value!r}") from None
+    if number < 0:
+        raise argparse.ArgumentTypeError("must be 0 or greater")
+    return number
+
+
+def _shard_spec(value: str) -> Shard:
+    try:
+        return parse_shard(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
+def _key_list(value: str) -> tuple[str, ...]:
+    keys = tuple(part.strip() for part in value.split(",") if part.strip())
+    if not keys:
+        raise argparse.ArgumentTypeError("no keys given")
+    return keys
+
+
+def _field_list(value: str) -> tuple[str, ...]:
+    try:
+        return parse_fields(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -32,6 +104,13 @@ def build_parser() -> argparse.ArgumentParser:
     extract_cmd = subparsers.add_parser("extract", help="Extract metadata from file/folder")
     extract_cmd.add_argument("--input", required=True, help="Input file or directory")
     extract_cmd.add_argument("--output", required=True, help="Output JSON path")
+    extract_cmd.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="Output format: one JSON document, or NDJSON streamed record by record "
+        "with the summary as the last line (default: json)",
+    )
     extract_cmd.add_argument(
         "--recursive",
         action="store_true",
@@ -47,14 +126,322 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Write file paths as relative to the input path when possible",
     )
+    extract_cmd.add_argument(
+        "--jobs",
+        type=_non_negative_int,
+        default=1,
+        help="Worker processes for extraction (0 = one per CPU core, default: 1)",
+    )
+    extract_cmd.add_argument(
+        "--io-threads",
+        type=_non_negative_int,
+        default=0,
+        help="Threads that read file headers ahead of parsing, for slow or network "
+        "storage (per worker process with --jobs; default: 0 = read inline)",
+    )
+    extract_cmd.add_argument(
+        "--dedupe-blobs",
+        action="store_true",
+        help="Store each distinct prompt/workflow value once in a top-level blob table "
+        "and reference it from records by SHA-256",
+    )
+    extract_cmd.add_argument(
+        "--cache",
+        help="SQLite cache of extracted records; unchanged files (same size and mtime) "
+        "are not re-extracted and entries for deleted files are evicted",
+    )
+    extract_cmd.add_argument(
+        "--shard",
+        type=_shard_spec,
+        metavar="I/N",
+        help="Only extract shard I of N (counted from 1): a stable hash of each file's "
+        "relative path picks its shard, so N machines can split one input; combine "
+        "the outputs with 'merge'",
+    )
+    extract_cmd.add_argument(
+        "--journal",
+        metavar="PATH",
+        help="Append each finished record or error to this journal as the run goes "
+        "(default with --resume: OUTPUT.journal); removed once the output is written",
+    )
+    extract_cmd.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run: files already in the journal (same size and "
+        "mtime) are not extracted again",
+    )
+    field_group = extract_cmd.add_mutually_exclusive_group()
+    field_group.add_argument(
+        "--fields",
+        type=_field_list,
+        help="Comma-separated record fields to keep, e.g. comfyui.prompt,dimensions; "
+        "sections not listed are never built (file_path is always kept)",
+    )
+    field_group.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="Write only format, size, dimensions and comfyui.summary; the full "
+        "prompt/workflow graphs and raw metadata are left out",
+    )
+    extract_cmd.add_argument(
+        "--summary",
+        action="store_true",
+        help="Add comfyui.summary: checkpoint, LoRAs, seed, steps, cfg, sampler, "
+        "scheduler, resolution and prompt text resolved from the prompt graph or "
+        "A1111 parameters",
+    )
+    extract_cmd.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Add comfyui.fingerprint: hashes of the prompt graph's structure and of its "
+        "settings without seeds and prompt text, independent of node ids; see 'group'",
+    )
+    extract_cmd.add_argument(
+        "--keys",
+        type=_key_list,
+        help="Comma-separated metadata keys to load, e.g. prompt; PNG text chunks with "
+        "other keywords are skipped without decompression and listed under unloaded_keys",
+    )
+    extract_cmd.add_argument(
+        "--dedupe-raw",
+        action="store_true",
+        help="Drop raw_metadata entries whose JSON is already decoded under comfyui",
+    )
+    extract_cmd.add_argument(
+        "--max-base64-bytes",
+        type=_non_negative_int,
+        help="Replace binary values larger than this (ICC profiles, raw EXIF, ...) "
+        "with their size instead of base64-encoding them",
+    )
+    extract_cmd.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Time each stage per file and write percentiles, histograms and the "
+        "slowest files to this JSON sidecar",
+    )
+
+    watch_cmd = subparsers.add_parser(
+        "watch", help="Watch a folder and extract new images as they are written"
+    )
+    watch_cmd.add_argument("--input", required=True, help="Directory to watch")
+    watch_cmd.add_argument("--output", required=True, help="NDJSON file that records are appended to")
+    watch_cmd.add_argument(
+        "--recursive",
+        action="store_true",
+        help="Also watch subdirectories",
+    )
+    watch_cmd.add_argument(
+        "--relative-paths",
+        action="store_true",
+        help="Write file paths as relative to the watched directory",
+    )
+    watch_cmd.add_argument(
+        "--initial",
+        action="store_true",
+        help="Extract the images already in the folder before watching",
+    )
+    watch_cmd.add_argument(
+        "--debounce",
+        type=_positive_float,
+        default=DEFAULT_DEBOUNCE,
+        help=f"Seconds a file must stay unchanged before it is extracted (default: {DEFAULT_DEBOUNCE})",
+    )
+    watch_cmd.add_argument(
+        "--poll-interval",
+        type=_positive_float,
+        default=DEFAULT_POLL_INTERVAL,
+        help=f"Seconds between checks when inotify is unavailable (default: {DEFAULT_POLL_INTERVAL})",
+    )
+    watch_cmd.add_argument(
+        "--polling",
+        action="store_true",
+        help="Use mtime polling even where inotify is available",
+    )
+
+    merge_cmd = subparsers.add_parser(
+        "merge", help="Combine extract outputs, e.g. the shards of an --shard run, into one"
+    )
+    merge_cmd.add_argument(
+        "--input", required=True, nargs="+", help="extract output files, JSON or NDJSON"
+    )
+    merge_cmd.add_argument("--output", required=True, help="Merged output file path")
+    merge_cmd.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="Output format (default: json)",
+    )
+    merge_cmd.add_argument(
+        "--dedupe-blobs",
+        action="store_true",
+        help="Store each distinct prompt/workflow value once, as extract --dedupe-blobs does",
+    )
+
+    serve_cmd = subparsers.add_parser(
+        "serve", help="Run a local HTTP service that extracts on request, with results kept in memory"
+    )
+    serve_cmd.add_argument("--host", default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST})")
+    serve_cmd.add_argument(
+        "--port", type=_non_negative_int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})"
+    )
+    serve_cmd.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Listen on this Unix socket instead of TCP (not available on Windows)",
+    )
+    serve_cmd.add_argument(
+        "--cache-mb",
+        type=_non_negative_int,
+        default=DEFAULT_CACHE_MB,
+        help=f"Memory for cached results, keyed by path and mtime (default: {DEFAULT_CACHE_MB}; 0 disables)",
+    )
+    serve_cmd.add_argument(
+        "--io-threads",
+        type=_non_negative_int,
+        default=0,
+        help="Threads that read file headers ahead of parsing within a batch request (default: 0)",
+    )
+
+    stats_cmd = subparsers.add_parser(
+        "stats", help="Summarize a folder or extract outputs: formats, models, samplers, sizes"
+    )
+    stats_source = stats_cmd.add_mutually_exclusive_group(required=True)
+    stats_source.add_argument("--input", help="Image file or directory to scan")
+    stats_source.add_argument(
+        "--results", nargs="+", metavar="PATH", help="extract output file(s), JSON or NDJSON, instead of images"
+    )
+    stats_cmd.add_argument(
+        "--recursive",
+        action="store_true",
+        help="Recursively process files when input is a directory",
+    )
+    stats_cmd.add_argument(
+        "--jobs",
+        type=_non_negative_int,
+        default=1,
+        help="Worker processes, each aggregating its own files (0 = one per CPU core, default: 1)",
+    )
+    stats_cmd.add_argument(
+        "--io-threads",
+        type=_non_negative_int,
+        default=0,
+        help="Threads that read file headers ahead of parsing (per worker process; default: 0)",
+    )
+    stats_cmd.add_argument(
+        "--shard",
+        type=_shard_spec,
+        metavar="I/N",
+        help="Only count shard I of N, the same files extract --shard I/N would process",
+    )
+    stats_cmd.add_argument(
+        "--top",
+        type=_non_negative_int,
+        default=DEFAULT_TOP,
+        help=f"Most common values listed per counter (default: {DEFAULT_TOP}; 0 lists all)",
+    )
+    stats_cmd.add_argument("--json", action="store_true", help="Print the summary as JSON instead of text")
+    stats_cmd.add_argument("--output", help="Also write the summary as JSON to this path")
+
+    group_cmd = subparsers.add_parser(
+        "group", help="Bucket images made with the same workflow by their prompt graph fingerprint"
+    )
+    group_source = group_cmd.add_mutually_exclusive_group(required=True)
+    group_source.add_argument("--input", help="Image file or directory to scan")
+    group_source.add_argument(
+        "--results",
+        nargs="+",
+        metavar="PATH",
+        help="extract output file(s), JSON or NDJSON, written with --fingerprint or keeping comfyui.prompt",
+    )
+    group_cmd.add_argument(
+        "--by",
+        choices=["parameters", "structure"],
+        default="parameters",
+        help="parameters: same graph and settings, any seed or prompt text; structure: same "
+        "nodes and links, any settings (default: parameters)",
+    )
+    group_cmd.add_argument(
+        "--min-size",
+        type=_positive_int,
+        default=DEFAULT_MIN_SIZE,
+        help=f"Smallest group listed (default: {DEFAULT_MIN_SIZE}; 1 lists every fingerprint)",
+    )
+    group_cmd.add_argument(
+        "--recursive",
+        action="store_true",
+        help="Recursively process files when input is a directory",
+    )
+    group_cmd.add_argument(
+        "--jobs",
+        type=_non_negative_int,
+        default=1,
+        help="Worker processes for extraction (0 = one per CPU core, default: 1)",
+    )
+    group_cmd.add_argument(
+        "--io-threads",
+        type=_non_negative_int,
+        default=0,
+        help="Threads that read file headers ahead of parsing (per worker process; default: 0)",
+    )
+    group_cmd.add_argument(
+        "--shard",
+        type=_shard_spec,
+        metavar="I/N",
+        help="Only group shard I of N, the same files extract --shard I/N would process",
+    )
+    group_cmd.add_argument("--json", action="store_true", help="Print the groups as JSON instead of text")
+    group_cmd.add_argument("--output", help="Also write the groups as JSON to this path")
+
+    index_cmd = subparsers.add_parser("index", help="Load extract output into a SQLite index")
+    index_cmd.add_argument(
+        "--input", required=True, nargs="+", help="extract output file(s), JSON or NDJSON"
+    )
+    index_cmd.add_argument("--db", required=True, help="SQLite index path (created if missing)")
+
+    query_cmd = subparsers.add_parser("query", help="Find images in a SQLite index")
+    query_cmd.add_argument("--db", required=True, help="SQLite index built by 'index'")
+    query_cmd.add_argument("--checkpoint", help="Checkpoint name (ckpt_name); * and ? wildcards allowed")
+    query_cmd.add_argument("--lora", help="LoRA name; * and ? wildcards allowed")
+    query_cmd.add_argument("--class-type", help="Node class_type present in the prompt graph")
+    query_cmd.add_argument("--sampler", help="Sampler name")
+    query_cmd.add_argument("--scheduler", help="Scheduler name")
+    query_cmd.add_argument("--seed", type=int, help="Seed (seed or noise_seed input)")
+    query_cmd.add_argument("--steps", type=int, help="Sampling steps")
+    query_cmd.add_argument("--cfg", type=float, help="CFG scale")
+    query_cmd.add_argument("--format", dest="image_format", help="Image format, e.g. png")
+    query_cmd.add_argument("--min-width", type=int, help="Minimum width in pixels")
+    query_cmd.add_argument("--min-height", type=int, help="Minimum height in pixels")
+    query_cmd.add_argument("--limit", type=_non_negative_int, help="Maximum number of rows")
+    query_cmd.add_argument("--json", action="store_true", help="Print matches as JSON instead of paths")
+
+    report_cmd = subparsers.add_parser("report", help="Build an HTML report from an extract output file")
+    report_cmd.add_argument("--input", required=True, help="JSON or NDJSON written by 'extract'")
+    report_cmd.add_argument("--output", required=True, help="HTML report path")
+    report_cmd.add_argument(
+        "--mode",
+        choices=["auto", "classic", "virtual"],
+        default="auto",
+        help="classic renders every result up front; virtual renders rows lazily with "
+        f"virtual scrolling (default: auto, virtual above {VIRTUAL_THRESHOLD} results)",
+    )
+    report_cmd.add_argument(
+        "--shards",
+        action="store_true",
+        help="Write record details to numbered scripts in <output stem>_shards/ that the "
+        "page loads on demand (implies --mode virtual)",
+    )
+    report_cmd.add_argument(
+        "--shard-size",
+        type=_positive_int,
+        default=DEFAULT_SHARD_SIZE,
+        help=f"Records per shard file (default: {DEFAULT_SHARD_SIZE})",
+    )
 
     return parser
 
 
-def _build_payload(
+def _build_header(
     input_info: dict,
-    results: list[dict],
-    errors: list[dict],
     discovered: int,
     processed_ok: int,
     failed: int,
@@ -70,8 +457,6 @@ def _build_payload(
             "failed": failed,
             "skipped_unsupported": skipped_unsupported,
         },
-        "results": results,
-        "errors": errors,
     }
 
 
@@ -86,60 +471,246 @@ def _print_summary(discovered: int, processed_ok: int, failed: int, skipped_unsu
     )
 
 
-def _maybe_relativize_paths(payload: dict, input_path: Path) -> None:
-    if input_path.is_file():
+def _write_ndjson(
+    output_path: Path,
+    outcomes: Iterator[tuple[bool, dict]],
+    input_info: dict,
+    totals: RunTotals,
+    blobs: BlobTable | None,
+    profiler: Profiler | None = None,
+) -> None:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("w", encoding="utf-8") as f:
+        writer = NdjsonWriter(f)
+        for ok, item in outcomes:
+            started = time.perf_counter() if profiler is not None else 0.0
+            if ok:
+                writer.write_result(item, blobs)
+            else:
+                writer.write("error", item)
+            if profiler is not None:
+                profiler.on_stage("write", time.perf_counter() - started)
+
+        header = _build_header(
+            input_info,
+            discovered=totals.discovered,
+            processed_ok=totals.processed_ok,
+            failed=totals.failed,
+            skipped_unsupported=totals.skipped_unsupported,
+        )
+        writer.write("summary", header)
+
+
+def _print_cache_summary(cache: ExtractionCache | None) -> None:
+    if cache is None:
         return
+    print(f"Cache: hits={cache.hits} misses={cache.misses} evicted={cache.evicted}")
 
-    base = input_path.resolve()
 
-    for item in payload.get("results", []):
-        path = Path(item["file_path"])  # absolute from extraction step
-        try:
-            item["file_path"] = str(path.resolve().relative_to(base))
-        except Exception:
-            continue
+def _print_journal_summary(journal: ExtractionJournal | None) -> None:
+    if journal is None or not journal.resumed:
+        return
+    print(f"Journal: resumed={journal.resumed}")
+
+
+def _write_profile(profile_path: Path, profiler: Profiler) -> None:
+    summary = profiler.summary()
+    profile_path.parent.mkdir(parents=True, exist_ok=True)
+    profile_path.write_bytes(jsonio.dumps_bytes(summary, pretty=True))
+    print(f"Profile: {profile_path}")
+    for stage, seconds in summary["run_stages_s"].items():
+        print(f"  {stage}: {seconds:.3f}s")
+    for stage, stats in summary["file_stages"].items():
+        print(
+            f"  {stage}: p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+            f"p99={stats['p99_ms']}ms total={stats['total_s']}s"
+        )
 
-    for item in payload.get("errors", []):
-        path = Path(item["file_path"])
-        try:
-            item["file_path"] = str(path.resolve().relative_to(base))
-        except Exception:
-            continue
+
+def _input_info(args: argparse.Namespace, input_path: Path) -> dict:
+    info = {
+        "path": str(input_path),
+        "recursive": bool(args.recursive),
+        "formats": SUPPORTED_FORMATS,
+    }
+    if args.shard is not None:
+        info["shard"] = format_shard(args.shard)
+    return info
+
+
+def _extract_options(args: argparse.Namespace) -> ExtractOptions:
+    fields = SUMMARY_ONLY_FIELDS if args.summary_only else args.fields
+    return ExtractOptions(
+        fields=fields,
+        summary=args.summary or (fields is not None and "comfyui.summary" in fields),
+        fingerprint=args.fingerprint or (fields is not None and "comfyui.fingerprint" in fields),
+        keys=args.keys,
+        dedupe_raw=args.dedupe_raw,
+        max_base64_bytes=args.max_base64_bytes,
+    )
 
 
 def run_extract(args: argparse.Namespace) -> int:
     input_path = Path(args.input)
     output_path = Path(args.output)
 
+    cache: ExtractionCache | None = None
+    if args.cache:
+        try:
+            cache = ExtractionCache(Path(args.cache))
+        except Exception as exc:
+            print(f"Error: cannot open cache {args.cache}: {exc}", file=sys.stderr)
+            return 1
+
+    journal: ExtractionJournal | None = None
+    if args.journal or args.resume:
+        journal_path = Path(args.journal) if args.journal else output_path.with_name(output_path.name + ".journal")
+        try:
+            journal = ExtractionJournal(journal_path, resume=args.resume)
+        except Exception as exc:
+            print(f"Error: cannot open journal {journal_path}: {exc}", file=sys.stderr)
+            if cache is not None:
+                cache.close()
+            return 1
+
+    profiler = Profiler() if args.profile else None
     try:
-        results, errors, totals = process_batch(input_path=input_path, recursive=args.recursive)
-    except FileNotFoundError as exc:
+        if args.format == "ndjson":
+            code = _run_extract_ndjson(args, input_path, output_path, cache, profiler, journal)
+        else:
+            code = _run_extract_json(args, input_path, output_path, cache, profiler, journal)
+        if profiler is not None and code != 1:
+            _write_profile(Path(args.profile), profiler)
+        if journal is not None and code != 1:
+            # The output now holds everything the journal did.
+            journal.discard()
+        return code
+    finally:
+        if cache is not None:
+            cache.close()
+        if journal is not None:
+            journal.close()
+
+
+def _collect(
+    outcomes: Iterator[tuple[bool, dict]],
+    store: ResultStore,
+    errors: list[dict],
+    blobs: BlobTable | None = None,
+) -> None:
+    for ok, item in outcomes:
+        if ok:
+            if blobs is not None:
+                blobs.dedupe_record(item)
+            store.append(item)
+        else:
+            errors.append(item)
+
+
+def _run_extract_json(
+    args: argparse.Namespace,
+    input_path: Path,
+    output_path: Path,
+    cache: ExtractionCache | None,
+    profiler: Profiler | None = None,
+    journal: ExtractionJournal | None = None,
+) -> int:
+    # The payload starts with the totals, so results are held until the run
+    # ends, compactly in a ResultStore.
+    from extractor.store import ResultStore
+
+    totals = RunTotals()
+    store = ResultStore()
+    errors: list[dict] = []
+    blobs = BlobTable() if args.dedupe_blobs else None
+    try:
+        outcomes = iter_batch(
+            input_path,
+            args.recursive,
+            totals,
+            jobs=args.jobs,
+            cache=cache,
+            relative_paths=args.relative_paths,
+            options=_extract_options(args),
+            hooks=[profiler] if profiler is not None else (),
+            io_threads=args.io_threads,
+            journal=journal,
+            shard=args.shard,
+        )
+        _collect(outcomes, store, errors, blobs)
+    except (FileNotFoundError, JournalMismatchError) as exc:
         print(f"Error: {exc}", file=sys.stderr)
         return 1
     except Exception as exc:
         print(f"Unexpected runtime error: {exc}", file=sys.stderr)
         return 1
 
-    payload = _build_payload(
-        input_info={
-            "path": str(input_path),
-            "recursive": bool(args.recursive),
-            "formats": SUPPORTED_FORMATS,
-        },
-        results=results,
-        errors=errors,
+    header = _build_header(
+        _input_info(args, input_path),
         discovered=totals.discovered,
         processed_ok=totals.processed_ok,
         failed=totals.failed,
         skipped_unsupported=totals.skipped_unsupported,
     )
 
-    if args.relative_paths:
-        _maybe_relativize_paths(payload, input_path=input_path)
-
+    started = time.perf_counter()
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(payload, f, indent=2 if args.pretty else None, ensure_ascii=False)
+    with output_path.open("wb") as f:
+        write_json_payload(
+            f, header, store, errors, blobs.blobs if blobs is not None else None, pretty=args.pretty
+        )
+    if profiler is not None:
+        profiler.on_stage("write", time.perf_counter() - started)
+
+    print("Extraction complete")
+    print(f"Output: {output_path}")
+    _print_summary(
+        discovered=totals.discovered,
+        processed_ok=totals.processed_ok,
+        failed=totals.failed,
+        skipped_unsupported=totals.skipped_unsupported,
+    )
+    _print_cache_summary(cache)
+    _print_journal_summary(journal)
+
+    if totals.processed_ok == 0:
+        return 2
+    return 0
+
+
+def _run_extract_ndjson(
+    args: argparse.Namespace,
+    input_path: Path,
+    output_path: Path,
+    cache: ExtractionCache | None,
+    profiler: Profiler | None = None,
+    journal: ExtractionJournal | None = None,
+) -> int:
+    totals = RunTotals()
+    input_info = _input_info(args, input_path)
+
+    try:
+        outcomes = iter_batch(
+            input_path,
+            args.recursive,
+            totals,
+            jobs=args.jobs,
+            cache=cache,
+            relative_paths=args.relative_paths,
+            options=_extract_options(args),
+            hooks=[profiler] if profiler is not None else (),
+            io_threads=args.io_threads,
+            journal=journal,
+            shard=args.shard,
+        )
+        blobs = BlobTable() if args.dedupe_blobs else None
+        _write_ndjson(output_path, outcomes, input_info, totals, blobs, profiler)
+    except (FileNotFoundError, JournalMismatchError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    except Exception as exc:
+        print(f"Unexpected runtime error: {exc}", file=sys.stderr)
+        return 1
 
     print("Extraction complete")
     print(f"Output: {output_path}")
@@ -149,14 +720,307 @@ def run_extract(args: argparse.Namespace) -> int:
         failed=totals.failed,
         skipped_unsupported=totals.skipped_unsupported,
     )
+    _print_cache_summary(cache)
+    _print_journal_summary(journal)
+
+    if totals.processed_ok == 0:
+        return 2
+    return 0
+
+
+def run_watch(args: argparse.Namespace) -> int:
+    from extractor.watch import FolderWatcher
+
+    input_path = Path(args.input)
+    output_path = Path(args.output)
 
+    try:
+        watcher = FolderWatcher(
+            input_path,
+            recursive=args.recursive,
+            debounce=args.debounce,
+            poll_interval=args.poll_interval,
+            use_inotify=not args.polling,
+        )
+    except FileNotFoundError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    processed_ok = 0
+    failed = 0
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    print(f"Watching {input_path} ({watcher.backend}); appending to {output_path}. Press Ctrl+C to stop.")
+
+    try:
+        with output_path.open("a", encoding="utf-8") as f:
+            writer = NdjsonWriter(f)
+            batch = watcher.initial_files if args.initial else []
+            while True:
+                for entry, (ok, item) in zip(batch, extract_files(batch)):
+                    if args.relative_paths:
+                        item["file_path"] = entry.relative_path
+                    if ok:
+                        processed_ok += 1
+                        writer.write("result", item)
+                    else:
+                        failed += 1
+                        writer.write("error", item)
+                if batch:
+                    f.flush()
+                batch = watcher.next_ready()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+    print(f"Watch stopped: processed_ok={processed_ok} failed={failed}")
+    return 0
+
+
+def run_merge(args: argparse.Namespace) -> int:
+    inputs = [Path(raw_path) for raw_path in args.input]
+    missing = [path for path in inputs if not path.is_file()]
+    if missing:
+        print(f"Error: Input file does not exist: {missing[0]}", file=sys.stderr)
+        return 1
+
+    from extractor.merge import merge_outputs
+
+    output_path = Path(args.output)
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with output_path.open("w", encoding="utf-8") as f:
+            totals, warnings = merge_outputs(
+                inputs, f, ndjson=args.format == "ndjson", dedupe_blobs=args.dedupe_blobs
+            )
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    except Exception as exc:
+        print(f"Unexpected runtime error: {exc}", file=sys.stderr)
+        return 1
+
+    for warning in warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
+    print("Merge complete")
+    print(f"Output: {output_path}")
+    _print_summary(
+        discovered=totals.discovered,
+        processed_ok=totals.processed_ok,
+        failed=totals.failed,
+        skipped_unsupported=totals.skipped_unsupported,
+    )
     if totals.processed_ok == 0:
         return 2
     return 0
 
 
+def _run_aggregate(
+    args: argparse.Namespace,
+    from_outputs: Callable[[list[Path]], Any],
+    from_images: Callable[[], Any],
+    to_report: Callable[[Any], dict],
+    format_report: Callable[[dict], str],
+) -> int:
+    # Shared by stats and group: aggregate extract outputs (--results) or the
+    # images under --input, then print the report and optionally save it.
+    try:
+        if args.results:
+            inputs = [Path(raw_path) for raw_path in args.results]
+            missing = [path for path in inputs if not path.is_file()]
+            if missing:
+                print(f"Error: Input file does not exist: {missing[0]}", file=sys.stderr)
+                return 1
+            aggregate = from_outputs(inputs)
+        else:
+            aggregate = from_images()
+    except FileNotFoundError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    except Exception as exc:
+        print(f"Unexpected runtime error: {exc}", file=sys.stderr)
+        return 1
+
+    report = to_report(aggregate)
+    if args.output:
+        output_path = Path(args.output)
+        try:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_text(jsonio.dumps(report, pretty=True), encoding="utf-8")
+        except OSError as exc:
+            print(f"Error: cannot write {output_path}: {exc}", file=sys.stderr)
+            return 1
+    print(jsonio.dumps(report, pretty=True) if args.json else format_report(report))
+    if aggregate.processed_ok == 0:
+        return 2
+    return 0
+
+
+def run_stats(args: argparse.Namespace) -> int:
+    from extractor.stats import collect_stats, format_stats, stats_from_outputs
+
+    return _run_aggregate(
+        args,
+        from_outputs=stats_from_outputs,
+        from_images=lambda: collect_stats(
+            Path(args.input), args.recursive, jobs=args.jobs, io_threads=args.io_threads, shard=args.shard
+        ),
+        to_report=lambda stats: stats.to_dict(top=args.top or None),
+        format_report=format_stats,
+    )
+
+
+def run_group(args: argparse.Namespace) -> int:
+    from extractor.grouping import collect_groups, format_groups, groups_from_outputs
+
+    return _run_aggregate(
+        args,
+        from_outputs=lambda inputs: groups_from_outputs(inputs, by=args.by),
+        from_images=lambda: collect_groups(
+            Path(args.input),
+            args.recursive,
+            by=args.by,
+            jobs=args.jobs,
+            io_threads=args.io_threads,
+            shard=args.shard,
+        ),
+        to_report=lambda groups: groups.to_dict(min_size=args.min_size),
+        format_report=format_groups,
+    )
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    from extractor.server import ExtractService, make_server
+
+    service = ExtractService(cache_bytes=args.cache_mb * 1024 * 1024, io_threads=args.io_threads)
+    where = args.socket or f"{args.host}:{args.port}"
+    try:
+        server = make_server(service, host=args.host, port=args.port, socket_path=args.socket)
+    except OSError as exc:
+        print(f"Error: cannot listen on {where}: {exc}", file=sys.stderr)
+        return 1
+
+    if args.socket:
+        print(f"Serving on unix socket {args.socket}")
+    else:
+        host, port = server.server_address[:2]  # type: ignore[misc]
+        print(f"Serving on http://{host}:{port}")
+    print("Press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket:
+            Path(args.socket).unlink(missing_ok=True)
+
+    stats = service.cache.stats()
+    print(f"Serve stopped: cache_hits={stats['hits']} cache_misses={stats['misses']}")
+    return 0
+
+
+def run_index(args: argparse.Namespace) -> int:
+    inputs = [Path(raw_path) for raw_path in args.input]
+    missing = [path for path in inputs if not path.is_file()]
+    if missing:
+        print(f"Error: Input file does not exist: {missing[0]}", file=sys.stderr)
+        return 1
+
+    from extractor.index import build_index
+
+    try:
+        indexed = build_index(Path(args.db), inputs)
+    except Exception as exc:
+        print(f"Unexpected runtime error: {exc}", file=sys.stderr)
+        return 1
+
+    print("Index complete")
+    print(f"Database: {args.db}")
+    print(f"Indexed: {indexed}")
+    return 0
+
+
+def run_report(args: argparse.Namespace) -> int:
+    input_path = Path(args.input)
+    output_path = Path(args.output)
+    if not input_path.is_file():
+        print(f"Error: Input file does not exist: {input_path}", file=sys.stderr)
+        return 1
+
+    from extractor.report_html import shard_dir_for, write_report
+
+    virtual = {"auto": None, "classic": False, "virtual": True}[args.mode]
+    shard_dir = shard_dir_for(output_path) if args.shards else None
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with output_path.open("w", encoding="utf-8") as f:
+            results = write_report(
+                f,
+                iter_output_records(input_path, resolve_blobs=False),
+                virtual=virtual,
+                shard_dir=shard_dir,
+                shard_size=args.shard_size,
+            )
+    except Exception as exc:
+        print(f"Unexpected runtime error: {exc}", file=sys.stderr)
+        return 1
+
+    print("Report complete")
+    print(f"Output: {output_path}")
+    if shard_dir is not None:
+        print(f"Shards: {shard_dir}")
+    print(f"Results: {results}")
+    return 0
+
+
+def run_query(args: argparse.Namespace) -> int:
+    db_path = Path(args.db)
+    if not db_path.is_file():
+        print(f"Error: Index does not exist: {db_path}", file=sys.stderr)
+        return 1
+
+    filters = {
+        "checkpoint": args.checkpoint,
+        "lora": args.lora,
+        "class_type": args.class_type,
+        "sampler": args.sampler,
+        "scheduler": args.scheduler,
+        "seed": args.seed,
+        "steps": args.steps,
+        "cfg": args.cfg,
+    }
+    from extractor.index import query_index
+
+    try:
+        rows = query_index(
+            db_path,
+            filters,
+            image_format=args.image_format,
+            min_width=args.min_width,
+            min_height=args.min_height,
+            limit=args.limit,
+        )
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    except Exception as exc:
+        print(f"Unexpected runtime error: {exc}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(jsonio.dumps(rows, pretty=True))
+    else:
+        for row in rows:
+            print(row["file_path"])
+    return 0
+
+
 def _run_dragdrop_mode(paths: list[str]) -> int:
-    merged_results: list[dict] = []
+    from extractor.report_html import write_stored_report
+    from extractor.store import ResultStore
+
+    merged_results = ResultStore()
     merged_errors: list[dict] = []
     discovered = 0
     processed_ok = 0
@@ -165,14 +1029,9 @@ def _run_dragdrop_mode(paths: list[str]) -> int:
 
     for raw_path in paths:
         input_path = Path(raw_path)
+        totals = RunTotals()
         try:
-            results, errors, totals = process_batch(input_path=input_path, recursive=False)
-            merged_results.extend(results)
-            merged_errors.extend(errors)
-            discovered += totals.discovered
-            processed_ok += totals.processed_ok
-            failed += totals.failed
-            skipped_unsupported += totals.skipped_unsupported
+            _collect(iter_batch(input_path, False, totals), merged_results, merged_errors)
         except Exception as exc:
             failed += 1
             merged_errors.append(
@@ -182,6 +1041,15 @@ def _run_dragdrop_mode(paths: list[str]) -> int:
                     "message": str(exc),
                 }
             )
+        # A batch that raised partway keeps the records it already collected,
+        # so its totals so far count too.
+        discovered += totals.discovered
+        processed_ok += totals.processed_ok
+        failed += totals.failed
+        skipped_unsupported += totals.skipped_unsupported
+
+    import tempfile
+    from datetime import datetime
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_base = f"comfy_meta_dragdrop_{timestamp}"
@@ -212,14 +1080,12 @@ def _run_dragdrop_mode(paths: list[str]) -> int:
     if output_path is None:
         print("Error: no writable output directory found for drag-and-drop mode.", file=sys.stderr)
         return 1
-    payload = _build_payload(
+    header = _build_header(
         input_info={
             "paths": paths,
             "recursive": False,
             "formats": SUPPORTED_FORMATS,
         },
-        results=merged_results,
-        errors=merged_errors,
         discovered=discovered,
         processed_ok=processed_ok,
         failed=failed,
@@ -227,15 +1093,16 @@ def _run_dragdrop_mode(paths: list[str]) -> int:
     )
 
     try:
-        with output_path.open("w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2, ensure_ascii=False)
+        with output_path.open("wb") as f:
+            write_json_payload(f, header, merged_results, merged_errors, pretty=True)
     except Exception as exc:
         print(f"Error: failed to write output JSON: {exc}", file=sys.stderr)
         return 1
 
     html_path = output_path.with_suffix(".html")
     try:
-        write_report_html(payload, html_path)
+        with html_path.open("w", encoding="utf-8") as f:
+            write_stored_report(f, merged_results, merged_errors, header)
     except Exception as exc:
         print(f"Warning: failed to write HTML report: {exc}", file=sys.stderr)
         html_path = None
@@ -251,6 +1118,8 @@ def _run_dragdrop_mode(paths: list[str]) -> int:
         skipped_unsupported=skipped_unsupported,
     )
     if html_path is not None:
+        import webbrowser
+
         try:
             webbrowser.open(html_path.resolve().as_uri())
         except Exception:
@@ -266,7 +1135,7 @@ def main(argv: list[str] | None = None) -> int:
         argv = sys.argv[1:]
 
     # Windows drag-and-drop onto the .exe passes paths as positional args.
-    if argv and argv[0] not in {"extract", "-h", "--help"} and not argv[0].startswith("-"):
+    if argv and argv[0] not in SUBCOMMANDS and not argv[0].startswith("-"):
         return _run_dragdrop_mode(argv)
 
     parser = build_parser()
@@ -274,10 +1143,30 @@ def main(argv: list[str] | None = None) -> int:
 
     if args.command == "extract":
         return run_extract(args)
+    if args.command == "watch":
+        return run_watch(args)
+    if args.command == "index":
+        return run_index(args)
+    if args.command == "query":
+        return run_query(args)
+    if args.command == "report":
+        return run_report(args)
+    if args.command == "merge":
+        return run_merge(args)
+    if args.command == "serve":
+        return run_serve(args)
+    if args.command == "stats":
+        return run_stats(args)
+    if args.command == "group":
+        return run_group(args)
 
     print("Unknown command", file=sys.stderr)
     return 1
 
 
 if __name__ == "__main__":
+    # Required for process-pool workers in the frozen (PyInstaller) build.
+    import multiprocessing
+
+    multiprocessing.freeze_support()
     raise SystemExit(main())
@@ -3,6 +3,10 @@ from __future__ import annotations
 import json
 from typing import Any
 
+from extractor import jsonio
+from extractor.fingerprint import fingerprint_prompt
+from extractor.summary import build_summary
+
 KNOWN_COMFY_KEYS = {"prompt", "workflow", "parameters"}
 
 
@@ -16,12 +20,14 @@ def _attempt_json_parse(value: Any) -> tuple[Any, bool]:
         return value, False
 
     try:
-        return json.loads(text), True
+        return jsonio.loads(text), True
     except json.JSONDecodeError:
         return value, False
 
 
-def parse_comfyui_metadata(raw_metadata: dict[str, Any]) -> tuple[dict[str, Any], list[str]]:
+def parse_comfyui_metadata(
+    raw_metadata: dict[str, Any], summary: bool = False, fingerprint: bool = False
+) -> tuple[dict[str, Any], list[str]]:
     comfyui: dict[str, Any] = {}
     extra_keys: dict[str, Any] = {}
     warnings: list[str] = []
@@ -40,4 +46,31 @@ def parse_comfyui_metadata(raw_metadata: dict[str, Any]) -> tuple[dict[str, Any]
     if extra_keys:
         comfyui["extra_keys"] = extra_keys
 
+    if summary:
+        built = build_summary(comfyui)
+        if built is not None:
+            comfyui["summary"] = built
+
+    if fingerprint:
+        fingerprints = fingerprint_prompt(comfyui.get("prompt"))
+        if fingerprints is not None:
+            comfyui["fingerprint"] = fingerprints
+
     return comfyui, warnings
+
+
+def decoded_raw_keys(raw_metadata: dict[str, Any], comfyui: dict[str, Any]) -> list[str]:
+    # Raw keys whose string value appears JSON-decoded in ``comfyui``. Values the
+    # parser could not decode are kept as the very same object, so identity
+    # tells the two apart without re-parsing.
+    extra_keys = comfyui.get("extra_keys") or {}
+    decoded: list[str] = []
+    for key, value in raw_metadata.items():
+        if not isinstance(value, str):
+            continue
+        lower_key = key.lower()
+        section = comfyui if lower_key in KNOWN_COMFY_KEYS else extra_keys
+        name = lower_key if lower_key in KNOWN_COMFY_KEYS else key
+        if name in section and section[name] is not value:
+            decoded.append(key)
+    return decoded
@@ -1,26 +1,108 @@
 from __future__ import annotations
 
+import html
+import math
+import re
+import struct
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from PIL import ExifTags, Image
-
-from extractor.comfy_parser import parse_comfyui_metadata
-from extractor.models import ImageResult
+from extractor.comfy_parser import KNOWN_COMFY_KEYS, parse_comfyui_metadata
+from extractor.fingerprint import FINGERPRINT_SOURCES
+from extractor.header_scan import scan_header
+from extractor.models import ExtractOptions, ImageResult, ScannedHeader
+from extractor.projection import FieldPlan, field_plan, wanted_keys, wants
 from extractor.serialization import make_json_safe
+from extractor.summary import SUMMARY_SOURCES
+
+# Pillow is imported on first use: header-only extractions (e.g. --fields
+# dimensions on PNGs) and commands that never extract do not load it.
+if TYPE_CHECKING:
+    from PIL import Image
+
+EXIF_IFD_POINTER = 0x8769
+EXIF_USER_COMMENT = 0x9286
+# ComfyUI's WebP/JPEG savers write "prompt:{...}" / "workflow:{...}" into these
+# IFD0 string tags, counting down from Model.
+EMBEDDED_TEXT_TAGS = (0x0110, 0x010F, 0x010E, 0x010D, 0x010C)
+
+XMP_USER_COMMENT = re.compile(rb"<exif:UserComment>.*?<rdf:li[^>]*>(.*?)</rdf:li>", re.DOTALL)
+
+
+def _load_exif(info: dict[str, Any]) -> Image.Exif:
+    # Same sources as Image.getexif(), minus the pixel decode Pillow performs to
+    # look for an eXIf chunk placed after the image data.
+    from PIL import ExifTags, Image
 
-EXIF_TAGS = {tag_id: tag_name for tag_id, tag_name in ExifTags.TAGS.items()}
+    exif = Image.Exif()
+    exif_info = info.get("exif")
+    if exif_info is None and "Raw profile type exif" in info:
+        exif_info = bytes.fromhex("".join(info["Raw profile type exif"].split("\n")[3:]))
+    if exif_info is not None:
+        exif.load(exif_info)
+
+    if ExifTags.Base.Orientation not in exif:
+        xmp_tags = info.get("XML:com.adobe.xmp")
+        pattern: str | bytes = r'tiff:Orientation(="|>)([0-9])'
+        if not xmp_tags and (xmp_tags := info.get("xmp")):
+            pattern = rb'tiff:Orientation(="|>)([0-9])'
+        if xmp_tags:
+            match = re.search(pattern, xmp_tags)
+            if match:
+                exif[ExifTags.Base.Orientation] = int(match[2])
+
+    return exif
+
+
+def _read_exif(image: Image.Image | None, info: dict[str, Any]) -> Image.Exif | None:
+    try:
+        return image.getexif() if image is not None else _load_exif(info)
+    except Exception:
+        return None
 
 
-def _extract_exif(image: Image.Image) -> dict[str, Any]:
+def _apply_jpeg_exif_dpi(info: dict[str, Any], exif: Image.Exif | None) -> None:
+    # Same rule Pillow's JPEG plugin applies on open when JFIF has no density.
+    if "dpi" in info or "exif" not in info:
+        return
+    try:
+        if exif is None:
+            raise SyntaxError("unreadable EXIF")
+        resolution_unit = exif[0x0128]
+        x_resolution = exif[0x011A]
+        try:
+            dpi = float(x_resolution[0]) / x_resolution[1]
+        except TypeError:
+            dpi = x_resolution
+        if math.isnan(dpi):
+            raise ValueError("DPI is not a number")
+        if resolution_unit == 3:
+            dpi *= 2.54
+        info["dpi"] = dpi, dpi
+    except (struct.error, KeyError, SyntaxError, TypeError, ValueError, ZeroDivisionError):
+        info["dpi"] = 72, 72
+
+
+@lru_cache(maxsize=None)
+def exif_tag_names() -> dict[int, str]:
+    from PIL import ExifTags
+
+    return dict(ExifTags.TAGS)
+
+
+def _extract_exif(
+    exif: Image.Exif | None, info: dict[str, Any], max_bytes: int | None = None
+) -> dict[str, Any]:
     exif_data: dict[str, Any] = {}
 
     try:
-        exif = image.getexif()
         if exif:
+            tag_names = exif_tag_names()
             for tag_id, value in exif.items():
-                key = EXIF_TAGS.get(tag_id, str(tag_id))
-                exif_data[str(key)] = make_json_safe(value)
+                key = tag_names.get(tag_id, str(tag_id))
+                exif_data[str(key)] = make_json_safe(value, max_bytes)
     except Exception:
         # Fall through to piexif fallback.
         pass
@@ -31,7 +113,7 @@ def _extract_exif(image: Image.Image) -> dict[str, Any]:
     try:
         import piexif  # type: ignore
 
-        raw_exif = image.info.get("exif")
+        raw_exif = info.get("exif")
         if not raw_exif:
             return exif_data
 
@@ -41,38 +123,251 @@ def _extract_exif(image: Image.Image) -> dict[str, Any]:
                 continue
             for tag_id, value in ifd_data.items():
                 tag_name = f"{ifd_name}.{tag_id}"
-                exif_data[tag_name] = make_json_safe(value)
+                exif_data[tag_name] = make_json_safe(value, max_bytes)
     except Exception:
         return exif_data
 
     return exif_data
 
 
-def _extract_raw_metadata(image: Image.Image) -> dict[str, Any]:
+def _decode_user_comment(value: Any) -> str | None:
+    if isinstance(value, str):
+        return value.strip("\0 ") or None
+    if not isinstance(value, bytes) or len(value) <= 8:
+        return None
+
+    prefix, body = value[:8], value[8:]
+    if prefix == b"UNICODE\0":
+        # piexif.helper writes UTF-16BE; some tools write little-endian.
+        little_endian = len(body) >= 2 and body[0] != 0 and body[1] == 0
+        text = body.decode("utf-16-le" if little_endian else "utf-16-be", "replace")
+    elif prefix.startswith(b"ASCII"):
+        text = body.decode("ascii", "replace")
+    else:
+        text = body.decode("utf-8", "replace")
+    return text.strip("\0 ") or None
+
+
+def _extract_embedded_text(exif: Image.Exif | None, info: dict[str, Any]) -> dict[str, str]:
+    # Generation data that JPEG/WebP tools store inside EXIF or XMP rather than
+    # as top-level text chunks.
+    embedded: dict[str, str] = {}
+    comment: str | None = None
+
+    try:
+        if exif:
+            for tag_id in EMBEDDED_TEXT_TAGS:
+                value = exif.get(tag_id)
+                if isinstance(value, bytes):
+                    value = value.decode("utf-8", "replace")
+                if not isinstance(value, str) or ":" not in value:
+                    continue
+                key, text = value.split(":", 1)
+                if key.lower() in KNOWN_COMFY_KEYS:
+                    embedded.setdefault(key.lower(), text.strip("\0"))
+            comment = _decode_user_comment(exif.get_ifd(EXIF_IFD_POINTER).get(EXIF_USER_COMMENT))
+    except Exception:
+        pass
+
+    xmp = info.get("xmp")
+    if comment is None and isinstance(xmp, bytes):
+        match = XMP_USER_COMMENT.search(xmp)
+        if match:
+            comment = html.unescape(match[1].decode("utf-8", "replace")).strip() or None
+
+    if comment is not None:
+        key, _, text = comment.partition(":")
+        if key.lower() in KNOWN_COMFY_KEYS and text.lstrip().startswith(("{", "[")):
+            embedded.setdefault(key.lower(), text)
+        else:
+            embedded.setdefault("parameters", comment)
+
+    return embedded
+
+
+def _extract_raw_metadata(
+    info: dict[str, Any], max_bytes: int | None = None, keys: frozenset[str] | None = None
+) -> dict[str, Any]:
     raw: dict[str, Any] = {}
 
-    for key, value in image.info.items():
-        raw[str(key)] = make_json_safe(value)
+    for key, value in info.items():
+        if keys is not None and str(key).lower() not in keys:
+            continue
+        raw[str(key)] = make_json_safe(value, max_bytes)
 
     return raw
 
 
-def extract_image_metadata(file_path: Path) -> tuple[ImageResult, list[str]]:
-    with Image.open(file_path) as img:
-        fmt = (img.format or "UNKNOWN").upper()
-        width, height = img.size
-        raw_metadata = _extract_raw_metadata(img)
-        exif = _extract_exif(img)
-        comfyui, warnings = parse_comfyui_metadata(raw_metadata)
+def _needed_raw_keys(plan: FieldPlan | None) -> frozenset[str] | None:
+    # Lower-cased info keys the requested raw_metadata/comfyui fields are built
+    # from; None when every key is needed.
+    needed: set[str] = set()
+    if wants(plan, "raw_metadata"):
+        raw_keys = wanted_keys(plan, "raw_metadata")
+        if raw_keys is None:
+            return None
+        needed.update(key.lower() for key in raw_keys)
+    if wants(plan, "comfyui"):
+        comfy_keys = wanted_keys(plan, "comfyui")
+        if comfy_keys is None or "extra_keys" in comfy_keys:
+            return None
+        needed.update(comfy_keys)
+        if "summary" in comfy_keys:
+            needed.update(SUMMARY_SOURCES)
+        if "fingerprint" in comfy_keys:
+            needed.update(FINGERPRINT_SOURCES)
+    return frozenset(needed)
+
+
+def metadata_key_filter(options: ExtractOptions) -> frozenset[str] | None:
+    # Lower-cased metadata keys to load: what the field projection needs,
+    # narrowed by ExtractOptions.keys. None loads every key.
+    needed = _needed_raw_keys(field_plan(options.fields))
+    if options.keys is None:
+        return needed
+    keys = frozenset(key.lower() for key in options.keys)
+    return keys if needed is None else needed & keys
+
+
+def _parse_comfyui(
+    raw_metadata: dict[str, Any],
+    exif: Image.Exif | None,
+    info: dict[str, Any],
+    summary: bool = False,
+    keys: frozenset[str] | None = None,
+    unloaded: list[str] | None = None,
+    fingerprint: bool = False,
+) -> tuple[dict[str, Any], list[str]]:
+    embedded = _extract_embedded_text(exif, info)
+    known = {key.lower() for key in raw_metadata}
+    sources = dict(raw_metadata)
+    for key, value in embedded.items():
+        if key in known:
+            continue
+        if keys is not None and key not in keys:
+            # Embedded JSON that is not wanted is never parsed.
+            if unloaded is not None:
+                unloaded.append(key)
+            continue
+        sources[key] = value
+    return parse_comfyui_metadata(sources, summary, fingerprint)
+
+
+def _lap(timings: dict[str, float] | None, stage: str, start: float) -> float:
+    # Adds the time since ``start`` to ``stage``; costs nothing unless profiling.
+    if timings is None:
+        return start
+    now = time.perf_counter()
+    timings[stage] = timings.get(stage, 0.0) + now - start
+    return now
+
+
+def _extract_sections(
+    image: Image.Image | None,
+    fmt: str,
+    info: dict[str, Any],
+    options: ExtractOptions,
+    timings: dict[str, float] | None = None,
+    unloaded: list[str] | None = None,
+) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any], list[str]]:
+    # Builds only the sections the field projection asks for; the EXIF block is
+    # not even parsed when neither exif nor comfyui (or a JPEG's dpi) needs it.
+    # Keys left out by ExtractOptions.keys are appended to ``unloaded``.
+    plan = field_plan(options.fields)
+    keys = metadata_key_filter(options)
+    want_exif = wants(plan, "exif")
+    want_comfyui = wants(plan, "comfyui")
+    want_raw = wants(plan, "raw_metadata")
+
+    started = time.perf_counter() if timings is not None else 0.0
+    exif_obj = None
+    if image is None:
+        if want_exif or want_comfyui or (fmt == "JPEG" and want_raw):
+            exif_obj = _read_exif(None, info)
+        if fmt == "JPEG":
+            _apply_jpeg_exif_dpi(info, exif_obj)
+        started = _lap(timings, "exif", started)
+
+    raw_metadata: dict[str, Any] = {}
+    if want_raw or want_comfyui:
+        raw_metadata = _extract_raw_metadata(info, options.max_base64_bytes, keys)
+    if unloaded is not None and keys is not None:
+        # Text entries (PNG text chunks read by Pillow) are the metadata keys the
+        # filter skips; structural info such as dpi, jfif, exif or loop is not.
+        unloaded.extend(
+            str(key) for key, value in info.items() if isinstance(value, str) and str(key).lower() not in keys
+        )
+    started = _lap(timings, "json_safe", started)
+    # Pillow may decode the image inside getexif(), so it runs after info is copied.
+    if image is not None and (want_exif or want_comfyui):
+        exif_obj = _read_exif(image, info)
+    exif = _extract_exif(exif_obj, info, options.max_base64_bytes) if want_exif else {}
+    started = _lap(timings, "exif", started)
+    comfyui: dict[str, Any] = {}
+    warnings: list[str] = []
+    if want_comfyui:
+        comfyui, warnings = _parse_comfyui(
+            raw_metadata, exif_obj, info, options.summary, keys, unloaded, options.fingerprint
+        )
+    _lap(timings, "parse", started)
+    return exif, comfyui, raw_metadata, warnings
+
+
+def extract_image_metadata(
+    file_path: Path,
+    size_bytes: int | None = None,
+    options: ExtractOptions | None = None,
+    timings: dict[str, float] | None = None,
+) -> tuple[ImageResult, list[str]]:
+    # With a ``timings`` dict, seconds spent per stage (read, exif, json_safe,
+    # parse) are added to it.
+    started = time.perf_counter() if timings is not None else 0.0
+    header = scan_header(file_path, metadata_key_filter(options or ExtractOptions()))
+    _lap(timings, "read", started)
+    return extract_from_header(file_path, header, size_bytes, options, timings)
+
+
+def extract_from_header(
+    file_path: Path,
+    header: ScannedHeader | None,
+    size_bytes: int | None = None,
+    options: ExtractOptions | None = None,
+    timings: dict[str, float] | None = None,
+) -> tuple[ImageResult, list[str]]:
+    # Second half of extract_image_metadata, for callers that ran scan_header
+    # themselves (e.g. on an I/O thread); a None header goes through Pillow.
+    options = options or ExtractOptions()
+    unloaded: list[str] | None = [] if options.keys is not None else None
+    if header is not None:
+        fmt = header.format
+        width, height = header.width, header.height
+        if unloaded is not None:
+            unloaded.extend(header.unloaded_keys)
+        exif, comfyui, raw_metadata, warnings = _extract_sections(
+            None, fmt, header.info, options, timings, unloaded
+        )
+    else:
+        # Formats and layouts the header scanners do not cover go through Pillow.
+        from PIL import Image
+
+        started = time.perf_counter() if timings is not None else 0.0
+        with Image.open(file_path) as img:
+            fmt = (img.format or "UNKNOWN").upper()
+            width, height = img.size
+            _lap(timings, "read", started)
+            exif, comfyui, raw_metadata, warnings = _extract_sections(
+                img, fmt, img.info, options, timings, unloaded
+            )
 
     result = ImageResult(
         file_path=str(file_path),
         format=fmt,
-        size_bytes=file_path.stat().st_size,
+        size_bytes=size_bytes if size_bytes is not None else file_path.stat().st_size,
         dimensions={"width": width, "height": height},
         exif=exif,
         comfyui=comfyui,
         raw_metadata=raw_metadata,
+        unloaded_keys=list(dict.fromkeys(unloaded)) if unloaded else [],
     )
 
     return result, warnings
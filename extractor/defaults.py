@@ -0,0 +1,23 @@
+# Defaults shown in the CLI help. They live here, free of imports, so building
+# the parser does not load the modules that use them; those modules import
+# them from here.
+
+# report: above this many results the report switches to the virtual-scrolling
+# list.
+VIRTUAL_THRESHOLD = 1000
+# report: records per sidecar shard script.
+DEFAULT_SHARD_SIZE = 500
+
+# serve
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_MB = 256
+
+# watch
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_POLL_INTERVAL = 0.5
+
+# stats: most common values listed per counter.
+DEFAULT_TOP = 10
+# group: smallest group listed.
+DEFAULT_MIN_SIZE = 2
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator
+
+from extractor.models import DiscoveredFile
+
+SUPPORTED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+DEFAULT_SCAN_THREADS = 8
+
+# (files, unsupported file count, subdirectories as (path, relative path))
+_DirScan = tuple[list[DiscoveredFile], int, list[tuple[str, str]]]
+# (index, count), index counted from 0: a run that only takes the files whose
+# relative path hashes to bucket ``index`` of ``count``.
+Shard = tuple[int, int]
+
+
+def _has_supported_extension(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def parse_shard(spec: str) -> Shard:
+    # "i/N" with i counted from 1, as written on the command line.
+    index_text, _, count_text = spec.partition("/")
+    try:
+        index, count = int(index_text), int(count_text)
+    except ValueError:
+        raise ValueError(f"invalid shard {spec!r} (expected i/N, e.g. 1/4)") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard {spec!r} (i must be between 1 and N)")
+    return index - 1, count
+
+
+def format_shard(shard: Shard) -> str:
+    return f"{shard[0] + 1}/{shard[1]}"
+
+
+def in_shard(relative_path: str, shard: Shard | None) -> bool:
+    # Hashes the relative path with "/" separators, so every machine picks the
+    # same files whatever the mount point or OS.
+    if shard is None:
+        return True
+    index, count = shard
+    key = relative_path.replace(os.sep, "/").encode("utf-8", "surrogateescape")
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count == index
+
+
+def _scan_directory(directory: str, relative_dir: str, shard: Shard | None = None) -> _DirScan:
+    files: list[DiscoveredFile] = []
+    skipped = 0
+    subdirs: list[tuple[str, str]] = []
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            relative = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+            # DirEntry type checks come from the directory listing itself on
+            # Windows and on Linux filesystems that report d_type; only files
+            # with a supported extension are stat'ed.
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append((entry.path, relative))
+                continue
+            if not entry.is_file():
+                continue
+            # Files of other shards (unsupported ones included, so shard totals
+            # add up) are dropped before they are stat'ed.
+            if shard is not None and not in_shard(relative, shard):
+                continue
+            if not _has_supported_extension(entry.name):
+                skipped += 1
+                continue
+            try:
+                stat = entry.stat()
+                size, mtime_ns = stat.st_size, stat.st_mtime_ns
+            except OSError:
+                # Vanished since listing; extraction reports the error.
+                size, mtime_ns = 0, 0
+            files.append(DiscoveredFile(Path(entry.path), relative, size, mtime_ns))
+
+    return files, skipped, subdirs
+
+
+def _scan_subdirectory(directory: str, relative_dir: str, shard: Shard | None = None) -> _DirScan:
+    # Unreadable subdirectories are skipped, as Path.rglob does.
+    try:
+        return _scan_directory(directory, relative_dir, shard)
+    except OSError:
+        return [], 0, []
+
+
+def _sort_key(item: DiscoveredFile) -> list[str]:
+    return item.relative_path.split(os.sep)
+
+
+def iter_scan(
+    input_path: Path, recursive: bool, threads: int = DEFAULT_SCAN_THREADS, shard: Shard | None = None
+) -> Iterator[tuple[list[DiscoveredFile], int]]:
+    # (files, unsupported file count) per directory, as each listing comes
+    # in, so files can be used before the whole tree is listed. Directories
+    # arrive in completion order; scan_files sorts.
+    if input_path.is_file():
+        if not in_shard(input_path.name, shard):
+            yield [], 0
+        elif not _has_supported_extension(input_path.name):
+            yield [], 1
+        else:
+            stat = input_path.stat()
+            yield [DiscoveredFile(input_path, str(input_path), stat.st_size, stat.st_mtime_ns)], 0
+        return
+
+    if not input_path.is_dir():
+        raise FileNotFoundError(f"Input path does not exist: {input_path}")
+
+    files, skipped, subdirs = _scan_directory(str(input_path), "", shard)
+    yield files, skipped
+    if not (recursive and subdirs):
+        return
+    # Directory listings are latency-bound on network shares, so sibling
+    # directories are listed concurrently.
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        pending: set[Future[_DirScan]] = {
+            executor.submit(_scan_subdirectory, path, relative, shard) for path, relative in subdirs
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dir_files, dir_skipped, dir_subdirs = future.result()
+                pending.update(
+                    executor.submit(_scan_subdirectory, path, relative, shard) for path, relative in dir_subdirs
+                )
+                yield dir_files, dir_skipped
+
+
+def scan_files(
+    input_path: Path, recursive: bool, threads: int = DEFAULT_SCAN_THREADS, shard: Shard | None = None
+) -> tuple[list[DiscoveredFile], int]:
+    files: list[DiscoveredFile] = []
+    skipped = 0
+    for dir_files, dir_skipped in iter_scan(input_path, recursive, threads, shard):
+        files.extend(dir_files)
+        skipped += dir_skipped
+    # Completion order varies between runs; sort so output order does not.
+    files.sort(key=_sort_key)
+    return files, skipped
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from operator import itemgetter
+from typing import Any, NamedTuple
+
+from extractor.summary import TEXT_NODES, VALUE_INPUTS, is_link
+
+# Canonical fingerprints of a ComfyUI API prompt graph, so images made with the
+# same workflow can be bucketed by a hash lookup instead of comparing graphs:
+#
+#   structure   node class_types and how they are linked
+#   parameters  the structure plus every literal input except seeds and
+#               prompt text, i.e. the same settings with another seed/prompt
+#
+# Node ids are never hashed: each node is labelled by its class_type, inputs
+# and the labels of the nodes it links to, so renumbered copies of a graph get
+# the same fingerprints. The prompt graph carries no UI layout; the workflow
+# (positions, sizes, groups) is not used.
+
+# comfyui keys fingerprints are built from.
+FINGERPRINT_SOURCES = ("prompt",)
+FINGERPRINT_KINDS = ("structure", "parameters")
+SEED_INPUTS = ("seed", "noise_seed")
+
+
+# One shared encoder: json.dumps() with options builds a new one per call.
+_CANONICAL = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class _Node(NamedTuple):
+    class_type: Any
+    # (input name, upstream node id, output index)
+    links: list[tuple[str, str, int]]
+    literals: list[tuple[str, Any]]
+    # Output indices other nodes link to, once per link.
+    fan_out: list[int]
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(_CANONICAL.encode(value).encode("utf-8")).hexdigest()
+
+
+def _parse_nodes(prompt: dict[Any, Any]) -> dict[str, _Node]:
+    nodes: dict[str, _Node] = {}
+    for node_id, node in prompt.items():
+        if not isinstance(node, dict) or not isinstance(node.get("inputs"), dict):
+            continue
+        links, literals = [], []
+        for name, value in node["inputs"].items():
+            if is_link(value):
+                links.append((name, str(value[0]), value[1]))
+            else:
+                literals.append((name, value))
+        nodes[str(node_id)] = _Node(node.get("class_type"), links, literals, [])
+    for node in nodes.values():
+        for _, upstream, output in node.links:
+            if upstream in nodes:
+                nodes[upstream].fan_out.append(output)
+    for node in nodes.values():
+        node.fan_out.sort()
+    return nodes
+
+
+def _upstream_first(nodes: dict[str, _Node]) -> list[str]:
+    # Node ids ordered so every node comes after the nodes it links to
+    # (iterative DFS). On a cycle, the link that closes it points to a node
+    # that is not placed yet.
+    order: list[str] = []
+    seen: set[str] = set()
+    for root in sorted(nodes):
+        if root in seen:
+            continue
+        seen.add(root)
+        stack = [(root, iter(nodes[root].links))]
+        while stack:
+            node_id, links = stack[-1]
+            for _, upstream, _ in links:
+                if upstream in nodes and upstream not in seen:
+                    seen.add(upstream)
+                    stack.append((upstream, iter(nodes[upstream].links)))
+                    break
+            else:
+                stack.pop()
+                order.append(node_id)
+    return order
+
+
+def _volatile_inputs(nodes: dict[str, _Node]) -> dict[str, set[str]]:
+    # node id -> literal inputs left out of the parameters fingerprint: seeds,
+    # prompt text, and the value of primitive nodes that feed either.
+    volatile: dict[str, set[str]] = {}
+    for node_id, node in nodes.items():
+        class_type = node.class_type
+        names = {*SEED_INPUTS, *(TEXT_NODES.get(class_type, ()) if isinstance(class_type, str) else ())}
+        volatile.setdefault(node_id, set()).update(names)
+        for name, upstream, _ in node.links:
+            if name in names:
+                volatile.setdefault(upstream, set()).update(VALUE_INPUTS)
+    return volatile
+
+
+def _node_labels(nodes: dict[str, _Node], order: list[str], skip: dict[str, set[str]] | None) -> list[str]:
+    # One hash per node over its class_type, literal inputs (none when ``skip``
+    # is None, minus skip[node_id] otherwise), the labels of upstream nodes and
+    # which of its outputs are used how often (so two look-alike nodes are told
+    # apart by what they feed). A link to a missing node, or one closing a
+    # cycle, is labelled None.
+    labels: dict[str, str] = {}
+    for node_id in order:
+        node = nodes[node_id]
+        inputs: list[list[Any]] = [[name, labels.get(upstream), output] for name, upstream, output in node.links]
+        if skip is not None:
+            skipped = skip.get(node_id, ())
+            inputs.extend([name, value] for name, value in node.literals if name not in skipped)
+        inputs.sort(key=itemgetter(0))
+        labels[node_id] = _digest([node.class_type, inputs, node.fan_out])
+    return sorted(labels.values())
+
+
+def fingerprint_prompt(prompt: Any) -> dict[str, str] | None:
+    if not isinstance(prompt, dict):
+        return None
+    nodes = _parse_nodes(prompt)
+    if not nodes:
+        return None
+    order = _upstream_first(nodes)
+    return {
+        "structure": _digest(_node_labels(nodes, order, None)),
+        "parameters": _digest(_node_labels(nodes, order, _volatile_inputs(nodes))),
+    }
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Iterable
+
+from extractor.batch import extract_files
+from extractor.defaults import DEFAULT_MIN_SIZE
+from extractor.discovery import Shard, scan_files
+from extractor.fingerprint import fingerprint_prompt
+from extractor.models import ExtractOptions
+from extractor.readers import iter_output_records
+
+# Only the fingerprints are extracted; the prompt graph is parsed to hash it
+# but not kept.
+GROUP_OPTIONS = ExtractOptions(fields=("comfyui.fingerprint",), fingerprint=True)
+
+
+class FingerprintGroups:
+    # Files bucketed by one fingerprint kind ("parameters" or "structure") in a
+    # single pass: one dict lookup per record, no pairwise comparison.
+    def __init__(self, by: str = "parameters") -> None:
+        self.by = by
+        self.discovered = 0
+        self.skipped_unsupported = 0
+        self.processed_ok = 0
+        self.failed = 0
+        self.unfingerprinted = 0
+        self.groups: dict[str, list[str]] = {}
+        # Parameter fingerprint -> structure fingerprint, so groups of the same
+        # workflow with different settings can be told apart.
+        self.structures: dict[str, str] = {}
+
+    def add_record(self, record: dict[str, Any]) -> None:
+        self.processed_ok += 1
+        comfyui = record.get("comfyui") or {}
+        # Outputs written without --fingerprint still group when they kept the prompt.
+        fingerprints = comfyui.get("fingerprint") or fingerprint_prompt(comfyui.get("prompt"))
+        if not isinstance(fingerprints, dict) or not isinstance(fingerprints.get(self.by), str):
+            self.unfingerprinted += 1
+            return
+        key = fingerprints[self.by]
+        self.groups.setdefault(key, []).append(str(record.get("file_path")))
+        if self.by == "parameters" and isinstance(fingerprints.get("structure"), str):
+            self.structures.setdefault(key, fingerprints["structure"])
+
+    def add_outcomes(self, outcomes: Iterable[tuple[bool, dict[str, Any]]]) -> None:
+        for ok, item in outcomes:
+            if ok:
+                self.add_record(item)
+            else:
+                self.failed += 1
+
+    def to_dict(self, min_size: int = DEFAULT_MIN_SIZE) -> dict[str, Any]:
+        # Groups of at least ``min_size`` files, largest first; files keep the
+        # order they were read in.
+        listed = sorted(
+            (item for item in self.groups.items() if len(item[1]) >= min_size),
+            key=lambda item: (-len(item[1]), item[1][0]),
+        )
+        groups = []
+        for fingerprint, files in listed:
+            group: dict[str, Any] = {"fingerprint": fingerprint, "count": len(files)}
+            if fingerprint in self.structures:
+                group["structure"] = self.structures[fingerprint]
+            group["files"] = files
+            groups.append(group)
+        return {
+            "by": self.by,
+            "totals": {
+                "discovered": self.discovered,
+                "processed_ok": self.processed_ok,
+                "failed": self.failed,
+                "skipped_unsupported": self.skipped_unsupported,
+                "fingerprinted": self.processed_ok - self.unfingerprinted,
+                "distinct": len(self.groups),
+                "listed_groups": len(groups),
+            },
+            "groups": groups,
+        }
+
+
+def collect_groups(
+    input_path: Path,
+    recursive: bool,
+    by: str = "parameters",
+    jobs: int = 1,
+    io_threads: int = 0,
+    shard: Shard | None = None,
+) -> FingerprintGroups:
+    files, skipped = scan_files(input_path, recursive=recursive, shard=shard)
+    groups = FingerprintGroups(by)
+    groups.discovered = len(files)
+    groups.skipped_unsupported = skipped
+    groups.add_outcomes(extract_files(files, jobs=jobs, options=GROUP_OPTIONS, io_threads=io_threads))
+    return groups
+
+
+def groups_from_outputs(paths: Iterable[Path], by: str = "parameters") -> FingerprintGroups:
+    # Groups the records of extract outputs (JSON or NDJSON) instead of images.
+    groups = FingerprintGroups(by)
+    for path in paths:
+        for record_type, item in iter_output_records(path):
+            if record_type == "result":
+                groups.add_record(item)
+            elif record_type == "error":
+                groups.failed += 1
+            elif record_type == "summary":
+                totals = item.get("totals") or {}
+                groups.discovered += int(totals.get("discovered", 0))
+                groups.skipped_unsupported += int(totals.get("skipped_unsupported", 0))
+    return groups
+
+
+def format_groups(report: dict[str, Any]) -> str:
+    totals = report["totals"]
+    lines = [
+        "Files: " + " ".join(
+            f"{name}={totals[name]}" for name in ("discovered", "processed_ok", "failed", "skipped_unsupported")
+        ),
+        f"Fingerprinted: {totals['fingerprinted']} in {totals['distinct']} distinct {report['by']} fingerprints, "
+        f"{totals['listed_groups']} groups listed",
+    ]
+    for group in report["groups"]:
+        lines.append(f"{group['count']:>8}  {group['fingerprint'][:16]}")
+        lines.extend(f"          {file_path}" for file_path in group["files"])
+    return "\n".join(lines)
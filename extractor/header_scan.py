@@ -0,0 +1,440 @@
+from __future__ import annotations
+
+import re
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from extractor.models import ScannedHeader
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+
+# Mirrors Pillow's PngImagePlugin.MAX_TEXT_CHUNK / MAX_TEXT_MEMORY so a file is
+# never accepted here that Image.open would reject.
+MAX_TEXT_CHUNK = 1024 * 1024
+MAX_TEXT_MEMORY = 64 * MAX_TEXT_CHUNK
+
+# Pillow raises DecompressionBombError above twice its default pixel limit.
+MAX_SAFE_PIXELS = 2 * int(1024 * 1024 * 1024 // 4 // 3)
+
+_PNG_MODES = {
+    0: {1, 2, 4, 8, 16},
+    2: {8, 16},
+    3: {1, 2, 4, 8},
+    4: {8, 16},
+    6: {8, 16},
+}
+
+# Chunks whose Pillow interpretation depends on decoder state; files that carry
+# them before IDAT are left to Image.open.
+_PNG_FALLBACK_CHUNKS = {b"tRNS", b"acTL", b"fcTL", b"fdAT"}
+
+_CHUNK_TYPE = re.compile(rb"\w\w\w\w")
+
+_JPEG_SOF_MARKERS = {
+    0xFFC0, 0xFFC1, 0xFFC2, 0xFFC3, 0xFFC5, 0xFFC6, 0xFFC7,
+    0xFFC9, 0xFFCA, 0xFFCB, 0xFFCD, 0xFFCE, 0xFFCF, 0xFFDE,
+}
+_JPEG_PROGRESSIVE_MARKERS = {0xFFC2, 0xFFC6, 0xFFCA, 0xFFCE}
+# Markers without a length field; Pillow steps over them byte by byte.
+_JPEG_STANDALONE_MARKERS = {0xFFC8, *range(0xFFD0, 0xFFDA), *range(0xFFF0, 0xFFFE)}
+_JPEG_SKIPPED_MARKERS = {0xFFC4, 0xFFCC, 0xFFDC, 0xFFDD, 0xFFDF}
+_WEBP_METADATA_CHUNKS = {b"ICCP": "icc_profile", b"EXIF": "exif", b"XMP ": "xmp"}
+
+
+# Text keywords that feed EXIF/XMP parsing rather than raw metadata; never skipped.
+_PNG_STRUCTURAL_TEXT = {"exif", "raw profile type exif", "xml:com.adobe.xmp"}
+
+
+class _Fallback(Exception):
+    pass
+
+
+def _decompress_text(data: bytes) -> bytes:
+    dobj = zlib.decompressobj()
+    plaintext = dobj.decompress(data, MAX_TEXT_CHUNK)
+    if dobj.unconsumed_tail:
+        raise _Fallback("decompressed text chunk too large")
+    return plaintext
+
+
+def _read_exact(fp: BinaryIO, size: int) -> bytes:
+    data = fp.read(size)
+    if len(data) != size:
+        raise _Fallback("truncated chunk")
+    return data
+
+
+def _png_text(info: dict[str, Any], data: bytes) -> int:
+    try:
+        key, value = data.split(b"\0", 1)
+    except ValueError:
+        key, value = data, b""
+    if not key:
+        return 0
+    key_str = key.decode("latin-1", "strict")
+    value_str = value.decode("latin-1", "replace")
+    info[key_str] = value if key == b"exif" else value_str
+    return len(value_str)
+
+
+def _png_ztext(info: dict[str, Any], data: bytes) -> int:
+    try:
+        key, value = data.split(b"\0", 1)
+    except ValueError:
+        key, value = data, b""
+    if value and value[0] != 0:
+        raise _Fallback("unknown zTXt compression method")
+    try:
+        value = _decompress_text(value[1:])
+    except zlib.error:
+        value = b""
+    if not key:
+        return 0
+    value_str = value.decode("latin-1", "replace")
+    info[key.decode("latin-1", "strict")] = value_str
+    return len(value_str)
+
+
+def _png_itext(info: dict[str, Any], data: bytes) -> int:
+    try:
+        key, rest = data.split(b"\0", 1)
+    except ValueError:
+        return 0
+    if len(rest) < 2:
+        return 0
+    compressed, method, rest = rest[0], rest[1], rest[2:]
+    try:
+        lang, translated, value = rest.split(b"\0", 2)
+    except ValueError:
+        return 0
+    if compressed:
+        if method != 0:
+            return 0
+        try:
+            value = _decompress_text(value)
+        except zlib.error:
+            return 0
+    if key == b"XML:com.adobe.xmp":
+        info["xmp"] = value
+    try:
+        key_str = key.decode("latin-1", "strict")
+        lang.decode("utf-8", "strict")
+        translated.decode("utf-8", "strict")
+        value_str = value.decode("utf-8", "strict")
+    except UnicodeError:
+        return 0
+    info[key_str] = value_str
+    return len(value_str)
+
+
+_PNG_TEXT_READERS = {b"tEXt": _png_text, b"zTXt": _png_ztext, b"iTXt": _png_itext}
+
+
+def _png_text_keyword(cid: bytes, data: bytes) -> str | None:
+    # Keyword of a text chunk, read without touching (or decompressing) its value.
+    keyword = data.split(b"\0", 1)[0]
+    if not keyword or (cid != b"tEXt" and b"\0" not in data):
+        return None
+    if cid == b"zTXt":
+        rest = data[len(keyword) + 1 :]
+        if rest and rest[0] != 0:
+            raise _Fallback("unknown zTXt compression method")
+    return keyword.decode("latin-1", "strict")
+
+
+def _png_iccp(info: dict[str, Any], data: bytes) -> None:
+    i = data.find(b"\0")
+    if data[i + 1] != 0:
+        raise _Fallback("unknown iCCP compression method")
+    try:
+        info["icc_profile"] = _decompress_text(data[i + 2 :])
+    except zlib.error:
+        info["icc_profile"] = None
+
+
+# Reads chunks up to the first IDAT and builds the same ``info`` mapping as
+# ``PIL.Image.open``. Returns None whenever Pillow's full handling is needed
+# (malformed, animated or transparency-table files, oversized text). With
+# ``text_keys`` (lower-cased keywords), other text chunks are CRC-checked but
+# neither decompressed nor decoded; their keywords go to ``unloaded_keys``.
+def scan_png(fp: BinaryIO, text_keys: frozenset[str] | None = None) -> ScannedHeader | None:
+    try:
+        if fp.read(8) != PNG_SIGNATURE:
+            return None
+
+        info: dict[str, Any] = {}
+        unloaded: list[str] = []
+        size: tuple[int, int] | None = None
+        text_memory = 0
+
+        while True:
+            header = _read_exact(fp, 8)
+            length, cid = struct.unpack(">I", header[:4])[0], header[4:]
+            if not _CHUNK_TYPE.fullmatch(cid):
+                return None
+            if cid in (b"IDAT", b"IEND"):
+                break
+            if cid in _PNG_FALLBACK_CHUNKS:
+                return None
+
+            data = _read_exact(fp, length)
+            crc = _read_exact(fp, 4)
+            if zlib.crc32(data, zlib.crc32(cid)) != struct.unpack(">I", crc)[0]:
+                return None
+
+            if cid == b"IHDR":
+                if length < 13 or data[11]:
+                    return None
+                if data[8] not in _PNG_MODES.get(data[9], ()):
+                    return None
+                size = struct.unpack(">II", data[:8])
+                if data[12]:
+                    info["interlace"] = 1
+            elif text_keys is not None and cid in (b"tEXt", b"zTXt", b"iTXt"):
+                keyword = _png_text_keyword(cid, data)
+                lowered = keyword.lower() if keyword is not None else None
+                if lowered is None or lowered in text_keys or lowered in _PNG_STRUCTURAL_TEXT:
+                    text_memory += _PNG_TEXT_READERS[cid](info, data)
+                elif keyword not in unloaded:
+                    unloaded.append(keyword)
+            elif cid == b"tEXt":
+                text_memory += _png_text(info, data)
+            elif cid == b"zTXt":
+                text_memory += _png_ztext(info, data)
+            elif cid == b"iTXt":
+                text_memory += _png_itext(info, data)
+            elif cid == b"eXIf":
+                info["exif"] = b"Exif\x00\x00" + data
+            elif cid == b"iCCP":
+                _png_iccp(info, data)
+            elif cid == b"gAMA":
+                info["gamma"] = struct.unpack(">I", data[:4])[0] / 100000.0
+            elif cid == b"cHRM":
+                raw_vals = struct.unpack(f">{len(data) // 4}I", data)
+                info["chromaticity"] = tuple(v / 100000.0 for v in raw_vals)
+            elif cid == b"sRGB":
+                if length < 1:
+                    return None
+                info["srgb"] = data[0]
+            elif cid == b"pHYs":
+                if length < 9:
+                    return None
+                px, py = struct.unpack(">II", data[:8])
+                if data[8] == 1:
+                    info["dpi"] = px * 0.0254, py * 0.0254
+                elif data[8] == 0:
+                    info["aspect"] = px, py
+
+            if text_memory > MAX_TEXT_MEMORY:
+                return None
+    except (_Fallback, struct.error, IndexError, UnicodeDecodeError):
+        return None
+
+    if size is None or size[0] * size[1] > MAX_SAFE_PIXELS:
+        return None
+    return ScannedHeader(format="PNG", width=size[0], height=size[1], info=info, unloaded_keys=unloaded)
+
+
+def _jpeg_app(info: dict[str, Any], icc_chunks: list[bytes], marker: int, data: bytes) -> None:
+    if marker == 0xFFE0 and data.startswith(b"JFIF"):
+        info["jfif"] = version = struct.unpack(">H", data[5:7])[0]
+        info["jfif_version"] = divmod(version, 256)
+        try:
+            jfif_unit = data[7]
+            jfif_density = struct.unpack(">HH", data[8:12])
+        except (IndexError, struct.error):
+            pass
+        else:
+            if jfif_unit == 1:
+                info["dpi"] = jfif_density
+            elif jfif_unit == 2:
+                info["dpi"] = tuple(d * 2.54 for d in jfif_density)
+            info["jfif_unit"] = jfif_unit
+            info["jfif_density"] = jfif_density
+    elif marker == 0xFFE1 and data.startswith(b"Exif\0\0"):
+        if "exif" in info:
+            info["exif"] += data[6:]
+        else:
+            info["exif"] = data
+    elif marker == 0xFFE1 and data.startswith(b"http://ns.adobe.com/xap/1.0/\x00"):
+        info["xmp"] = data.split(b"\x00", 1)[1]
+    elif marker == 0xFFE2 and data.startswith(b"ICC_PROFILE\0"):
+        icc_chunks.append(data)
+    elif marker == 0xFFE2 and data.startswith((b"FPXR\0", b"MPF\0")):
+        # FlashPix and multi-picture (MPO) files get Pillow's handling.
+        raise _Fallback("FlashPix/MPF segment")
+    elif marker == 0xFFED and data.startswith(b"Photoshop 3.0\x00"):
+        raise _Fallback("Photoshop resource block")
+    elif marker == 0xFFEE and data.startswith(b"Adobe"):
+        info["adobe"] = struct.unpack(">H", data[5:7])[0]
+        if len(data) > 11:
+            info["adobe_transform"] = data[11]
+
+
+def _jpeg_dqt(data: bytes) -> None:
+    while data:
+        precision = 1 if data[0] // 16 == 0 else 2
+        table_length = 1 + precision * 64
+        if len(data) < table_length:
+            raise _Fallback("bad quantization table marker")
+        data = data[table_length:]
+
+
+# Walks APPn/COM/SOF segments up to the start of scan, mirroring the ``info``
+# that PIL's JPEG plugin builds. DPI taken from EXIF is left to the caller,
+# which already parses the EXIF block.
+def scan_jpeg(fp: BinaryIO) -> ScannedHeader | None:
+    try:
+        if fp.read(3) != JPEG_SIGNATURE:
+            return None
+
+        info: dict[str, Any] = {}
+        icc_chunks: list[bytes] = []
+        size: tuple[int, int] | None = None
+        s = b"\xff"
+
+        while True:
+            if s[0] != 0xFF:
+                s = _read_exact(fp, 1)
+                continue
+            s = s + _read_exact(fp, 1)
+            marker = struct.unpack(">H", s)[0]
+
+            if marker in (0, 0xFFFF):
+                s = b"\xff"
+                continue
+            if marker == 0xFF00:
+                s = _read_exact(fp, 1)
+                continue
+            if marker < 0xFFC0:
+                return None
+
+            if marker not in _JPEG_STANDALONE_MARKERS:
+                length = struct.unpack(">H", _read_exact(fp, 2))[0] - 2
+                data = _read_exact(fp, length)
+                if marker in _JPEG_SOF_MARKERS:
+                    if data[0] != 8 or data[5] not in (1, 3, 4):
+                        return None
+                    size = struct.unpack(">HH", data[1:5])[::-1]
+                    if marker in _JPEG_PROGRESSIVE_MARKERS:
+                        info["progressive"] = info["progression"] = 1
+                    if icc_chunks:
+                        icc_chunks.sort()
+                        if icc_chunks[0][13] == len(icc_chunks):
+                            info["icc_profile"] = b"".join(p[14:] for p in icc_chunks)
+                        else:
+                            info["icc_profile"] = None
+                        icc_chunks = []
+                elif 0xFFE0 <= marker <= 0xFFEF:
+                    _jpeg_app(info, icc_chunks, marker, data)
+                elif marker == 0xFFFE:
+                    info["comment"] = data
+                elif marker == 0xFFDB:
+                    _jpeg_dqt(data)
+
+            if marker == 0xFFDA:
+                break
+            s = _read_exact(fp, 1)
+    except (_Fallback, struct.error, IndexError):
+        return None
+
+    if size is None or size[0] * size[1] > MAX_SAFE_PIXELS:
+        return None
+    return ScannedHeader(format="JPEG", width=size[0], height=size[1], info=info)
+
+
+def _webp_bitstream_size(fourcc: bytes, data: bytes) -> tuple[int, int]:
+    if fourcc == b"VP8 ":
+        width, height = struct.unpack("<HH", data[6:10])
+        return width & 0x3FFF, height & 0x3FFF
+    if data[0] != 0x2F:
+        raise _Fallback("bad VP8L signature")
+    bits = struct.unpack("<I", data[1:5])[0]
+    return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+
+
+# Walks the RIFF chunk list. Bitstream chunks are seeked over so the EXIF/XMP
+# chunks that trail them in the extended layout are still found without
+# reading pixel data. ``loop``/``background`` follow libwebp's defaults.
+def scan_webp(fp: BinaryIO) -> ScannedHeader | None:
+    try:
+        header = _read_exact(fp, 12)
+        if header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+            return None
+        riff_end = 8 + struct.unpack("<I", header[4:8])[0]
+        file_end = fp.seek(0, 2)
+        fp.seek(12)
+        if riff_end > file_end:
+            return None
+
+        info: dict[str, Any] = {"loop": 1, "background": (255, 255, 255, 255)}
+        size: tuple[int, int] | None = None
+        extended = False
+        position = 12
+
+        while position + 8 <= riff_end:
+            chunk = _read_exact(fp, 8)
+            fourcc = chunk[:4]
+            length = struct.unpack("<I", chunk[4:])[0]
+            position += 8 + length + (length & 1)
+            if position > riff_end + (length & 1):
+                return None
+
+            if size is None and fourcc not in (b"VP8X", b"VP8 ", b"VP8L"):
+                return None
+            if fourcc == b"VP8X" and size is None:
+                data = _read_exact(fp, length)
+                extended = True
+                size = (
+                    int.from_bytes(data[4:7], "little") + 1,
+                    int.from_bytes(data[7:10], "little") + 1,
+                )
+            elif fourcc in (b"VP8 ", b"VP8L") and size is None:
+                size = _webp_bitstream_size(fourcc, _read_exact(fp, 10))
+                if not extended:
+                    break
+            elif fourcc == b"ANIM" and extended:
+                data = _read_exact(fp, length)
+                bgcolor, loop = struct.unpack("<IH", data[:6])
+                info["loop"] = loop
+                info["background"] = (
+                    (bgcolor >> 16) & 0xFF,
+                    (bgcolor >> 8) & 0xFF,
+                    bgcolor & 0xFF,
+                    (bgcolor >> 24) & 0xFF,
+                )
+            elif fourcc in _WEBP_METADATA_CHUNKS and extended:
+                data = _read_exact(fp, length)
+                key = _WEBP_METADATA_CHUNKS[fourcc]
+                if data and key not in info:
+                    info[key] = data
+            fp.seek(position)
+    except (_Fallback, struct.error, IndexError):
+        return None
+
+    if size is None or size[0] * size[1] > MAX_SAFE_PIXELS:
+        return None
+    # Keep Pillow's key order: loop, background, then icc_profile/exif/xmp.
+    ordered = {"loop": info.pop("loop"), "background": info.pop("background")}
+    for key in ("icc_profile", "exif", "xmp"):
+        if key in info:
+            ordered[key] = info[key]
+    return ScannedHeader(format="WEBP", width=size[0], height=size[1], info=ordered)
+
+
+def scan_header(file_path: Path, text_keys: frozenset[str] | None = None) -> ScannedHeader | None:
+    # ``text_keys`` only affects PNG text chunks; JPEG/WebP keep their metadata
+    # in EXIF/XMP blocks, which are filtered after parsing.
+    with open(file_path, "rb") as fp:
+        magic = fp.read(12)
+        fp.seek(0)
+        if magic.startswith(PNG_SIGNATURE):
+            return scan_png(fp, text_keys)
+        if magic.startswith(JPEG_SIGNATURE):
+            return scan_jpeg(fp)
+        if magic[:4] == b"RIFF" and magic[8:12] == b"WEBP":
+            return scan_webp(fp)
+    return None
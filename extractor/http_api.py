@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import socketserver
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+from extractor import __version__, jsonio
+from extractor.models import DiscoveredFile, ExtractOptions, RunTotals
+from extractor.server import MAX_BODY_BYTES, ExtractService, request_options
+
+# HTTP endpoints of the serve subcommand (see extractor.server).
+
+
+class ExtractHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = f"comfy-meta/{__version__}"
+
+    @property
+    def service(self) -> ExtractService:
+        return self.server.service  # type: ignore[attr-defined]
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send_bytes(self, status: int, data: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error_json(self, status: int, message: str) -> None:
+        self._send_bytes(status, jsonio.dumps_bytes({"error": message}))
+
+    def _stream(self, files: list[DiscoveredFile], options: ExtractOptions, totals: RunTotals) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for ok, data in self.service.outcomes(files, options, totals):
+                # The cached bytes are a JSON object; "type" goes in front, as
+                # NdjsonWriter writes it.
+                prefix = b'{"type":"result"' if ok else b'{"type":"error"'
+                self._chunk(prefix + (b"," + data[1:] if len(data) > 2 else b"}") + b"\n")
+            summary = {"type": "summary", "tool_version": __version__, "totals": vars(totals)}
+            self._chunk(jsonio.dumps_bytes(summary) + b"\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away mid-stream; nothing left to answer.
+            self.close_connection = True
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            status = {"status": "ok", "tool_version": __version__, "cache": self.service.cache.stats()}
+            self._send_bytes(200, jsonio.dumps_bytes(status))
+            return
+        if url.path != "/extract":
+            self._send_error_json(404, f"unknown endpoint: {url.path}")
+            return
+
+        query = parse_qs(url.query)
+        paths = query.pop("path", [])
+        if not paths:
+            self._send_error_json(400, "missing path parameter")
+            return
+        try:
+            options = request_options({name: values[-1] for name, values in query.items()})
+        except ValueError as exc:
+            self._send_error_json(400, str(exc))
+            return
+
+        totals = RunTotals()
+        files = self.service.resolve(paths, None, False, totals)
+        if len(files) > 1:
+            self._stream(files, options, totals)
+            return
+        ok, data = next(self.service.outcomes(files, options, totals))
+        self._send_bytes(200 if ok else 422, data)
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        if url.path != "/extract":
+            self._send_error_json(404, f"unknown endpoint: {url.path}")
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be delimited, so the connection cannot be reused.
+            self.close_connection = True
+            self._send_error_json(400, "invalid Content-Length")
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_error_json(413, "request body too large")
+            return
+        try:
+            request = jsonio.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("request body must be a JSON object")
+            # A null member counts as not given; wrong types are 400s.
+            paths = request.get("paths")
+            if paths is None:
+                paths = []
+            elif not isinstance(paths, list):
+                raise ValueError("paths must be a list of strings")
+            input_dir = request.get("input")
+            if not paths and not input_dir:
+                raise ValueError("give paths or input")
+            raw_options = request.get("options")
+            if raw_options is None:
+                raw_options = {}
+            elif not isinstance(raw_options, dict):
+                raise ValueError("options must be a JSON object")
+            options = request_options(raw_options)
+            recursive = request.get("recursive")
+            if recursive is None:
+                recursive = False
+            totals = RunTotals()
+            files = self.service.resolve(paths, input_dir, recursive, totals)
+        except FileNotFoundError as exc:
+            self._send_error_json(404, str(exc))
+            return
+        except ValueError as exc:
+            self._send_error_json(400, str(exc))
+            return
+        self._stream(files, options, totals)
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+else:
+    ThreadingUnixHTTPServer = None  # type: ignore[assignment,misc]
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from extractor.readers import iter_output_records
+from extractor.summary import build_summary
+
+COMMIT_EVERY = 1000
+# Bumped when stored values change meaning; older indexes are rebuilt by
+# 'index' and refused by queries.
+SCHEMA_VERSION = "2"
+# SQLite integers are signed 64-bit; ComfyUI seeds go up to 2**64 - 1.
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+# Literal node inputs that are indexed, mapped to the field name used in queries.
+PROMPT_INPUT_FIELDS = {
+    "ckpt_name": "checkpoint",
+    "seed": "seed",
+    "noise_seed": "seed",
+    "sampler_name": "sampler",
+    "scheduler": "scheduler",
+    "steps": "steps",
+    "cfg": "cfg",
+    "lora_name": "lora",
+}
+TEXT_FIELDS = {"checkpoint", "sampler", "scheduler", "lora", "class_type"}
+NUMERIC_FIELDS = {"seed", "steps", "cfg"}
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS images (
+        id INTEGER PRIMARY KEY,
+        file_path TEXT NOT NULL UNIQUE,
+        format TEXT,
+        width INTEGER,
+        height INTEGER,
+        size_bytes INTEGER
+    )
+    """,
+    # One row per (image, field, value); multi-valued fields such as LoRAs or
+    # the seeds of several samplers get several rows. NUMERIC keeps integers
+    # as exact INTEGER values (REAL would round seeds above 2**53); integers
+    # beyond 64 bits go to text_value as their decimal digits.
+    """
+    CREATE TABLE IF NOT EXISTS fields (
+        image_id INTEGER NOT NULL REFERENCES images(id) ON DELETE CASCADE,
+        name TEXT NOT NULL,
+        text_value TEXT,
+        num_value NUMERIC
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS images_format ON images (format)",
+    "CREATE INDEX IF NOT EXISTS images_size ON images (width, height)",
+    "CREATE INDEX IF NOT EXISTS fields_text ON fields (name, text_value)",
+    "CREATE INDEX IF NOT EXISTS fields_num ON fields (name, num_value)",
+    "CREATE INDEX IF NOT EXISTS fields_image ON fields (image_id)",
+)
+
+
+def prompt_fields(prompt: Any) -> Iterator[tuple[str, Any]]:
+    if not isinstance(prompt, dict):
+        return
+    for node in prompt.values():
+        if not isinstance(node, dict):
+            continue
+        class_type = node.get("class_type")
+        if isinstance(class_type, str):
+            yield "class_type", class_type
+        inputs = node.get("inputs")
+        if not isinstance(inputs, dict):
+            continue
+        for input_name, field_name in PROMPT_INPUT_FIELDS.items():
+            value = inputs.get(input_name)
+            # Linked inputs are [node_id, output_index]; only literals are indexed.
+            if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                yield field_name, value
+
+
+# comfyui.summary keys that are indexed, mapped to the field name used in queries.
+SUMMARY_FIELDS = {
+    "checkpoint": "checkpoint",
+    "seed": "seed",
+    "sampler": "sampler",
+    "scheduler": "scheduler",
+    "steps": "steps",
+    "cfg": "cfg",
+}
+
+
+def summary_fields(summary: Any) -> Iterator[tuple[str, Any]]:
+    # Covers values the literal scan above misses, such as seeds linked from a
+    # primitive node, and records written with --summary-only.
+    if not isinstance(summary, dict):
+        return
+    for generation_pass in (summary, *summary.get("passes", ())):
+        for key, field_name in SUMMARY_FIELDS.items():
+            value = generation_pass.get(key)
+            if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                yield field_name, value
+        for lora in generation_pass.get("loras", ()):
+            if isinstance(lora.get("name"), str):
+                yield "lora", lora["name"]
+
+
+def _schema_version(conn: sqlite3.Connection) -> str | None:
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'").fetchone() is None:
+        return None
+    row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    return None if row is None else row[0]
+
+
+def open_index(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA foreign_keys = ON")
+    if _schema_version(conn) != SCHEMA_VERSION:
+        # Older indexes stored numbers as REAL; their values cannot be repaired.
+        conn.execute("DROP TABLE IF EXISTS fields")
+        conn.execute("DROP TABLE IF EXISTS images")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,)
+        )
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def _numeric(value: Any) -> int | float | None:
+    # Integers (including digit strings) stay exact; other numbers are floats.
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        for parse in (int, float):
+            try:
+                return parse(value)
+            except ValueError:
+                pass
+    return None
+
+
+def _is_wide_int(number: int | float) -> bool:
+    return isinstance(number, int) and not INT64_MIN <= number <= INT64_MAX
+
+
+def _field_row(image_id: int, name: str, value: Any) -> tuple[int, str, str | None, int | float | None]:
+    if name in NUMERIC_FIELDS:
+        number = _numeric(value)
+        if number is not None:
+            if _is_wide_int(number):
+                return image_id, name, str(number), None
+            return image_id, name, None, number
+    return image_id, name, str(value), None
+
+
+def index_record(conn: sqlite3.Connection, record: dict[str, Any]) -> None:
+    dimensions = record.get("dimensions") or {}
+    conn.execute("DELETE FROM images WHERE file_path = ?", (record["file_path"],))
+    cursor = conn.execute(
+        "INSERT INTO images (file_path, format, width, height, size_bytes) VALUES (?, ?, ?, ?, ?)",
+        (
+            record["file_path"],
+            record.get("format"),
+            dimensions.get("width"),
+            dimensions.get("height"),
+            record.get("size_bytes"),
+        ),
+    )
+    image_id = cursor.lastrowid
+    comfyui = record.get("comfyui") or {}
+    rows = {_field_row(image_id, name, value) for name, value in prompt_fields(comfyui.get("prompt"))}
+    summary = comfyui.get("summary") or build_summary(comfyui)
+    rows.update(_field_row(image_id, name, value) for name, value in summary_fields(summary))
+    conn.executemany(
+        "INSERT INTO fields (image_id, name, text_value, num_value) VALUES (?, ?, ?, ?)", rows
+    )
+
+
+def build_index(db_path: Path, inputs: Iterable[Path]) -> int:
+    # Loads the results of one or more extract outputs; re-indexing a path
+    # replaces its previous row.
+    indexed = 0
+    conn = open_index(db_path)
+    try:
+        for input_path in inputs:
+            for record_type, item in iter_output_records(input_path):
+                if record_type != "result":
+                    continue
+                index_record(conn, item)
+                indexed += 1
+                if indexed % COMMIT_EVERY == 0:
+                    conn.commit()
+        conn.commit()
+    finally:
+        conn.close()
+    return indexed
+
+
+def _field_condition(name: str, value: Any) -> tuple[str, list[Any]]:
+    number = _numeric(value) if name in NUMERIC_FIELDS else None
+    if number is not None:
+        if _is_wide_int(number):
+            return "SELECT image_id FROM fields WHERE name = ? AND text_value = ?", [name, str(number)]
+        return "SELECT image_id FROM fields WHERE name = ? AND num_value = ?", [name, number]
+    text = str(value)
+    # Glob patterns ("*", "?") match like shell wildcards; plain values match exactly.
+    operator = "GLOB" if any(ch in text for ch in "*?[") else "="
+    return f"SELECT image_id FROM fields WHERE name = ? AND text_value {operator} ?", [name, text]
+
+
+def query_index(
+    db_path: Path,
+    filters: dict[str, Any],
+    image_format: str | None = None,
+    min_width: int | None = None,
+    min_height: int | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    conditions: list[str] = []
+    params: list[Any] = []
+
+    for name, value in filters.items():
+        if value is None:
+            continue
+        clause, clause_params = _field_condition(name, value)
+        conditions.append(f"id IN ({clause})")
+        params.extend(clause_params)
+    if image_format:
+        conditions.append("format = ?")
+        params.append(image_format.upper())
+    if min_width is not None:
+        conditions.append("width >= ?")
+        params.append(min_width)
+    if min_height is not None:
+        conditions.append("height >= ?")
+        params.append(min_height)
+
+    sql = "SELECT file_path, format, width, height, size_bytes FROM images"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY file_path"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    conn = sqlite3.connect(str(db_path))
+    try:
+        if _schema_version(conn) != SCHEMA_VERSION:
+            raise ValueError(f"{db_path} was built by an older version; run 'index' again")
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    return [
+        {"file_path": path, "format": fmt, "dimensions": {"width": width, "height": height}, "size_bytes": size}
+        for path, fmt, width, height, size in rows
+    ]
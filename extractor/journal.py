@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any
+
+from extractor import __version__, jsonio
+
+# Lines written between fsyncs; every line is flushed to the OS right away, so
+# only a machine crash (not a process crash or Ctrl+C) can lose the last few.
+SYNC_EVERY = 1000
+
+# Entries are written as {"path", "size", "mtime_ns", "ok", "item"} in that
+# order, so the key fields end where this begins (a quote inside a JSON string
+# is always escaped).
+_RECORD_MARKER = b',"ok":'
+
+
+class JournalMismatchError(ValueError):
+    pass
+
+
+class ExtractionJournal:
+    # Append-only NDJSON log of finished files, one line per record or error,
+    # so an interrupted extract run can resume where it stopped. The first line
+    # describes the run (input, options, tool version); a resumed run must
+    # match it. Entries are keyed by discovered path, size and mtime, and only
+    # their byte offsets are kept in memory.
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        self.path = path
+        self.resumed = 0
+        self._header: dict[str, Any] | None = None
+        self._entries: dict[str, tuple[int, int, int]] = {}
+        self._pending = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and path.exists():
+            self._fp = path.open("r+b")
+            self._load()
+        else:
+            self._fp = path.open("w+b")
+
+    def _load(self) -> None:
+        # A crash can leave a partial last line; it is cut off so appends
+        # start on a clean line.
+        good_end = 0
+        self._fp.seek(0)
+        while True:
+            offset = self._fp.tell()
+            line = self._fp.readline()
+            if not line.endswith(b"\n"):
+                break
+            try:
+                if self._header is None:
+                    self._header = jsonio.loads(line)
+                else:
+                    # Only the key fields in front of the record are decoded.
+                    head, found, _ = line.partition(_RECORD_MARKER)
+                    entry = jsonio.loads(head + b"}" if found else line)
+                    self._entries[entry["path"]] = (entry["size"], entry["mtime_ns"], offset)
+            except (ValueError, KeyError):
+                break
+            good_end = self._fp.tell()
+        self._fp.seek(good_end)
+        self._fp.truncate()
+
+    def start(self, run: dict[str, Any]) -> None:
+        # ``run`` identifies the input and options; journals of other runs are
+        # refused rather than mixed in.
+        run = {"tool_version": __version__, **run}
+        if self._header is not None:
+            if self._header != run:
+                raise JournalMismatchError(
+                    f"journal {self.path} belongs to a different run (input, options or "
+                    "tool version changed); delete it or run without --resume"
+                )
+            return
+        self._header = run
+        self._write(run)
+
+    def contains(self, path: str, size: int, mtime_ns: int) -> bool:
+        entry = self._entries.get(path)
+        return entry is not None and entry[0] == size and entry[1] == mtime_ns
+
+    def load(self, path: str) -> tuple[bool, dict[str, Any]]:
+        offset = self._entries[path][2]
+        end = self._fp.tell()
+        self._fp.seek(offset)
+        entry = jsonio.loads(self._fp.readline())
+        self._fp.seek(end)
+        self.resumed += 1
+        return entry["ok"], entry["item"]
+
+    def append(self, path: str, size: int, mtime_ns: int, ok: bool, item: dict[str, Any]) -> None:
+        self._write({"path": path, "size": size, "mtime_ns": mtime_ns, "ok": ok, "item": item})
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        self._fp.write(jsonio.dumps_bytes(entry) + b"\n")
+        self._fp.flush()
+        self._pending += 1
+        if self._pending >= SYNC_EVERY:
+            os.fsync(self._fp.fileno())
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._fp.closed:
+            return
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._fp.close()
+
+    def discard(self) -> None:
+        # Called once the final output is written; the journal is no longer needed.
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+# orjson is used when installed; COMFY_META_JSON=stdlib forces the standard
+# library codec (e.g. to compare output or timings).
+try:
+    if os.environ.get("COMFY_META_JSON", "").lower() == "stdlib":
+        raise ImportError
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# Both backends write the same bytes: compact separators when not pretty,
+# two-space indent when pretty, non-ASCII text unescaped. Known differences:
+# orjson writes NaN/Infinity as null (stdlib writes the non-standard NaN
+# literal) and may format float exponents differently ("1e16" vs "1e+16").
+
+
+def loads(data: str | bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # The stdlib accepts a few things orjson rejects (NaN literals,
+            # integers beyond 64 bits, lone surrogates); it also raises the
+            # error callers expect for text that is not JSON at all.
+            pass
+    return json.loads(data)
+
+
+def dumps_bytes(value: Any, pretty: bool = False) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2 if pretty else 0)
+        except orjson.JSONEncodeError:
+            # Non-string keys, integers beyond 64 bits and other rarities.
+            pass
+    return _stdlib_dumps(value, pretty).encode("utf-8")
+
+
+def dumps(value: Any, pretty: bool = False) -> str:
+    if orjson is not None:
+        return dumps_bytes(value, pretty).decode("utf-8")
+    return _stdlib_dumps(value, pretty)
+
+
+def _stdlib_dumps(value: Any, pretty: bool) -> str:
+    if pretty:
+        return json.dumps(value, indent=2, ensure_ascii=False)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, TextIO
+
+from extractor import __version__, jsonio
+from extractor.blobs import BlobTable
+from extractor.discovery import format_shard, parse_shard
+from extractor.models import RunTotals
+from extractor.readers import iter_output_records, read_output_summary
+from extractor.serialization import utc_now_iso8601
+from extractor.writers import NdjsonWriter
+
+COPY_CHUNK = 1024 * 1024
+TOTAL_FIELDS = ("discovered", "processed_ok", "failed", "skipped_unsupported")
+
+
+def plan_merge(paths: list[Path]) -> tuple[list[Path], dict[str, Any], RunTotals, list[str]]:
+    # Reads only the summaries: returns the inputs in merge order (by shard
+    # index when every input is a shard, otherwise as given), the merged
+    # header, summed totals and warnings about missing shards.
+    summaries = [(path, read_output_summary(path)) for path in paths]
+    shards = [summary.get("input", {}).get("shard") for _, summary in summaries]
+    warnings: list[str] = []
+
+    if all(shards):
+        parsed = [parse_shard(spec) for spec in shards]
+        counts = {count for _, count in parsed}
+        if len(counts) > 1:
+            raise ValueError(f"inputs come from different shard counts: {', '.join(sorted(set(shards)))}")
+        indexes = [index for index, _ in parsed]
+        duplicates = sorted({index for index in indexes if indexes.count(index) > 1})
+        if duplicates:
+            raise ValueError(f"shard {format_shard((duplicates[0], counts.pop()))} is given more than once")
+        count = counts.pop()
+        missing = [format_shard((index, count)) for index in range(count) if index not in indexes]
+        if missing:
+            warnings.append(f"shards missing from the merge: {', '.join(missing)}")
+        summaries = [item for _, item in sorted(zip(indexes, summaries), key=lambda pair: pair[0])]
+
+    totals = RunTotals()
+    for _, summary in summaries:
+        for name in TOTAL_FIELDS:
+            setattr(totals, name, getattr(totals, name) + int(summary.get("totals", {}).get(name, 0)))
+
+    input_info = dict(summaries[0][1].get("input", {}))
+    input_info.pop("shard", None)
+    header = {
+        "tool_version": __version__,
+        "run_at": utc_now_iso8601(),
+        "input": input_info,
+        "totals": {name: getattr(totals, name) for name in TOTAL_FIELDS},
+    }
+    return [path for path, _ in summaries], header, totals, warnings
+
+
+def _write_ndjson(fp: TextIO, paths: list[Path], header: dict[str, Any], blobs: BlobTable | None) -> None:
+    writer = NdjsonWriter(fp)
+    for path in paths:
+        for record_type, item in iter_output_records(path):
+            if record_type == "result":
+                writer.write_result(item, blobs)
+            elif record_type == "error":
+                writer.write("error", item)
+    writer.write("summary", header)
+
+
+def _write_json(fp: TextIO, paths: list[Path], header: dict[str, Any], blobs: BlobTable | None) -> None:
+    # Same bytes as a compact extract payload, written as records arrive;
+    # errors wait in a temporary file until the results are done. With a blob
+    # table, which is written last, records keep the references of deduped
+    # inputs and the input tables are merged in, so a JSON input is read once.
+    fp.write(jsonio.dumps(header)[:-1] + ',"results":[')
+    separator = ""
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as errors:
+        error_separator = ""
+        for path in paths:
+            for record_type, item in iter_output_records(path, resolve_blobs=blobs is None):
+                if record_type == "blob" and blobs is not None:
+                    blobs.blobs.setdefault(item["sha256"], item["value"])
+                elif record_type == "result":
+                    if blobs is not None:
+                        blobs.dedupe_record(item)
+                    fp.write(separator + jsonio.dumps(item))
+                    separator = ","
+                elif record_type == "error":
+                    errors.write(error_separator + jsonio.dumps(item))
+                    error_separator = ","
+        fp.write('],"errors":[')
+        errors.seek(0)
+        shutil.copyfileobj(errors, fp, COPY_CHUNK)
+    fp.write("]")
+    if blobs is not None:
+        fp.write(',"blobs":' + jsonio.dumps(blobs.blobs))
+    fp.write("}")
+
+
+def merge_outputs(
+    paths: list[Path], fp: TextIO, ndjson: bool = False, dedupe_blobs: bool = False
+) -> tuple[RunTotals, list[str]]:
+    # Combines extract outputs (typically the shards of one --shard run) into
+    # one. Inputs are streamed one record at a time, one after another; only
+    # their summaries are read to plan the merge.
+    ordered, header, totals, warnings = plan_merge(paths)
+    blobs = BlobTable() if dedupe_blobs else None
+    if ndjson:
+        _write_ndjson(fp, ordered, header, blobs)
+    else:
+        _write_json(fp, ordered, header, blobs)
+    return totals, warnings
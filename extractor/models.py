@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageResult:
     file_path: str
     format: str
@@ -13,6 +14,8 @@ class ImageResult:
     exif: dict[str, Any] = field(default_factory=dict)
     comfyui: dict[str, Any] = field(default_factory=dict)
     raw_metadata: dict[str, Any] = field(default_factory=dict)
+    # Metadata keys present in the file but not loaded because of ExtractOptions.keys.
+    unloaded_keys: list[str] = field(default_factory=list)
 
 
 @dataclass
@@ -28,3 +31,39 @@ class RunTotals:
     processed_ok: int = 0
     failed: int = 0
     skipped_unsupported: int = 0
+
+
+@dataclass
+class ScannedHeader:
+    format: str
+    width: int
+    height: int
+    info: dict[str, Any] = field(default_factory=dict)
+    # Text chunk keywords skipped without decompressing (see scan_header's text_keys).
+    unloaded_keys: list[str] = field(default_factory=list)
+
+
+@dataclass
+class DiscoveredFile:
+    path: Path
+    relative_path: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class ExtractOptions:
+    # Dotted record paths to keep, e.g. ("dimensions", "comfyui.prompt"); None keeps everything.
+    fields: tuple[str, ...] | None = None
+    dedupe_raw: bool = False
+    max_base64_bytes: int | None = None
+    # Metadata keys (text chunk keywords, case-insensitive) to load; others are
+    # skipped before decompression and listed under unloaded_keys. None loads all.
+    keys: tuple[str, ...] | None = None
+    # Add comfyui.summary (checkpoint, LoRAs, sampler settings, prompt text).
+    summary: bool = False
+    # Add comfyui.fingerprint (structure/parameters hashes of the prompt graph).
+    fingerprint: bool = False
+    # Attach per-stage timings to each record for BatchHook.on_file; set by
+    # iter_batch when hooks are given.
+    collect_timings: bool = False
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+from typing import Any, Protocol
+
+# Per-file stages, in pipeline order. "record" covers building and projecting
+# the output record; "total" is the whole extraction of one file.
+FILE_STAGES = ("read", "exif", "json_safe", "parse", "record", "total")
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended.
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+DEFAULT_TOP_N = 10
+# Percentiles come from log-spaced buckets: each is this much wider than the
+# previous one, so a reported percentile is within 0.5% of the true value
+# while the number of buckets stays bounded (about 2,100 from 1 us to 1 h).
+SKETCH_GAMMA = 1.01
+_LOG_GAMMA = math.log(SKETCH_GAMMA)
+
+
+class BatchHook(Protocol):
+    # Receives timings from process_batch/iter_batch. on_file runs in the main
+    # process once per extracted file (cache hits are not reported); on_stage
+    # reports run-wide stages such as discovery and output writing.
+    def on_file(self, file_path: str, timings: dict[str, float]) -> None: ...
+
+    def on_stage(self, stage: str, seconds: float) -> None: ...
+
+
+def _bucket_label(index: int) -> str:
+    if index == len(BUCKET_BOUNDS_MS):
+        return f">{BUCKET_BOUNDS_MS[-1]:g}ms"
+    return f"<={BUCKET_BOUNDS_MS[index]:g}ms"
+
+
+class StageTimings:
+    # Streaming summary of one stage's durations: exact count, total, min and
+    # max, the display histogram, and a log-bucket sketch for percentiles.
+    # Memory does not grow with the number of files.
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self._sketch: dict[int, int] = {}
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, seconds * 1000)] += 1
+        # Bucket i holds (gamma^(i-1), gamma^i]; zero and below share one.
+        index = math.ceil(math.log(seconds) / _LOG_GAMMA) if seconds > 0 else -(1 << 30)
+        self._sketch[index] = self._sketch.get(index, 0) + 1
+
+    def percentile(self, fraction: float) -> float:
+        # Nearest rank, reported as the middle of its bucket, clamped to the
+        # observed min/max.
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index in sorted(self._sketch):
+            seen += self._sketch[index]
+            if seen >= rank:
+                break
+        estimate = 2 * SKETCH_GAMMA**index / (SKETCH_GAMMA + 1) if index > -(1 << 30) else 0.0
+        return min(max(estimate, self.min), self.max)
+
+
+class Profiler:
+    # BatchHook that aggregates every file's stage timings as it arrives and
+    # summarises them as percentiles, histograms and the slowest files.
+    def __init__(self, top_n: int = DEFAULT_TOP_N) -> None:
+        self.top_n = top_n
+        self._stages: dict[str, StageTimings] = {}
+        self._slowest: list[tuple[float, int, str, dict[str, float]]] = []
+        self._run_stages: dict[str, float] = {}
+        self._files = 0
+
+    def on_file(self, file_path: str, timings: dict[str, float]) -> None:
+        for stage, seconds in timings.items():
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageTimings()
+            stats.add(seconds)
+        total = timings.get("total", 0.0)
+        entry = (total, self._files, file_path, timings)
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and total > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+        self._files += 1
+
+    def on_stage(self, stage: str, seconds: float) -> None:
+        self._run_stages[stage] = self._run_stages.get(stage, 0.0) + seconds
+
+    def summary(self) -> dict[str, Any]:
+        stages: dict[str, Any] = {}
+        ordered = [stage for stage in FILE_STAGES if stage in self._stages]
+        ordered += sorted(stage for stage in self._stages if stage not in FILE_STAGES)
+        for stage in ordered:
+            stats = self._stages[stage]
+            stages[stage] = {
+                "count": stats.count,
+                "total_s": round(stats.total, 6),
+                "p50_ms": round(stats.percentile(0.50) * 1000, 3),
+                "p95_ms": round(stats.percentile(0.95) * 1000, 3),
+                "p99_ms": round(stats.percentile(0.99) * 1000, 3),
+                "max_ms": round(stats.max * 1000, 3),
+                "histogram": {_bucket_label(i): count for i, count in enumerate(stats.buckets) if count},
+            }
+
+        slowest = sorted(self._slowest, key=lambda entry: (-entry[0], entry[1]))
+        return {
+            "files": self._files,
+            "run_stages_s": {stage: round(seconds, 6) for stage, seconds in self._run_stages.items()},
+            "file_stages": stages,
+            "slowest": [
+                {"file_path": path, **{f"{stage}_ms": round(value * 1000, 3) for stage, value in timings.items()}}
+                for _, _, path, timings in slowest
+            ],
+        }
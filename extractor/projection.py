@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
+
+RECORD_SECTIONS = ("format", "size_bytes", "dimensions", "exif", "comfyui", "raw_metadata")
+# What extract --summary-only keeps.
+SUMMARY_ONLY_FIELDS = ("format", "size_bytes", "dimensions", "comfyui.summary")
+
+# section -> set of kept sub-keys, or None to keep the whole section.
+FieldPlan = dict[str, "frozenset[str] | None"]
+
+
+def parse_fields(spec: str) -> tuple[str, ...]:
+    fields = tuple(part.strip() for part in spec.split(",") if part.strip())
+    if not fields:
+        raise ValueError("no fields given")
+    for field_name in fields:
+        section = field_name.split(".", 1)[0]
+        if section not in RECORD_SECTIONS:
+            raise ValueError(
+                f"unknown field {field_name!r} (expected one of: {', '.join(RECORD_SECTIONS)})"
+            )
+    return fields
+
+
+@lru_cache(maxsize=32)
+def field_plan(fields: tuple[str, ...] | None) -> FieldPlan | None:
+    if fields is None:
+        return None
+    plan: dict[str, set[str] | None] = {}
+    for field_name in fields:
+        section, _, key = field_name.partition(".")
+        if not key or plan.get(section, set()) is None:
+            plan[section] = None
+        else:
+            plan.setdefault(section, set()).add(key)  # type: ignore[union-attr]
+    return {section: None if keys is None else frozenset(keys) for section, keys in plan.items()}
+
+
+def wants(plan: FieldPlan | None, section: str) -> bool:
+    return plan is None or section in plan
+
+
+def wanted_keys(plan: FieldPlan | None, section: str) -> frozenset[str] | None:
+    # Sub-keys requested for ``section``; None means all of them.
+    return None if plan is None else plan.get(section)
+
+
+def project_record(record: dict[str, Any], plan: FieldPlan | None) -> dict[str, Any]:
+    # file_path, unloaded_keys and warnings always stay so a record can still
+    # be identified and its skipped keys and parse problems seen.
+    if plan is None:
+        return record
+    projected: dict[str, Any] = {"file_path": record["file_path"]}
+    for section in RECORD_SECTIONS:
+        if section not in plan or section not in record:
+            continue
+        keys = plan[section]
+        value = record[section]
+        if keys is not None and isinstance(value, dict):
+            value = {key: item for key, item in value.items() if key in keys}
+        projected[section] = value
+    for key in ("unloaded_keys", "warnings"):
+        if key in record:
+            projected[key] = record[key]
+    return projected
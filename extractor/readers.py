@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+from extractor import jsonio
+from extractor.blobs import has_blob_refs, resolve_blob_refs
+
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+READ_BLOCK = 1 << 16
+# Top-level payload members read one element at a time.
+STREAMED_MEMBERS = ("results", "errors")
+
+_DECODER = json.JSONDecoder()
+_NON_SPACE = re.compile(r"\S")
+
+
+def is_ndjson_path(path: Path) -> bool:
+    if path.suffix.lower() in NDJSON_SUFFIXES:
+        return True
+    # NdjsonWriter always puts "type" first, which a JSON payload never does.
+    with path.open("r", encoding="utf-8") as f:
+        return f.read(16).startswith('{"type":')
+
+
+class _JsonStream:
+    # Decodes a JSON text one value at a time from a sliding buffer, so only
+    # the value being decoded is held, not the whole document.
+    def __init__(self, f: TextIO) -> None:
+        self._f = f
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> None:
+        text = self._f.read(size)
+        if not text:
+            self._eof = True
+            return
+        self._buffer = self._buffer[self._pos :] + text
+        self._pos = 0
+
+    def peek(self) -> str:
+        # The next non-whitespace character, not consumed ("" at the end).
+        while True:
+            match = _NON_SPACE.search(self._buffer, self._pos)
+            if match is not None:
+                self._pos = match.start()
+                return self._buffer[self._pos]
+            self._pos = len(self._buffer)
+            if self._eof:
+                return ""
+            self._fill(READ_BLOCK)
+
+    def take(self, expected: str) -> None:
+        found = self.peek()
+        if found != expected:
+            raise ValueError(f"invalid JSON payload: expected {expected!r}, found {found or 'end of file'!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+                # A number ending with the buffer may continue in the file.
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # Reading as much again as the value holds so far keeps a large
+            # value from being re-decoded more than a few times.
+            self._fill(max(READ_BLOCK, len(self._buffer) - self._pos))
+
+
+def _iter_members(stream: _JsonStream) -> Iterator[tuple[str, Any]]:
+    # Members of the top-level object as (name, value); STREAMED_MEMBERS
+    # arrays come as one (name, element) pair per element instead.
+    stream.take("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        name = stream.value()
+        stream.take(":")
+        if name in STREAMED_MEMBERS and stream.peek() == "[":
+            stream.take("[")
+            if stream.peek() != "]":
+                while True:
+                    yield name, stream.value()
+                    if stream.peek() != ",":
+                        break
+                    stream.take(",")
+            stream.take("]")
+        else:
+            yield name, stream.value()
+        if stream.peek() != ",":
+            break
+        stream.take(",")
+    stream.take("}")
+
+
+def _read_payload_blobs(path: Path) -> dict[str, Any]:
+    # The blob table is written after the results it serves, so it is read
+    # by a second pass; only outputs written with --dedupe-blobs need one.
+    with path.open("r", encoding="utf-8") as f:
+        for name, value in _iter_members(_JsonStream(f)):
+            if name == "blobs" and isinstance(value, dict):
+                return value
+    return {}
+
+
+def _iter_json_payload(path: Path, resolve_blobs: bool = True) -> Iterator[tuple[str, dict[str, Any]]]:
+    # The header members come first in a payload, so the summary is complete
+    # once the results begin.
+    summary: dict[str, Any] = {}
+    summary_sent = False
+    blobs: dict[str, Any] | None = None
+    with path.open("r", encoding="utf-8") as f:
+        for name, value in _iter_members(_JsonStream(f)):
+            if name in STREAMED_MEMBERS:
+                if not summary_sent:
+                    summary_sent = True
+                    yield "summary", summary
+                if name == "results":
+                    if resolve_blobs and has_blob_refs(value):
+                        if blobs is None:
+                            blobs = _read_payload_blobs(path)
+                        resolve_blob_refs(value, blobs)
+                    yield "result", value
+                else:
+                    yield "error", value
+            elif name == "blobs":
+                if not resolve_blobs and isinstance(value, dict):
+                    for digest, blob in value.items():
+                        yield "blob", {"sha256": digest, "value": blob}
+            elif not summary_sent:
+                summary[name] = value
+    if not summary_sent:
+        yield "summary", summary
+
+
+def _iter_ndjson(path: Path, resolve_blobs: bool = True) -> Iterator[tuple[str, dict[str, Any]]]:
+    blobs: dict[str, Any] = {}
+    with path.open("rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = jsonio.loads(line)
+            record_type = item.pop("type", "result")
+            if record_type == "blob" and resolve_blobs:
+                blobs[item["sha256"]] = item["value"]
+                continue
+            if record_type == "result" and blobs:
+                resolve_blob_refs(item, blobs)
+            yield record_type, item
+
+
+def iter_output_records(path: Path, resolve_blobs: bool = True) -> Iterator[tuple[str, dict[str, Any]]]:
+    # Reads an ``extract`` output file (JSON or NDJSON) as (type, item) pairs,
+    # type being "result", "error" or "summary", with blob references resolved.
+    # Both formats are streamed: NDJSON line by line, a JSON payload one
+    # record at a time. With resolve_blobs=False, records keep their blob
+    # references and the blob table comes as ("blob", {"sha256", "value"})
+    # items instead; a JSON payload has them after its results.
+    if is_ndjson_path(path):
+        return _iter_ndjson(path, resolve_blobs)
+    return _iter_json_payload(path, resolve_blobs)
+
+
+def _last_line(path: Path, block_size: int = 65536) -> bytes:
+    # Reads backwards from the end, so only the tail of the file is touched.
+    with path.open("rb") as f:
+        end = f.seek(0, 2)
+        tail = b""
+        position = end
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            stripped = tail.rstrip()
+            if b"\n" in stripped:
+                return stripped.rsplit(b"\n", 1)[1]
+        return tail.strip()
+
+
+def read_output_summary(path: Path) -> dict[str, Any]:
+    # The summary (tool_version, run_at, input, totals) of an ``extract``
+    # output. NDJSON keeps it on the last line, which is read without scanning
+    # the file; a JSON payload has it in front, and only that part is read.
+    if not is_ndjson_path(path):
+        records = _iter_json_payload(path, resolve_blobs=False)
+        try:
+            return next(records)[1]
+        finally:
+            records.close()
+    item = jsonio.loads(_last_line(path) or b"{}")
+    if item.pop("type", None) != "summary":
+        raise ValueError(f"{path} has no summary line; the extract run that wrote it did not finish")
+    return item
@@ -1,13 +1,373 @@
 from __future__ import annotations
 
-import json
+import io
+import itertools
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator, TextIO
 
+from extractor import jsonio
+from extractor.blobs import is_blob_ref
+from extractor.defaults import DEFAULT_SHARD_SIZE, VIRTUAL_THRESHOLD
+from extractor.store import ResultStore
 
-def build_report_html(payload: dict[str, Any]) -> str:
-    payload_json = json.dumps(payload, ensure_ascii=False)
-    template = """<!doctype html>
+# Search leaves are taken from these sections; the UI workflow and raw_metadata
+# repeat what prompt/parameters already hold, so they are left out.
+SEARCH_SECTIONS = ("comfyui", "exif")
+SEARCH_SKIP_KEYS = {"workflow"}
+SKIPPED_VALUE_TYPES = {"bytes_base64", "bytes_omitted"}
+COPY_CHUNK = 1 << 20
+
+
+def _collect_leaves(value: Any, blobs: dict[str, Any], parts: list[Any]) -> None:
+    # A reference to a blob not in ``blobs`` is kept in ``parts`` as is, to be
+    # expanded once the blob table is complete.
+    if is_blob_ref(value):
+        if value["sha256"] not in blobs:
+            parts.append(value)
+            return
+        value = blobs[value["sha256"]]
+    if isinstance(value, dict):
+        if value.get("_type") in SKIPPED_VALUE_TYPES:
+            return
+        for key, item in value.items():
+            parts.append(str(key))
+            _collect_leaves(item, blobs, parts)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_leaves(item, blobs, parts)
+    elif value is not None:
+        parts.append(str(value))
+
+
+def _search_parts(record: dict[str, Any], blobs: dict[str, Any]) -> list[Any]:
+    parts: list[Any] = [str(record.get("file_path", "")), str(record.get("format", ""))]
+    for section_name in SEARCH_SECTIONS:
+        section = record.get(section_name)
+        if not isinstance(section, dict):
+            continue
+        for key, value in section.items():
+            if key in SEARCH_SKIP_KEYS:
+                continue
+            parts.append(key)
+            _collect_leaves(value, blobs, parts)
+    return parts
+
+
+def _join_search(parts: Iterable[Any]) -> str:
+    # Unresolved blob references are left out.
+    return "\n".join(dict.fromkeys(part for part in parts if part and isinstance(part, str))).lower()
+
+
+def search_text(record: dict[str, Any], blobs: dict[str, Any] | None = None) -> str:
+    # Lower-cased, de-duplicated text the report filters on, built once here
+    # instead of stringifying every record in the browser.
+    return _join_search(_search_parts(record, blobs or {}))
+
+
+def _row(record: dict[str, Any]) -> list[Any]:
+    dimensions = record.get("dimensions") or {}
+    return [
+        record.get("file_path"),
+        record.get("format"),
+        dimensions.get("width"),
+        dimensions.get("height"),
+        record.get("size_bytes"),
+    ]
+
+
+def _embed_json(value: Any) -> str:
+    # "<" only occurs inside JSON strings, where \u003c is equivalent; this
+    # keeps "</script>" in metadata from closing the payload element.
+    return jsonio.dumps(value).replace("<", "\\u003c")
+
+
+class _Spool:
+    # Comma-separated JSON values collected on disk while records stream by,
+    # copied into the page once the records are done. Each value is on a line
+    # of its own, so the spool can also be read back value by value.
+    def __init__(self) -> None:
+        import tempfile
+
+        self._file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self._empty = True
+
+    def append(self, text: str) -> None:
+        if not self._empty:
+            self._file.write(",\n")
+        self._file.write(text)
+        self._empty = False
+
+    def __iter__(self) -> Iterator[str]:
+        self._file.seek(0)
+        for line in self._file:
+            yield line.rstrip("\n").removesuffix(",")
+
+    def copy_to(self, fp: TextIO) -> None:
+        import shutil
+
+        self._file.seek(0)
+        shutil.copyfileobj(self._file, fp, COPY_CHUNK)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ReportWriter:
+    # Streams the report to ``fp`` one record at a time, so memory stays flat
+    # however many records there are. Records go straight to the page (or, in
+    # virtual mode with ``shard_dir``, to numbered shard scripts in that
+    # directory); list rows, search text and errors are spooled to temporary
+    # files and written after them. Records may keep blob references: each
+    # blob is written once, in the page's blob table, and resolved there.
+    def __init__(
+        self,
+        fp: TextIO,
+        virtual: bool,
+        shard_dir: Path | None = None,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        blobs: dict[str, Any] | None = None,
+    ) -> None:
+        self._fp = fp
+        self._virtual = virtual or shard_dir is not None
+        self._shard_dir = shard_dir
+        self._shard_size = shard_size
+        self._shard_fp: TextIO | None = None
+        self._blobs = dict(blobs or {})
+        # Search leaves of each blob, computed once however many records
+        # share it.
+        self._blob_parts: dict[str, list[Any]] = {}
+        # Search entries referencing blobs not seen yet; a JSON output lists
+        # its blobs after the records.
+        self._deferred_search = False
+        self._rows = _Spool()
+        self._search = _Spool()
+        self._errors = _Spool()
+        self.results = 0
+        self.shards = 0
+
+        if shard_dir is not None:
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            for stale in shard_dir.glob("shard-*.js"):
+                stale.unlink()
+        fp.write(_TEMPLATE_HEAD)
+        if not self._virtual:
+            fp.write(_TEMPLATE_MIDDLE)
+            fp.write('{"results":[')
+
+    def add_result(self, record: dict[str, Any]) -> None:
+        if self._virtual:
+            self._rows.append(_embed_json(_row(record)))
+            self._add_search(record)
+            if self._shard_dir is not None:
+                self._write_shard_record(record)
+            else:
+                self._fp.write("\n" if self.results else "")
+                self._fp.write(_embed_json(record))
+        else:
+            self._fp.write("," if self.results else "")
+            self._fp.write(_embed_json(record))
+        self.results += 1
+
+    def add_stored(self, store: ResultStore, index: int) -> None:
+        # Same output as add_result(store.record(index)); the stored JSON is
+        # written as is and only decoded for the search index.
+        encoded = store.encoded(index).decode("utf-8")
+        if self._virtual:
+            self._rows.append(_embed_json(_row(store.head(index))))
+            self._add_search(store.record(index))
+            if self._shard_dir is not None:
+                self._write_shard_record(encoded)
+            else:
+                self._fp.write("\n" if self.results else "")
+                self._fp.write(encoded.replace("<", "\\u003c"))
+        else:
+            self._fp.write("," if self.results else "")
+            self._fp.write(encoded.replace("<", "\\u003c"))
+        self.results += 1
+
+    def add_blob(self, digest: str, value: Any) -> None:
+        self._blobs.setdefault(digest, value)
+
+    def _expand(self, parts: list[Any]) -> list[Any]:
+        expanded: list[Any] = []
+        for part in parts:
+            if not is_blob_ref(part):
+                expanded.append(part)
+                continue
+            digest = part["sha256"]
+            if digest not in self._blob_parts:
+                blob_parts: list[Any] = []
+                _collect_leaves(self._blobs.get(digest), {}, blob_parts)
+                self._blob_parts[digest] = blob_parts
+            expanded.extend(self._blob_parts[digest])
+        return expanded
+
+    def _add_search(self, record: dict[str, Any]) -> None:
+        # Blob references are collected unresolved and expanded from the
+        # per-blob cache; a reference to a blob not seen yet is spooled as is
+        # and expanded in close().
+        parts = _search_parts(record, {})
+        if any(is_blob_ref(part) and part["sha256"] not in self._blobs for part in parts):
+            self._deferred_search = True
+            self._search.append(_embed_json(parts))
+        else:
+            self._search.append(_embed_json(_join_search(self._expand(parts))))
+
+    def _copy_search(self) -> None:
+        if not self._deferred_search:
+            self._search.copy_to(self._fp)
+            return
+        for index, entry in enumerate(self._search):
+            if entry.startswith("["):
+                entry = _embed_json(_join_search(self._expand(jsonio.loads(entry))))
+            self._fp.write(",\n" + entry if index else entry)
+
+    def _write_shard_record(self, record: dict[str, Any] | str) -> None:
+        offset = self.results % self._shard_size
+        if offset == 0:
+            self._close_shard()
+            assert self._shard_dir is not None
+            path = self._shard_dir / f"shard-{self.shards:05d}.js"
+            self._shard_fp = path.open("w", encoding="utf-8")
+            self._shard_fp.write(f"window.__comfyShard({self.shards}, [")
+            self.shards += 1
+        assert self._shard_fp is not None
+        self._shard_fp.write("," if offset else "")
+        self._shard_fp.write(record if isinstance(record, str) else jsonio.dumps(record))
+
+    def _close_shard(self) -> None:
+        if self._shard_fp is not None:
+            self._shard_fp.write("]);\n")
+            self._shard_fp.close()
+            self._shard_fp = None
+
+    def add_error(self, item: dict[str, Any]) -> None:
+        self._errors.append(_embed_json(item))
+
+    def close(self, header: dict[str, Any]) -> None:
+        # ``header`` holds the run fields (tool_version, totals, ...) and an
+        # optional blob table; blobs added along the way join it.
+        fp = self._fp
+        try:
+            self._close_shard()
+            if self._virtual:
+                fp.write(_TEMPLATE_MIDDLE)
+                fp.write('{"virtual":true,"rows":[')
+                self._rows.copy_to(fp)
+                fp.write('],"search":[')
+                self._copy_search()
+                fp.write("]")
+                if self._shard_dir is not None:
+                    shards = {"dir": self._shard_dir.name, "size": self._shard_size, "count": self.shards}
+                    fp.write(',"shards":' + _embed_json(shards))
+            else:
+                fp.write("]")
+            fp.write(',"errors":[')
+            self._errors.copy_to(fp)
+            fp.write("]")
+            fields = {key: value for key, value in header.items() if key not in ("results", "errors")}
+            if self._blobs:
+                fields["blobs"] = {**fields.get("blobs", {}), **self._blobs}
+            if fields:
+                fp.write("," + _embed_json(fields)[1:-1])
+            fp.write("}")
+            fp.write(_TEMPLATE_TAIL)
+        finally:
+            for spool in (self._rows, self._search, self._errors):
+                spool.close()
+
+
+def _payload_records(payload: dict[str, Any]) -> Iterator[tuple[str, dict[str, Any]]]:
+    header = {key: value for key, value in payload.items() if key not in ("results", "errors")}
+    for record in payload.get("results") or []:
+        yield "result", record
+    for item in payload.get("errors") or []:
+        yield "error", item
+    yield "summary", header
+
+
+def write_report(
+    fp: TextIO,
+    records: Iterable[tuple[str, dict[str, Any]]],
+    virtual: bool | None = None,
+    shard_dir: Path | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    blobs: dict[str, Any] | None = None,
+) -> int:
+    # ``records`` are (type, item) pairs as yielded by readers.iter_output_records;
+    # with resolve_blobs=False there, each blob goes into the page once and
+    # records keep their references. With virtual=None, up to
+    # VIRTUAL_THRESHOLD results are held back to decide between the classic
+    # and the virtual page. Returns the result count.
+    records = iter(records)
+    buffered: list[tuple[str, dict[str, Any]]] = []
+    if virtual is None and shard_dir is None:
+        results = 0
+        for record_type, item in records:
+            buffered.append((record_type, item))
+            results += record_type == "result"
+            if results > VIRTUAL_THRESHOLD:
+                break
+        virtual = results > VIRTUAL_THRESHOLD
+
+    writer = ReportWriter(fp, bool(virtual), shard_dir, shard_size, blobs)
+    header: dict[str, Any] = {}
+    for record_type, item in itertools.chain(buffered, records):
+        if record_type == "result":
+            writer.add_result(item)
+        elif record_type == "error":
+            writer.add_error(item)
+        elif record_type == "blob":
+            writer.add_blob(item["sha256"], item["value"])
+        elif record_type == "summary":
+            header.update(item)
+    writer.close(header)
+    return writer.results
+
+
+def write_stored_report(
+    fp: TextIO,
+    results: ResultStore,
+    errors: Iterable[dict[str, Any]],
+    header: dict[str, Any],
+    virtual: bool | None = None,
+    shard_dir: Path | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> int:
+    # write_report for results held in a ResultStore; ``header`` holds the run
+    # fields and an optional "blobs" table.
+    if virtual is None and shard_dir is None:
+        virtual = len(results) > VIRTUAL_THRESHOLD
+    writer = ReportWriter(fp, bool(virtual), shard_dir, shard_size, header.get("blobs"))
+    for index in range(len(results)):
+        writer.add_stored(results, index)
+    for item in errors:
+        writer.add_error(item)
+    writer.close(header)
+    return writer.results
+
+
+def shard_dir_for(output_path: Path) -> Path:
+    return output_path.with_name(f"{output_path.stem}_shards")
+
+
+def build_report_html(payload: dict[str, Any], virtual: bool | None = None) -> str:
+    # virtual=None picks the virtual-scrolling list for large runs only.
+    buffer = io.StringIO()
+    write_report(buffer, _payload_records(payload), virtual, blobs=payload.get("blobs"))
+    return buffer.getvalue()
+
+
+def write_report_html(
+    payload: dict[str, Any], output_path: Path, virtual: bool | None = None, shards: bool = False
+) -> None:
+    # With shards, record details go to <stem>_shards/ next to the page.
+    shard_dir = shard_dir_for(output_path) if shards else None
+    with output_path.open("w", encoding="utf-8") as fp:
+        write_report(fp, _payload_records(payload), virtual, shard_dir, blobs=payload.get("blobs"))
+
+
+_TEMPLATE_HEAD = """<!doctype html>
 <html lang=\"en\">
 <head>
   <meta charset=\"utf-8\" />
@@ -139,6 +499,30 @@ def build_report_html(payload: dict[str, Any]) -> str:
       opacity: 0.5;
       cursor: not-allowed;
     }
+    .vlist {
+      margin-top: 16px;
+      height: 60vh;
+      overflow-y: auto;
+      background: var(--card);
+      border: 1px solid var(--border);
+      border-radius: 12px;
+    }
+    .vspacer { position: relative; }
+    .vrow {
+      position: absolute;
+      left: 0;
+      right: 0;
+      height: 56px;
+      padding: 8px 14px;
+      border-bottom: 1px solid var(--border);
+      cursor: pointer;
+      overflow: hidden;
+    }
+    .vrow:hover { background: #f4f7ff; }
+    .vrow.selected { background: #e6eeff; }
+    .vrow .path, .vrow .meta { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+    .vcount { margin-top: 8px; color: var(--muted); font-size: 12px; }
+    .detail { margin-top: 16px; }
     .errbox {
       margin-top: 16px;
       background: #fff;
@@ -167,11 +551,16 @@ def build_report_html(payload: dict[str, Any]) -> str:
     </div>
 
     <div id=\"resultList\" class=\"list\"></div>
+    <div id=\"detail\" class=\"item detail\" style=\"display:none\"></div>
     <div id=\"errorBox\" class=\"errbox\" style=\"display:none\"></div>
   </div>
 
+  <script id=\"details\" type=\"application/x-ndjson\">"""
+_TEMPLATE_MIDDLE = """</script>
+  <script id=\"payload\" type=\"application/json\">"""
+_TEMPLATE_TAIL = """</script>
   <script>
-    const data = __PAYLOAD_JSON__;
+    const data = JSON.parse(document.getElementById("payload").textContent);
 
     const runInfo = document.getElementById("runInfo");
     const sDiscovered = document.getElementById("sDiscovered");
@@ -196,6 +585,21 @@ def build_report_html(payload: dict[str, Any]) -> str:
         .replaceAll('"', "&quot;");
     }
 
+    const blobs = data.blobs || {};
+
+    function resolveBlobRefs(item) {
+      // Records written with --dedupe-blobs reference shared values by hash.
+      for (const section of [item.comfyui, item.raw_metadata]) {
+        if (!section) continue;
+        for (const [key, value] of Object.entries(section)) {
+          if (value && value._type === "blob_ref" && value.sha256 in blobs) {
+            section[key] = blobs[value.sha256];
+          }
+        }
+      }
+      return item;
+    }
+
     function pretty(obj) {
       return JSON.stringify(obj, null, 2);
     }
@@ -219,16 +623,43 @@ def build_report_html(payload: dict[str, Any]) -> str:
       URL.revokeObjectURL(url);
     }
 
+    function detailHtml(item, bodyClass) {
+      const comfy = item.comfyui || {};
+      return `
+          <div class=\"${bodyClass}\">
+            <p class=\"section-title\">ComfyUI Metadata</p>
+            <div class=\"download-row\">
+              <button class=\"download-btn dl-workflow\" type=\"button\" ${comfy.workflow ? "" : "disabled"}>Download Workflow JSON</button>
+              <button class=\"download-btn dl-prompt\" type=\"button\" ${comfy.prompt ? "" : "disabled"}>Download Prompt JSON</button>
+            </div>
+            <pre class=\"extracted\">${esc(pretty(item.comfyui || {}))}</pre>
+            <p class=\"section-title\" style=\"margin-top:10px\">EXIF</p>
+            <pre class=\"extracted\">${esc(pretty(item.exif || {}))}</pre>
+            <p class=\"section-title\" style=\"margin-top:10px\">Raw Metadata</p>
+            <pre class=\"raw\">${esc(pretty(item.raw_metadata || {}))}</pre>
+          </div>
+        `;
+    }
+
+    function bindDownloads(wrapper, item, idx) {
+      const comfy = item.comfyui || {};
+      const stem = safeName((item.file_path || "").split(/[\\\\/]/).pop()?.replace(/\\.[^.]+$/, ""), `image_${idx + 1}`);
+      const dlWorkflow = wrapper.querySelector(".dl-workflow");
+      const dlPrompt = wrapper.querySelector(".dl-prompt");
+      if (dlWorkflow && comfy.workflow) {
+        dlWorkflow.addEventListener("click", () => downloadJson(comfy.workflow, `${stem}_workflow.json`));
+      }
+      if (dlPrompt && comfy.prompt) {
+        dlPrompt.addEventListener("click", () => downloadJson(comfy.prompt, `${stem}_prompt.json`));
+      }
+    }
+
     function render(results) {
       resultList.innerHTML = "";
       const single = results.length <= 1;
       for (const [idx, item] of results.entries()) {
         const metaText = `${item.format} | ${item.dimensions.width}x${item.dimensions.height} | ${item.size_bytes} bytes`;
         const searchable = JSON.stringify(item).toLowerCase();
-        const comfy = item.comfyui || {};
-        const workflow = comfy.workflow;
-        const prompt = comfy.prompt;
-        const stem = safeName((item.file_path || "").split(/[\\\\/]/).pop()?.replace(/\\.[^.]+$/, ""), `image_${idx + 1}`);
 
         const wrapper = document.createElement("div");
         wrapper.className = "item";
@@ -245,18 +676,7 @@ def build_report_html(payload: dict[str, Any]) -> str:
             </div>
             ${toggle}
           </div>
-          <div class=\"${bodyClass}\">
-            <p class=\"section-title\">ComfyUI Metadata</p>
-            <div class=\"download-row\">
-              <button class=\"download-btn dl-workflow\" type=\"button\" ${workflow ? "" : "disabled"}>Download Workflow JSON</button>
-              <button class=\"download-btn dl-prompt\" type=\"button\" ${prompt ? "" : "disabled"}>Download Prompt JSON</button>
-            </div>
-            <pre class=\"extracted\">${esc(pretty(item.comfyui || {}))}</pre>
-            <p class=\"section-title\" style=\"margin-top:10px\">EXIF</p>
-            <pre class=\"extracted\">${esc(pretty(item.exif || {}))}</pre>
-            <p class=\"section-title\" style=\"margin-top:10px\">Raw Metadata</p>
-            <pre class=\"raw\">${esc(pretty(item.raw_metadata || {}))}</pre>
-          </div>
+          ${detailHtml(item, bodyClass)}
         `;
 
         const btn = wrapper.querySelector(".toggle-btn");
@@ -267,16 +687,148 @@ def build_report_html(payload: dict[str, Any]) -> str:
             if (e.target.tagName !== "BUTTON") body.classList.toggle("open");
           });
         }
-        const dlWorkflow = wrapper.querySelector(".dl-workflow");
-        const dlPrompt = wrapper.querySelector(".dl-prompt");
-        if (dlWorkflow && workflow) {
-          dlWorkflow.addEventListener("click", () => downloadJson(workflow, `${stem}_workflow.json`));
+        bindDownloads(wrapper, item, idx);
+        resultList.appendChild(wrapper);
+      }
+    }
+
+    const ROW_HEIGHT = 56;
+    const OVERSCAN = 10;
+    const MAX_LOADED_SHARDS = 8;
+
+    function renderVirtual() {
+      // Only the rows in view exist in the DOM; a record's JSON is parsed and
+      // formatted when its row is opened.
+      const rows = data.rows;
+      const index = data.search;
+      const detail = document.getElementById("detail");
+      const count = document.createElement("div");
+      count.className = "vcount";
+      resultList.before(count);
+      resultList.className = "vlist";
+      resultList.innerHTML = '<div class="vspacer"></div>';
+      const spacer = resultList.firstChild;
+      let visible = rows.map((_, i) => i);
+      let selected = -1;
+      let scheduled = false;
+      let details = null;
+
+      function draw() {
+        scheduled = false;
+        spacer.style.height = `${visible.length * ROW_HEIGHT}px`;
+        const top = resultList.scrollTop;
+        const first = Math.max(0, Math.floor(top / ROW_HEIGHT) - OVERSCAN);
+        const last = Math.min(visible.length, Math.ceil((top + resultList.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+        const html = [];
+        for (let pos = first; pos < last; pos++) {
+          const i = visible[pos];
+          const [path, format, width, height, size] = rows[i];
+          const cls = i === selected ? "vrow selected" : "vrow";
+          html.push(
+            `<div class="${cls}" data-index="${i}" style="top:${pos * ROW_HEIGHT}px">` +
+            `<div class="path">${esc(path)}</div>` +
+            `<div class="meta">${esc(`${format} | ${width}x${height} | ${size} bytes`)}</div></div>`
+          );
         }
-        if (dlPrompt && prompt) {
-          dlPrompt.addEventListener("click", () => downloadJson(prompt, `${stem}_prompt.json`));
+        spacer.innerHTML = html.join("");
+        count.textContent = `${visible.length} of ${rows.length} results`;
+      }
+
+      function schedule() {
+        if (!scheduled) {
+          scheduled = true;
+          requestAnimationFrame(draw);
         }
-        resultList.appendChild(wrapper);
       }
+
+      const shardRecords = new Map();
+      const shardWaiters = new Map();
+
+      window.__comfyShard = (n, records) => {
+        shardRecords.set(n, records);
+        // Keep a handful of shards; older ones are fetched again if reopened.
+        if (shardRecords.size > MAX_LOADED_SHARDS) {
+          shardRecords.delete(shardRecords.keys().next().value);
+        }
+        for (const callback of shardWaiters.get(n) || []) callback(records);
+        shardWaiters.delete(n);
+      };
+
+      function loadRecord(i, callback) {
+        const shards = data.shards;
+        if (!shards) {
+          if (details === null) {
+            details = document.getElementById("details").textContent.split("\\n");
+          }
+          callback(JSON.parse(details[i]));
+          return;
+        }
+        const n = Math.floor(i / shards.size);
+        const offset = i % shards.size;
+        if (shardRecords.has(n)) {
+          callback(shardRecords.get(n)[offset]);
+          return;
+        }
+        const waiting = shardWaiters.has(n);
+        if (!waiting) shardWaiters.set(n, []);
+        shardWaiters.get(n).push((records) => callback(records[offset]));
+        if (!waiting) {
+          const script = document.createElement("script");
+          script.src = `${shards.dir}/shard-${String(n).padStart(5, "0")}.js`;
+          script.onerror = () => {
+            shardWaiters.delete(n);
+            detail.style.display = "block";
+            detail.innerHTML = `<p class=\"section-title err\">Could not load ${esc(script.src)}</p>`;
+          };
+          script.onload = () => script.remove();
+          document.body.appendChild(script);
+        }
+      }
+
+      function open(i) {
+        selected = i;
+        loadRecord(i, (record) => show(i, resolveBlobRefs(record)));
+        schedule();
+      }
+
+      function show(i, item) {
+        if (i !== selected) return;
+        detail.style.display = "block";
+        detail.innerHTML = `
+          <div class=\"head no-toggle\">
+            <div>
+              <div class=\"path\">${esc(item.file_path)}</div>
+              <div class=\"meta\">${esc(`${item.format} | ${item.dimensions.width}x${item.dimensions.height} | ${item.size_bytes} bytes`)}</div>
+            </div>
+          </div>
+          ${detailHtml(item, "body open")}
+        `;
+        bindDownloads(detail, item, i);
+      }
+
+      resultList.addEventListener("scroll", schedule);
+      window.addEventListener("resize", schedule);
+      resultList.addEventListener("click", (e) => {
+        const row = e.target.closest(".vrow");
+        if (row) open(Number(row.dataset.index));
+      });
+
+      let timer = 0;
+      q.addEventListener("input", () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+          const term = q.value.trim().toLowerCase();
+          visible = [];
+          for (let i = 0; i < index.length; i++) {
+            if (!term || index[i].includes(term)) visible.push(i);
+          }
+          resultList.scrollTop = 0;
+          draw();
+        }, 120);
+      });
+
+      draw();
+      if (rows.length === 1) open(0);
     }
 
     function renderErrors(errors) {
@@ -285,24 +837,21 @@ def build_report_html(payload: dict[str, Any]) -> str:
       errorBox.innerHTML = `<p class=\"section-title\">Errors (${errors.length})</p><pre>${esc(pretty(errors))}</pre>`;
     }
 
-    render(data.results || []);
+    if (data.virtual) {
+      renderVirtual();
+    } else {
+      render((data.results || []).map(resolveBlobRefs));
+      q.addEventListener("input", () => {
+        const term = q.value.trim().toLowerCase();
+        const rows = [...document.querySelectorAll("#resultList .item")];
+        for (const row of rows) {
+          const ok = !term || row.dataset.search.includes(term);
+          row.style.display = ok ? "block" : "none";
+        }
+      });
+    }
     renderErrors(data.errors || []);
-
-    q.addEventListener("input", () => {
-      const term = q.value.trim().toLowerCase();
-      const rows = [...document.querySelectorAll(".item")];
-      for (const row of rows) {
-        const ok = !term || row.dataset.search.includes(term);
-        row.style.display = ok ? "block" : "none";
-      }
-    });
   </script>
 </body>
 </html>
 """
-    return template.replace("__PAYLOAD_JSON__", payload_json)
-
-
-def write_report_html(payload: dict[str, Any], output_path: Path) -> None:
-    html = build_report_html(payload)
-    output_path.write_text(html, encoding="utf-8")
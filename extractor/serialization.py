@@ -10,16 +10,20 @@ def utc_now_iso8601() -> str:
     return datetime.now(tz=timezone.utc).replace(microsecond=0).isoformat()
 
 
-def make_json_safe(value: Any) -> Any:
+def make_json_safe(value: Any, max_bytes: int | None = None) -> Any:
+    # Bytes values longer than ``max_bytes`` are replaced by their length
+    # instead of being base64-encoded.
     if value is None or isinstance(value, (str, int, float, bool)):
         return value
     if isinstance(value, bytes):
+        if max_bytes is not None and len(value) > max_bytes:
+            return {"_type": "bytes_omitted", "size": len(value)}
         encoded = base64.b64encode(value).decode("ascii")
         return {"_type": "bytes_base64", "value": encoded}
     if isinstance(value, (list, tuple, set)):
-        return [make_json_safe(item) for item in value]
+        return [make_json_safe(item, max_bytes) for item in value]
     if isinstance(value, dict):
-        return {str(k): make_json_safe(v) for k, v in value.items()}
+        return {str(k): make_json_safe(v, max_bytes) for k, v in value.items()}
     if is_dataclass(value):
-        return make_json_safe(asdict(value))
+        return make_json_safe(asdict(value), max_bytes)
     return {"_type": type(value).__name__, "value": str(value)}
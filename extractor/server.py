@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from extractor import jsonio
+from extractor.batch import extract_files
+from extractor.cache import options_variant
+from extractor.defaults import DEFAULT_CACHE_MB, DEFAULT_HOST, DEFAULT_PORT
+from extractor.discovery import scan_files
+from extractor.models import DiscoveredFile, ExtractOptions, RunTotals
+from extractor.projection import SUMMARY_ONLY_FIELDS, parse_fields
+
+if TYPE_CHECKING:
+    import socketserver
+
+# Local extraction service: one long-lived process answers extract requests
+# over HTTP (TCP or a Unix socket), so callers skip interpreter and Pillow
+# startup and repeated lookups come from memory.
+#
+#   GET  /health
+#   GET  /extract?path=...[&path=...][&fields=...&keys=...&summary=1...]
+#   POST /extract  {"paths": [...], "input": dir, "recursive": bool, "options": {...}}
+#
+# One path answers with the record (or error entry) as JSON; several paths
+# and POST requests stream NDJSON lines as extract --format ndjson writes
+# them, ending with a summary line. The HTTP side lives in http_api, imported
+# only when a server is started.
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# (resolved path, size, mtime in ns, options variant)
+ResultKey = tuple[str, int, int, str]
+
+
+class ResultCache:
+    # LRU of serialized outcomes, bounded by their total size in bytes. An
+    # edited file gets a new key (size/mtime) and its old entry ages out.
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[ResultKey, tuple[bool, bytes]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: ResultKey) -> tuple[bool, bytes] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: ResultKey, ok: bool, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._entries[key] = (ok, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+def request_options(params: dict[str, Any]) -> ExtractOptions:
+    # Same options as the extract flags; list values may also be given as
+    # comma-separated strings. Raises ValueError for bad values.
+    def _names(name: str, value: Any) -> str:
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            return ",".join(value)
+        if isinstance(value, str):
+            return value
+        raise ValueError(f"{name} must be a string or a list of strings")
+
+    def _flag(value: Any) -> bool:
+        return value is True or str(value).lower() in ("1", "true", "yes")
+
+    unknown = set(params) - {
+        "fields", "keys", "summary", "summary_only", "fingerprint", "dedupe_raw", "max_base64_bytes"
+    }
+    if unknown:
+        raise ValueError(f"unknown option: {sorted(unknown)[0]}")
+    fields = parse_fields(_names("fields", params["fields"])) if params.get("fields") else None
+    if _flag(params.get("summary_only", False)):
+        if fields is not None:
+            raise ValueError("summary_only and fields cannot be combined")
+        fields = SUMMARY_ONLY_FIELDS
+    keys = tuple(key.strip() for key in _names("keys", params["keys"]).split(",") if key.strip()) if params.get("keys") else None
+    max_bytes = params.get("max_base64_bytes")
+    if max_bytes is not None:
+        if isinstance(max_bytes, bool) or not isinstance(max_bytes, (int, str)):
+            raise ValueError("max_base64_bytes must be an integer")
+        max_bytes = int(max_bytes)
+        if max_bytes < 0:
+            raise ValueError("max_base64_bytes must not be negative")
+    return ExtractOptions(
+        fields=fields,
+        summary=_flag(params.get("summary", False)) or (fields is not None and "comfyui.summary" in fields),
+        fingerprint=_flag(params.get("fingerprint", False))
+        or (fields is not None and "comfyui.fingerprint" in fields),
+        keys=keys or None,
+        dedupe_raw=_flag(params.get("dedupe_raw", False)),
+        max_base64_bytes=max_bytes,
+    )
+
+
+class ExtractService:
+    # Extraction behind a ResultCache. Thread-safe: the HTTP server runs each
+    # request on its own thread.
+    def __init__(self, cache_bytes: int = DEFAULT_CACHE_MB * 1024 * 1024, io_threads: int = 0) -> None:
+        self.cache = ResultCache(cache_bytes)
+        self.io_threads = io_threads
+
+    def outcomes(
+        self, files: list[DiscoveredFile], options: ExtractOptions, totals: RunTotals
+    ) -> Iterator[tuple[bool, bytes]]:
+        # Serialized (ok, record_or_error) per file, in order; cache misses are
+        # extracted lazily so the first results go out while later files are
+        # still being read.
+        variant = options_variant(options)
+        keys: list[ResultKey] = [(str(entry.path), entry.size, entry.mtime_ns, variant) for entry in files]
+        cached = [self.cache.get(key) if entry.mtime_ns else None for key, entry in zip(keys, files)]
+        misses = [entry for entry, hit in zip(files, cached) if hit is None]
+        fresh = extract_files(misses, options=options, io_threads=self.io_threads)
+
+        for key, hit in zip(keys, cached):
+            if hit is None:
+                ok, item = next(fresh)
+                hit = (ok, jsonio.dumps_bytes(item))
+                if key[2]:
+                    self.cache.put(key, *hit)
+            if hit[0]:
+                totals.processed_ok += 1
+            else:
+                totals.failed += 1
+            yield hit
+
+    def resolve(self, paths: Iterable[str], input_dir: str | None, recursive: bool, totals: RunTotals) -> list[DiscoveredFile]:
+        # Explicit paths first, then the images found under ``input_dir``.
+        # Paths that cannot be stat'ed still get an entry (mtime 0, never
+        # cached) so extraction reports the error in their place. Raises
+        # ValueError for arguments of the wrong type.
+        if not all(isinstance(raw_path, str) for raw_path in paths):
+            raise ValueError("paths must be a list of strings")
+        if input_dir is not None and not isinstance(input_dir, str):
+            raise ValueError("input must be a string")
+        if not isinstance(recursive, bool):
+            raise ValueError("recursive must be true or false")
+        files: list[DiscoveredFile] = []
+        for raw_path in paths:
+            path = Path(raw_path).resolve()
+            try:
+                stat = path.stat()
+                size, mtime_ns = stat.st_size, stat.st_mtime_ns
+            except OSError:
+                size, mtime_ns = 0, 0
+            files.append(DiscoveredFile(path, path.name, size, mtime_ns))
+        if input_dir is not None:
+            found, skipped = scan_files(Path(input_dir).resolve(), recursive=recursive)
+            files.extend(found)
+            totals.skipped_unsupported += skipped
+        totals.discovered = len(files)
+        return files
+
+
+def make_server(
+    service: ExtractService,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str | None = None,
+) -> socketserver.BaseServer:
+    # With ``socket_path`` the server listens on a Unix socket instead of TCP;
+    # a stale socket file left by an earlier run is replaced.
+    from http.server import ThreadingHTTPServer
+
+    from extractor.http_api import ExtractHandler, ThreadingUnixHTTPServer
+
+    if socket_path is not None:
+        if ThreadingUnixHTTPServer is None:
+            raise OSError("Unix sockets are not available on this platform")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server: socketserver.BaseServer = ThreadingUnixHTTPServer(socket_path, ExtractHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ExtractHandler)
+        server.daemon_threads = True  # type: ignore[attr-defined]
+    server.service = service  # type: ignore[attr-defined]
+    return server
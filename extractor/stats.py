@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import itertools
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from extractor.batch import extract_files, map_chunks, resolve_jobs
+from extractor.defaults import DEFAULT_TOP
+from extractor.discovery import Shard, iter_scan
+from extractor.models import DiscoveredFile, ExtractOptions
+from extractor.readers import iter_output_records
+from extractor.summary import build_summary
+
+# Only what the aggregates need is extracted: the workflow is never decoded
+# and EXIF is not parsed.
+STATS_OPTIONS = ExtractOptions(
+    fields=("format", "size_bytes", "dimensions", "comfyui.prompt", "comfyui.summary"),
+    summary=True,
+)
+COUNTERS = ("sources", "checkpoints", "loras", "samplers", "schedulers", "class_types", "resolutions")
+# Numeric fields and whether their histogram uses power-of-two buckets
+# (otherwise exact values).
+NUMERIC_FIELDS = {"steps": False, "cfg": False, "width": False, "height": False, "size_bytes": True}
+# Distinct values tracked per counter or histogram; further new values are
+# only tallied as "other", which keeps memory bounded on any corpus.
+MAX_DISTINCT = 10000
+# Files per worker chunk; smaller runs are split in about four chunks per
+# worker.
+MAX_CHUNK = 1024
+FORMATS_BY_EXTENSION = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP"}
+
+
+def _count(counter: Counter, overflow: Counter, name: str, key: Any, amount: int = 1) -> None:
+    if key in counter or len(counter) < MAX_DISTINCT:
+        counter[key] += amount
+    else:
+        overflow[name] += amount
+
+
+def _number(value: Any) -> float | None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def _ranked(counter: Counter, top: int | None) -> dict[str, int]:
+    # Most common first; ties by value so serial and parallel runs agree.
+    ranked = sorted(counter.items(), key=lambda item: (-item[1], str(item[0])))
+    return {str(key): count for key, count in ranked[:top]}
+
+
+class NumericStats:
+    def __init__(self, log2_buckets: bool = False) -> None:
+        self.log2_buckets = log2_buckets
+        self.count = 0
+        self.total = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+        self.histogram: Counter = Counter()
+        self.other = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        bucket = 1 << max(0, int(value) - 1).bit_length() if self.log2_buckets else value
+        if bucket in self.histogram or len(self.histogram) < MAX_DISTINCT:
+            self.histogram[bucket] += 1
+        else:
+            self.other += 1
+
+    def merge(self, other: NumericStats) -> None:
+        self.count += other.count
+        self.total += other.total
+        for bound in (other.min, other.max):
+            if bound is not None:
+                self.min = bound if self.min is None else min(self.min, bound)
+                self.max = bound if self.max is None else max(self.max, bound)
+        for bucket, count in other.histogram.items():
+            if bucket in self.histogram or len(self.histogram) < MAX_DISTINCT:
+                self.histogram[bucket] += count
+            else:
+                self.other += count
+        self.other += other.other
+
+    def to_dict(self) -> dict[str, Any]:
+        # Power-of-two buckets are keyed "<=N" (values up to N).
+        label = (lambda bucket: f"<={bucket}") if self.log2_buckets else (lambda bucket: f"{bucket:g}")
+        result: dict[str, Any] = {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.total / self.count, 4) if self.count else None,
+            "histogram": {label(bucket): self.histogram[bucket] for bucket in sorted(self.histogram)},
+        }
+        if self.other:
+            result["other"] = self.other
+        return result
+
+
+class StatsAccumulator:
+    # Counts and distributions over extract records, built in one pass with
+    # memory independent of the number of files. Partial accumulators (one per
+    # worker or per input file) combine with merge().
+    def __init__(self) -> None:
+        self.discovered = 0
+        self.skipped_unsupported = 0
+        self.ok_by_format: Counter = Counter()
+        self.failed_by_format: Counter = Counter()
+        self.counters: dict[str, Counter] = {name: Counter() for name in COUNTERS}
+        self.overflow: Counter = Counter()
+        self.numeric = {name: NumericStats(log2) for name, log2 in NUMERIC_FIELDS.items()}
+
+    def _count(self, name: str, key: Any) -> None:
+        _count(self.counters[name], self.overflow, name, key)
+
+    def _add_number(self, name: str, value: Any) -> None:
+        number = _number(value)
+        if number is not None:
+            self.numeric[name].add(number)
+
+    def add_record(self, record: dict[str, Any]) -> None:
+        self.ok_by_format[record.get("format") or "UNKNOWN"] += 1
+        self._add_number("size_bytes", record.get("size_bytes"))
+        dimensions = record.get("dimensions") or {}
+        width, height = _number(dimensions.get("width")), _number(dimensions.get("height"))
+        if width is not None and height is not None:
+            self._add_number("width", width)
+            self._add_number("height", height)
+            self._count("resolutions", f"{width}x{height}")
+
+        comfyui = record.get("comfyui") or {}
+        prompt = comfyui.get("prompt")
+        if isinstance(prompt, dict):
+            class_types = {node.get("class_type") for node in prompt.values() if isinstance(node, dict)}
+            for class_type in class_types:
+                if isinstance(class_type, str):
+                    self._count("class_types", class_type)
+
+        summary = comfyui.get("summary") or build_summary(comfyui)
+        if not isinstance(summary, dict):
+            self._count("sources", "none")
+            return
+        # Settings of the first pass; LoRAs of every pass, once per image.
+        self._count("sources", summary.get("source") or "unknown")
+        for key, name in (("checkpoint", "checkpoints"), ("sampler", "samplers"), ("scheduler", "schedulers")):
+            if isinstance(summary.get(key), str):
+                self._count(name, summary[key])
+        self._add_number("steps", summary.get("steps"))
+        self._add_number("cfg", summary.get("cfg"))
+        loras = {
+            lora.get("name")
+            for generation_pass in (summary, *summary.get("passes", ()))
+            for lora in generation_pass.get("loras", ())
+        }
+        for lora in loras:
+            if isinstance(lora, str):
+                self._count("loras", lora)
+
+    def add_error(self, item: dict[str, Any]) -> None:
+        suffix = os.path.splitext(str(item.get("file_path", "")))[1].lower()
+        self.failed_by_format[FORMATS_BY_EXTENSION.get(suffix, suffix.lstrip(".").upper() or "UNKNOWN")] += 1
+
+    def add_outcomes(self, outcomes: Iterable[tuple[bool, dict[str, Any]]]) -> None:
+        for ok, item in outcomes:
+            if ok:
+                self.add_record(item)
+            else:
+                self.add_error(item)
+
+    def merge(self, other: StatsAccumulator) -> None:
+        self.discovered += other.discovered
+        self.skipped_unsupported += other.skipped_unsupported
+        self.ok_by_format.update(other.ok_by_format)
+        self.failed_by_format.update(other.failed_by_format)
+        for name, counter in other.counters.items():
+            for key, count in counter.items():
+                _count(self.counters[name], self.overflow, name, key, count)
+        self.overflow.update(other.overflow)
+        for name, stats in other.numeric.items():
+            self.numeric[name].merge(stats)
+
+    @property
+    def processed_ok(self) -> int:
+        return sum(self.ok_by_format.values())
+
+    @property
+    def failed(self) -> int:
+        return sum(self.failed_by_format.values())
+
+    def to_dict(self, top: int | None = DEFAULT_TOP) -> dict[str, Any]:
+        # ``top`` limits each counter to its most common values (None: all).
+        formats = {}
+        for name in sorted(set(self.ok_by_format) | set(self.failed_by_format)):
+            ok, failed = self.ok_by_format[name], self.failed_by_format[name]
+            formats[name] = {"ok": ok, "failed": failed, "failure_rate": round(failed / (ok + failed), 4)}
+        counters = {}
+        for name, counter in self.counters.items():
+            counters[name] = {"distinct": len(counter), "top": _ranked(counter, top)}
+            if self.overflow[name]:
+                counters[name]["other"] = self.overflow[name]
+        return {
+            "totals": {
+                "discovered": self.discovered,
+                "processed_ok": self.processed_ok,
+                "failed": self.failed,
+                "skipped_unsupported": self.skipped_unsupported,
+            },
+            "formats": formats,
+            **counters,
+            **{name: stats.to_dict() for name, stats in self.numeric.items()},
+        }
+
+
+def _stats_chunk(files: list[DiscoveredFile], io_threads: int) -> StatsAccumulator:
+    # Runs in a worker process; only the small accumulator travels back.
+    stats = StatsAccumulator()
+    stats.add_outcomes(extract_files(files, options=STATS_OPTIONS, io_threads=io_threads))
+    return stats
+
+
+def _iter_discovered(
+    stats: StatsAccumulator, input_path: Path, recursive: bool, shard: Shard | None
+) -> Iterator[DiscoveredFile]:
+    # Counts into ``stats`` as each directory listing comes in.
+    for files, skipped in iter_scan(input_path, recursive=recursive, shard=shard):
+        stats.discovered += len(files)
+        stats.skipped_unsupported += skipped
+        yield from files
+
+
+def collect_stats(
+    input_path: Path, recursive: bool, jobs: int = 1, io_threads: int = 0, shard: Shard | None = None
+) -> StatsAccumulator:
+    # Extracts and aggregates in one pass, while discovery is still listing
+    # directories, so the file list is never held whole; with jobs > 1 each
+    # worker aggregates whole chunks of files and the partial results are
+    # merged.
+    stats = StatsAccumulator()
+    files = _iter_discovered(stats, input_path, recursive, shard)
+    workers = resolve_jobs(jobs)
+    chunksize = MAX_CHUNK
+    if workers > 1:
+        # Chunks are sized from the file count, which is known once discovery
+        # ends before enough files for full-size chunks on every worker.
+        head = list(itertools.islice(files, workers * 4 * MAX_CHUNK))
+        if len(head) < workers * 4 * MAX_CHUNK:
+            workers = min(workers, len(head))
+            chunksize = max(1, len(head) // (workers * 4)) if head else 1
+        files = itertools.chain(head, files)
+    if workers <= 1:
+        while chunk := list(itertools.islice(files, chunksize)):
+            stats.add_outcomes(extract_files(chunk, options=STATS_OPTIONS, io_threads=io_threads))
+        return stats
+
+    for partial in map_chunks(_stats_chunk, files, workers, chunksize, io_threads):
+        stats.merge(partial)
+    return stats
+
+
+def stats_from_outputs(paths: Iterable[Path]) -> StatsAccumulator:
+    # Aggregates extract outputs (JSON or NDJSON) instead of images, one record
+    # at a time; discovered/skipped come from their summaries.
+    stats = StatsAccumulator()
+    for path in paths:
+        for record_type, item in iter_output_records(path):
+            if record_type == "result":
+                stats.add_record(item)
+            elif record_type == "error":
+                stats.add_error(item)
+            elif record_type == "summary":
+                totals = item.get("totals") or {}
+                stats.discovered += int(totals.get("discovered", 0))
+                stats.skipped_unsupported += int(totals.get("skipped_unsupported", 0))
+    return stats
+
+
+def format_stats(report: dict[str, Any]) -> str:
+    totals = report["totals"]
+    lines = [
+        "Files: " + " ".join(f"{name}={value}" for name, value in totals.items()),
+        "Formats:",
+    ]
+    for name, item in report["formats"].items():
+        lines.append(f"  {name:<8} ok={item['ok']} failed={item['failed']} ({item['failure_rate']:.1%} failed)")
+    for name in COUNTERS:
+        counter = report[name]
+        title = name.replace("_", " ").capitalize()
+        other = f", {counter['other']} more not tracked" if counter.get("other") else ""
+        lines.append(f"{title} ({counter['distinct']} distinct{other}):")
+        lines.extend(f"  {count:>8}  {value}" for value, count in counter["top"].items())
+    for name in NUMERIC_FIELDS:
+        item = report[name]
+        if not item["count"]:
+            lines.append(f"{name}: no values")
+            continue
+        lines.append(f"{name}: count={item['count']} min={item['min']:g} max={item['max']:g} mean={item['mean']:g}")
+        lines.extend(f"  {count:>8}  {bucket}" for bucket, count in item["histogram"].items())
+    return "\n".join(lines)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Any, Iterator
+
+from extractor import jsonio
+
+# Leading record keys held in columns; everything after them is kept as the
+# compact JSON the output will contain anyway.
+HEAD_KEYS = ("file_path", "format", "size_bytes", "dimensions")
+DIMENSION_KEYS = ["width", "height"]
+
+_INT64 = range(-(1 << 63), 1 << 63)
+
+
+def _is_int64(value: Any) -> bool:
+    return type(value) is int and value in _INT64
+
+
+class ResultStore:
+    # Extract results held for writing in one piece (JSON payload, HTML
+    # report) at a fraction of the memory of record dicts: path, format, size
+    # and dimensions go into columns (formats interned), the rest of each
+    # record stays encoded until it is written. Records whose leading keys do
+    # not have the usual shape (e.g. after --fields) are stored encoded whole.
+    def __init__(self) -> None:
+        self._paths: list[str | None] = []
+        self._formats: list[str | None] = []
+        self._sizes = array("q")
+        self._widths = array("q")
+        self._heights = array("q")
+        # Compact JSON: the keys after HEAD_KEYS, or the whole record when its
+        # path is None.
+        self._tails: list[bytes] = []
+
+    def __len__(self) -> int:
+        return len(self._tails)
+
+    def append(self, record: dict[str, Any]) -> None:
+        keys = list(record)
+        dimensions = record.get("dimensions")
+        if (
+            tuple(keys[:4]) == HEAD_KEYS
+            and type(record["file_path"]) is str
+            and type(record["format"]) is str
+            and _is_int64(record["size_bytes"])
+            and type(dimensions) is dict
+            and list(dimensions) == DIMENSION_KEYS
+            and _is_int64(dimensions["width"])
+            and _is_int64(dimensions["height"])
+        ):
+            self._paths.append(record["file_path"])
+            self._formats.append(sys.intern(record["format"]))
+            self._sizes.append(record["size_bytes"])
+            self._widths.append(dimensions["width"])
+            self._heights.append(dimensions["height"])
+            self._tails.append(jsonio.dumps_bytes({key: record[key] for key in keys[4:]}))
+        else:
+            self._paths.append(None)
+            self._formats.append(None)
+            self._sizes.append(0)
+            self._widths.append(0)
+            self._heights.append(0)
+            self._tails.append(jsonio.dumps_bytes(record))
+
+    def head(self, index: int) -> dict[str, Any]:
+        # The HEAD_KEYS part of a record, without decoding the rest when it
+        # is held in columns.
+        path = self._paths[index]
+        if path is None:
+            record = jsonio.loads(self._tails[index])
+            return {key: record[key] for key in HEAD_KEYS if key in record}
+        return {
+            "file_path": path,
+            "format": self._formats[index],
+            "size_bytes": self._sizes[index],
+            "dimensions": {"width": self._widths[index], "height": self._heights[index]},
+        }
+
+    def encoded(self, index: int) -> bytes:
+        # Exactly jsonio.dumps_bytes(record) for the record as appended.
+        tail = self._tails[index]
+        path = self._paths[index]
+        if path is None:
+            return tail
+        head = (
+            b'{"file_path":'
+            + jsonio.dumps_bytes(path)
+            + b',"format":'
+            + jsonio.dumps_bytes(self._formats[index])
+            + b',"size_bytes":%d,"dimensions":{"width":%d,"height":%d}'
+            % (self._sizes[index], self._widths[index], self._heights[index])
+        )
+        return head + (b"}" if tail == b"{}" else b"," + tail[1:])
+
+    def record(self, index: int) -> dict[str, Any]:
+        path = self._paths[index]
+        if path is None:
+            return jsonio.loads(self._tails[index])
+        return {**self.head(index), **jsonio.loads(self._tails[index])}
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        # Decodes one record at a time.
+        return (self.record(index) for index in range(len(self)))
+
+    def iter_encoded(self) -> Iterator[bytes]:
+        return (self.encoded(index) for index in range(len(self)))
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+
+# Compact generation summary (checkpoint, LoRAs, sampler settings, resolution,
+# prompt text) built from a ComfyUI API prompt graph or A1111-style
+# "parameters" text, so consumers do not have to walk the full graph.
+
+MAX_LINK_DEPTH = 32
+# comfyui keys a summary is built from.
+SUMMARY_SOURCES = ("prompt", "parameters")
+
+# class_type -> how to read it. Samplers list the input that holds each
+# setting; settings may be literals or links to other nodes.
+SAMPLER_NODES: dict[str, dict[str, str]] = {
+    "KSampler": {
+        "seed": "seed",
+        "steps": "steps",
+        "cfg": "cfg",
+        "sampler": "sampler_name",
+        "scheduler": "scheduler",
+        "denoise": "denoise",
+    },
+    "KSamplerAdvanced": {
+        "seed": "noise_seed",
+        "steps": "steps",
+        "cfg": "cfg",
+        "sampler": "sampler_name",
+        "scheduler": "scheduler",
+    },
+    "SamplerCustom": {"seed": "noise_seed", "cfg": "cfg"},
+    "SamplerCustomAdvanced": {},
+}
+CHECKPOINT_NODES = {
+    "CheckpointLoaderSimple": "ckpt_name",
+    "CheckpointLoader": "ckpt_name",
+    "ImageOnlyCheckpointLoader": "ckpt_name",
+    "unCLIPCheckpointLoader": "ckpt_name",
+    "UNETLoader": "unet_name",
+    "UnetLoaderGGUF": "unet_name",
+}
+LORA_NODES = {"LoraLoader", "LoraLoaderModelOnly"}
+# Nodes that hold a prompt; their text inputs are joined in this order.
+TEXT_NODES = {
+    "CLIPTextEncode": ("text",),
+    "CLIPTextEncodeSDXL": ("text_g", "text_l"),
+    "CLIPTextEncodeSDXLRefiner": ("text",),
+    "CLIPTextEncodeFlux": ("clip_l", "t5xxl"),
+    "CLIPTextEncodeSD3": ("clip_l", "clip_g", "t5xxl"),
+}
+LATENT_SIZE_NODES = {
+    "EmptyLatentImage",
+    "EmptySD3LatentImage",
+    "EmptyHunyuanLatentVideo",
+    "EmptyMochiLatentVideo",
+    "LatentUpscale",
+}
+# Inputs followed through nodes not listed above (LoRA stacks, model patches,
+# conditioning combiners, ControlNet, latent transforms, ...).
+MODEL_INPUTS = ("model", "unet")
+CONDITIONING_INPUTS = ("conditioning", "conditioning_1", "conditioning_2", "conditioning_to", "conditioning_from")
+LATENT_INPUTS = ("samples", "latent_image", "latent")
+# Inputs that primitive-style nodes ("Seed", "Int", "String", ...) keep their
+# value under, tried when a setting links to a node that is not a sampler part.
+VALUE_INPUTS = ("value", "seed", "noise_seed", "int", "float", "number", "string", "text", "Text")
+
+# A1111 infotext: "Key: value" pairs, values optionally JSON-quoted.
+_PARAM_PATTERN = re.compile(r'\s*([\w ][\w \-/]+):\s*("(?:\\.|[^\\"])+"|[^,]*)(?:,|$)')
+_LORA_TAG = re.compile(r"<lora:([^:>]+)(?::([-\d.]+))?[^>]*>")
+PARAMETER_FIELDS = {
+    "Steps": ("steps", int),
+    "Sampler": ("sampler", str),
+    "Schedule type": ("scheduler", str),
+    "CFG scale": ("cfg", float),
+    "Seed": ("seed", int),
+    "Denoising strength": ("denoise", float),
+    "Model": ("checkpoint", str),
+}
+
+
+def is_link(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) == 2
+        and isinstance(value[0], (str, int))
+        and isinstance(value[1], int)
+    )
+
+
+class _Graph:
+    def __init__(self, prompt: dict[str, Any]) -> None:
+        self.nodes = {
+            str(node_id): node
+            for node_id, node in prompt.items()
+            if isinstance(node, dict) and isinstance(node.get("inputs"), dict)
+        }
+
+    def node(self, link: Any) -> dict[str, Any] | None:
+        return self.nodes.get(str(link[0])) if is_link(link) else None
+
+    def value(self, node: dict[str, Any], name: str, depth: int = 0) -> Any:
+        # Literal value of an input, following links into primitive nodes.
+        value = node["inputs"].get(name)
+        if not is_link(value):
+            return value
+        source = self.node(value)
+        if source is None or depth >= MAX_LINK_DEPTH:
+            return None
+        for candidate in (name, *VALUE_INPUTS):
+            if candidate in source["inputs"]:
+                return self.value(source, candidate, depth + 1)
+        return None
+
+    def upstream(self, node: dict[str, Any], names: tuple[str, ...]) -> list[dict[str, Any]]:
+        found = []
+        for name in names:
+            source = self.node(node["inputs"].get(name))
+            if source is not None:
+                found.append(source)
+        return found
+
+    def model_chain(self, link: Any) -> tuple[Any, list[dict[str, Any]]]:
+        # Walks from a sampler's model input back to the checkpoint, collecting
+        # LoRAs on the way (listed in load order).
+        checkpoint = None
+        loras: list[dict[str, Any]] = []
+        node = self.node(link)
+        seen: set[int] = set()
+        while node is not None and id(node) not in seen and len(seen) < MAX_LINK_DEPTH:
+            seen.add(id(node))
+            class_type = node.get("class_type")
+            if class_type in CHECKPOINT_NODES:
+                checkpoint = self.value(node, CHECKPOINT_NODES[class_type])
+                break
+            if class_type in LORA_NODES:
+                lora = {"name": self.value(node, "lora_name"), "strength_model": self.value(node, "strength_model")}
+                if "strength_clip" in node["inputs"]:
+                    lora["strength_clip"] = self.value(node, "strength_clip")
+                loras.append(lora)
+            upstream = self.upstream(node, MODEL_INPUTS)
+            node = upstream[0] if upstream else None
+        loras.reverse()
+        return checkpoint, loras
+
+    def text(self, link: Any, seen: set[int] | None = None) -> str | None:
+        # ``seen`` stops cycles and diamonds from being walked twice.
+        seen = set() if seen is None else seen
+        node = self.node(link)
+        if node is None or id(node) in seen or len(seen) >= MAX_LINK_DEPTH * 4:
+            return None
+        seen.add(id(node))
+        names = TEXT_NODES.get(node.get("class_type"))
+        if names is not None:
+            parts = [self.value(node, name) for name in names]
+            texts = list(dict.fromkeys(part for part in parts if isinstance(part, str) and part))
+            return "\n".join(texts) if texts else None
+        # ControlNet and similar nodes pass conditioning through; those with
+        # positive/negative inputs return them as outputs 0 and 1.
+        names = CONDITIONING_INPUTS + ("negative" if link[1] == 1 else "positive",)
+        texts = [self.text(node["inputs"].get(name), seen) for name in names]
+        texts = [text for text in dict.fromkeys(texts) if text]
+        return "\n".join(texts) if texts else None
+
+    def latent_size(self, link: Any) -> tuple[Any, Any]:
+        node = self.node(link)
+        seen: set[int] = set()
+        while node is not None and id(node) not in seen and len(seen) < MAX_LINK_DEPTH:
+            seen.add(id(node))
+            if node.get("class_type") in LATENT_SIZE_NODES:
+                return self.value(node, "width"), self.value(node, "height")
+            if node.get("class_type") in SAMPLER_NODES:
+                break
+            upstream = self.upstream(node, LATENT_INPUTS)
+            node = upstream[0] if upstream else None
+        return None, None
+
+    def fed_by_sampler(self, node: dict[str, Any]) -> bool:
+        # True for refiner / hires passes whose latent comes from another sampler.
+        current = node
+        for _ in range(MAX_LINK_DEPTH):
+            upstream = self.upstream(current, LATENT_INPUTS)
+            if not upstream:
+                return False
+            current = upstream[0]
+            if current.get("class_type") in SAMPLER_NODES:
+                return True
+        return False
+
+
+def _sampler_settings(graph: _Graph, node: dict[str, Any]) -> dict[str, Any]:
+    class_type = node["class_type"]
+    settings: dict[str, Any] = {"node_type": class_type}
+    for field_name, input_name in SAMPLER_NODES[class_type].items():
+        settings[field_name] = graph.value(node, input_name)
+
+    positive_link = node["inputs"].get("positive")
+    negative_link = node["inputs"].get("negative")
+    model_link = node["inputs"].get("model")
+    if class_type == "SamplerCustomAdvanced":
+        # Settings live on the noise, guider, sampler and sigmas nodes.
+        noise = graph.node(node["inputs"].get("noise"))
+        if noise is not None:
+            settings["seed"] = graph.value(noise, "noise_seed")
+        guider = graph.node(node["inputs"].get("guider"))
+        if guider is not None:
+            settings["cfg"] = graph.value(guider, "cfg")
+            positive_link = guider["inputs"].get("positive", guider["inputs"].get("conditioning"))
+            negative_link = guider["inputs"].get("negative")
+            model_link = guider["inputs"].get("model")
+    if class_type in ("SamplerCustom", "SamplerCustomAdvanced"):
+        sampler = graph.node(node["inputs"].get("sampler"))
+        if sampler is not None:
+            settings["sampler"] = graph.value(sampler, "sampler_name")
+        sigmas = graph.node(node["inputs"].get("sigmas"))
+        if sigmas is not None:
+            for field_name in ("scheduler", "steps", "denoise"):
+                settings[field_name] = graph.value(sigmas, field_name)
+
+    checkpoint, loras = graph.model_chain(model_link)
+    width, height = graph.latent_size(node["inputs"].get("latent_image"))
+    settings.update(
+        checkpoint=checkpoint,
+        loras=loras,
+        width=width,
+        height=height,
+        positive=graph.text(positive_link),
+        negative=graph.text(negative_link),
+    )
+    return {key: value for key, value in settings.items() if value not in (None, [])}
+
+
+def _node_order(node_id: str) -> tuple[int, Any]:
+    return (0, int(node_id)) if node_id.isdigit() else (1, node_id)
+
+
+def summarize_prompt(prompt: Any) -> dict[str, Any] | None:
+    if not isinstance(prompt, dict):
+        return None
+    graph = _Graph(prompt)
+    samplers = [
+        (node_id, node)
+        for node_id, node in sorted(graph.nodes.items(), key=lambda item: _node_order(item[0]))
+        if node.get("class_type") in SAMPLER_NODES
+    ]
+    if not samplers:
+        return None
+    # The first pass is the sampler that starts from an empty or encoded latent;
+    # later passes (hires fix, refiner) are listed under "passes".
+    samplers.sort(key=lambda item: graph.fed_by_sampler(item[1]))
+    passes = [_sampler_settings(graph, node) for _, node in samplers]
+    summary = {"source": "prompt", **passes[0]}
+    if len(passes) > 1:
+        summary["passes"] = passes[1:]
+    return summary
+
+
+def _number(text: str, default: float) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return default
+
+
+def parse_parameters(text: Any) -> dict[str, Any] | None:
+    # A1111 / Forge infotext: prompt lines, "Negative prompt: ..." and a final
+    # "Steps: 20, Sampler: ..." settings line.
+    if not isinstance(text, str) or not text.strip():
+        return None
+    lines = text.strip().split("\n")
+    settings_line = ""
+    if len(_PARAM_PATTERN.findall(lines[-1])) >= 3:
+        settings_line = lines.pop()
+
+    positive: list[str] = []
+    negative: list[str] = []
+    target = positive
+    for line in lines:
+        if line.startswith("Negative prompt:"):
+            target = negative
+            line = line[len("Negative prompt:") :].lstrip()
+        target.append(line)
+
+    summary: dict[str, Any] = {"source": "parameters"}
+    for key, value in _PARAM_PATTERN.findall(settings_line):
+        value = value.strip()
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        if key.strip() == "Size":
+            width, _, height = value.partition("x")
+            if width.isdigit() and height.isdigit():
+                summary["width"], summary["height"] = int(width), int(height)
+            continue
+        field = PARAMETER_FIELDS.get(key.strip())
+        if field is None:
+            continue
+        name, convert = field
+        try:
+            summary[name] = convert(value)
+        except ValueError:
+            summary[name] = value
+
+    positive_text = "\n".join(positive).strip()
+    loras = [
+        {"name": name, "strength_model": _number(strength, 1.0)} for name, strength in _LORA_TAG.findall(positive_text)
+    ]
+    if loras:
+        summary["loras"] = loras
+    if positive_text:
+        summary["positive"] = positive_text
+    negative_text = "\n".join(negative).strip()
+    if negative_text:
+        summary["negative"] = negative_text
+    return summary if len(summary) > 1 else None
+
+
+def build_summary(comfyui: dict[str, Any]) -> dict[str, Any] | None:
+    return summarize_prompt(comfyui.get("prompt")) or parse_parameters(comfyui.get("parameters"))
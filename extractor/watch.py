@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import os
+import select
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from extractor.defaults import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL
+from extractor.discovery import SUPPORTED_EXTENSIONS, scan_files
+from extractor.models import DiscoveredFile
+
+# Files that never look complete are extracted anyway after this many debounce
+# periods (the writer probably died), so they show up as errors.
+INCOMPLETE_GRACE_PERIODS = 20
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _is_supported(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def _looks_complete(path: str, size: int) -> bool:
+    # Cheap end-of-file check so a PNG/JPEG/WebP that is still being written is
+    # not extracted half way through.
+    try:
+        with open(path, "rb") as fp:
+            head = fp.read(12)
+            if head.startswith(b"\x89PNG"):
+                fp.seek(max(0, size - 12))
+                return fp.read(12)[4:8] == b"IEND"
+            if head.startswith(b"\xff\xd8"):
+                fp.seek(max(0, size - 2))
+                return fp.read(2) == b"\xff\xd9"
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                return size >= 8 + struct.unpack("<I", head[4:8])[0]
+    except OSError:
+        return False
+    return True
+
+
+class _PollingSource:
+    # Stats known directories each tick and re-lists only the ones whose mtime
+    # changed (a file was created, renamed or removed in them). Only files
+    # added to or missing from a listing are reported, along with the files of
+    # a directory that is gone, so the watcher notices removals.
+    def __init__(self, root: str, recursive: bool, initial_paths: list[str]) -> None:
+        self._root = root
+        self._recursive = recursive
+        self._dir_mtimes: dict[str, int] = {}
+        self._listings: dict[str, set[str]] = {}
+        self._add_tree(root)
+        self._remember(initial_paths)
+
+    def _remember(self, paths: list[str]) -> None:
+        for path in paths:
+            self._listings.setdefault(os.path.dirname(path), set()).add(path)
+
+    def _add_tree(self, directory: str) -> None:
+        try:
+            self._dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+            if not self._recursive:
+                return
+            with os.scandir(directory) as entries:
+                subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return
+        for subdir in subdirs:
+            self._add_tree(subdir)
+
+    def wait(self, timeout: float) -> set[str]:
+        time.sleep(timeout)
+        changed: set[str] = set()
+        for directory, mtime_ns in list(self._dir_mtimes.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                del self._dir_mtimes[directory]
+                changed.update(self._listings.pop(directory, ()))
+                continue
+            if current == mtime_ns:
+                continue
+            self._dir_mtimes[directory] = current
+            listing: set[str] = set()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self._recursive and entry.path not in self._dir_mtimes:
+                                self._add_tree(entry.path)
+                                found = _list_tree(entry.path)
+                                self._remember(found)
+                                changed.update(found)
+                        elif _is_supported(entry.name):
+                            listing.add(entry.path)
+            except OSError:
+                continue
+            # Only files that appeared or disappeared; a file rewritten in
+            # place does not change the directory mtime either way.
+            changed.update(listing ^ self._listings.get(directory, set()))
+            self._listings[directory] = listing
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifySource:
+    def __init__(self, root: str, recursive: bool) -> None:
+        import ctypes
+
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._recursive = recursive
+        self._dirs: dict[int, str] = {}
+        self._add_tree(root)
+
+    def _add_watch(self, directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+
+    def _add_tree(self, directory: str) -> None:
+        self._add_watch(directory)
+        if not self._recursive:
+            return
+        try:
+            with os.scandir(directory) as entries:
+                subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return
+        for subdir in subdirs:
+            self._add_tree(subdir)
+
+    def wait(self, timeout: float) -> set[str]:
+        changed: set[str] = set()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return changed
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                # Events were dropped; fall back to a listing of everything watched.
+                for directory in list(self._dirs.values()):
+                    changed.update(_list_tree(directory, recursive=False))
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & _IN_ISDIR:
+                if self._recursive and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self._add_tree(path)
+                    # Files may have landed before the new watch was in place.
+                    changed.update(_list_tree(path))
+                elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    # Reported as-is: the watcher forgets every file below it.
+                    self._remove_tree(path)
+                    changed.add(path)
+            elif _is_supported(name):
+                changed.add(path)
+        return changed
+
+    def _remove_tree(self, directory: str) -> None:
+        # A directory moved out of the tree keeps its watches; drop them.
+        prefix = directory + os.sep
+        for wd, watched in list(self._dirs.items()):
+            if watched == directory or watched.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def _list_tree(directory: str, recursive: bool = True) -> list[str]:
+    try:
+        files, _ = scan_files(Path(directory), recursive=recursive)
+    except OSError:
+        return []
+    return [str(entry.path) for entry in files]
+
+
+@dataclass
+class _Pending:
+    size: int
+    mtime_ns: int
+    stable_since: float
+    first_seen: float
+
+
+class FolderWatcher:
+    # Tracks a directory in memory and hands out files once they are finished:
+    # unchanged for ``debounce`` seconds and ending in a complete image trailer.
+    def __init__(
+        self,
+        input_path: Path,
+        recursive: bool,
+        debounce: float = DEFAULT_DEBOUNCE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        use_inotify: bool = True,
+    ) -> None:
+        if not input_path.is_dir():
+            raise FileNotFoundError(f"Input path does not exist: {input_path}")
+
+        self.input_path = input_path
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._root = str(input_path)
+        self._known: dict[str, tuple[int, int]] = {}
+        self._pending: dict[str, _Pending] = {}
+
+        self.initial_files, _ = scan_files(input_path, recursive=recursive)
+        for entry in self.initial_files:
+            self._known[str(entry.path)] = (entry.size, entry.mtime_ns)
+
+        self.backend = "polling"
+        self._source: _InotifySource | _PollingSource
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._source = _InotifySource(self._root, recursive)
+                self.backend = "inotify"
+            except (OSError, AttributeError):
+                self._source = _PollingSource(self._root, recursive, list(self._known))
+        else:
+            self._source = _PollingSource(self._root, recursive, list(self._known))
+
+    def close(self) -> None:
+        self._source.close()
+
+    def _forget(self, path: str) -> None:
+        # A removed file may come back later with the same size and mtime and
+        # must then be extracted again; a removed directory takes every file
+        # known below it.
+        self._pending.pop(path, None)
+        if self._known.pop(path, None) is None and not _is_supported(path):
+            prefix = path + os.sep
+            for known in [known for known in self._known if known.startswith(prefix)]:
+                del self._known[known]
+                self._pending.pop(known, None)
+
+    def _entry(self, path: str, size: int, mtime_ns: int) -> DiscoveredFile:
+        return DiscoveredFile(Path(path), os.path.relpath(path, self._root), size, mtime_ns)
+
+    def next_ready(self) -> list[DiscoveredFile]:
+        # Pending files need re-checking every debounce period, so don't block
+        # on the event source longer than that.
+        timeout = self.poll_interval
+        if self._pending:
+            timeout = min(timeout, self.debounce / 2)
+        changed = self._source.wait(timeout)
+        now = time.monotonic()
+
+        for path in changed | set(self._pending):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self._forget(path)
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if path not in self._pending and self._known.get(path) == signature:
+                continue
+            pending = self._pending.get(path)
+            if pending is None:
+                self._pending[path] = _Pending(*signature, stable_since=now, first_seen=now)
+            elif (pending.size, pending.mtime_ns) != signature:
+                pending.size, pending.mtime_ns = signature
+                pending.stable_since = now
+
+        ready: list[DiscoveredFile] = []
+        for path, pending in list(self._pending.items()):
+            if now - pending.stable_since < self.debounce:
+                continue
+            overdue = now - pending.first_seen >= self.debounce * INCOMPLETE_GRACE_PERIODS
+            if not overdue and not _looks_complete(path, pending.size):
+                continue
+            del self._pending[path]
+            self._known[path] = (pending.size, pending.mtime_ns)
+            ready.append(self._entry(path, pending.size, pending.mtime_ns))
+
+        ready.sort(key=lambda entry: entry.relative_path)
+        return ready
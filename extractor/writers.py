@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, BinaryIO, TextIO
+
+from extractor import jsonio
+from extractor.blobs import BlobTable
+
+if TYPE_CHECKING:
+    from extractor.store import ResultStore
+
+
+class NdjsonWriter:
+    # One JSON object per line; "type" says whether a line is a result, an
+    # error or the closing summary.
+    def __init__(self, fp: TextIO) -> None:
+        self._fp = fp
+
+    def write(self, record_type: str, item: dict[str, Any]) -> None:
+        line = jsonio.dumps({"type": record_type, **item})
+        self._fp.write(line)
+        self._fp.write("\n")
+
+    def write_result(self, record: dict[str, Any], blobs: BlobTable | None = None) -> None:
+        # With a blob table, each blob line is written once, ahead of the first
+        # record that references it.
+        if blobs is not None:
+            for digest in blobs.dedupe_record(record):
+                self.write("blob", {"sha256": digest, "value": blobs.blobs[digest]})
+        self.write("result", record)
+
+
+def _nest(encoded: bytes, indent: int) -> bytes:
+    # Re-indents a pretty-printed value for a position ``indent`` spaces deep;
+    # newlines only occur between tokens, never inside JSON strings.
+    return encoded.replace(b"\n", b"\n" + b" " * indent)
+
+
+def write_json_payload(
+    fp: BinaryIO,
+    header: dict[str, Any],
+    results: ResultStore,
+    errors: list[dict[str, Any]],
+    blobs: dict[str, Any] | None = None,
+    pretty: bool = False,
+) -> None:
+    # Writes the same bytes as jsonio.dumps_bytes(payload, pretty) for
+    # {**header, "results": [...], "errors": errors, "blobs": blobs}, one
+    # record at a time. Pretty output decodes each record to re-indent it.
+    sections: list[tuple[bytes, Any]] = [(b"errors", errors)]
+    if blobs is not None:
+        sections.append((b"blobs", blobs))
+    if not pretty:
+        fp.write(jsonio.dumps_bytes(header)[:-1] + b',"results":[')
+        for index, encoded in enumerate(results.iter_encoded()):
+            fp.write(b"," + encoded if index else encoded)
+        fp.write(b"]")
+        for name, value in sections:
+            fp.write(b',"%s":' % name + jsonio.dumps_bytes(value))
+        fp.write(b"}")
+        return
+
+    fp.write(jsonio.dumps_bytes(header, pretty=True)[:-2] + b',\n  "results": [')
+    for index, record in enumerate(results):
+        fp.write(b",\n    " if index else b"\n    ")
+        fp.write(_nest(jsonio.dumps_bytes(record, pretty=True), 4))
+    fp.write(b"\n  ]" if len(results) else b"]")
+    for name, value in sections:
+        fp.write(b',\n  "%s": ' % name + _nest(jsonio.dumps_bytes(value, pretty=True), 2))
+    fp.write(b"\n}")